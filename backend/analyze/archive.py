@@ -0,0 +1,90 @@
+import os
+import tempfile
+import zipfile
+
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# Formats that are already compressed gain nothing from deflate and only cost CPU
+STORED_EXTENSIONS = {'.png', '.webp', '.jpg', '.jpeg', '.gif', '.zip', '.gz', '.arrow'}
+
+
+class _ZipOutput:
+    """
+    Write-only sink for ZipFile. It has no seek(), so zipfile writes local headers
+    with data descriptors and never rewinds; written bytes wait here until popped.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def compress_type_for(path):
+    """Stored mode for already-compressed files, deflate for everything else"""
+    extension = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def stream_zip(entries, cache_path=None):
+    """
+    Yield a ZIP archive of (path, arcname) entries in chunks of at most about
+    ARCHIVE_CHUNK_SIZE, never holding more than one chunk in memory. Entries
+    may be a lazy iterable. With `cache_path`, the archive is also written
+    there, and only moved into place once it is complete.
+    """
+    output = _ZipOutput()
+    cache_file = temp_path = None
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        cache_file = os.fdopen(fd, 'wb')
+
+    def drain():
+        data = output.pop()
+        if cache_file is not None:
+            cache_file.write(data)
+        return data
+
+    complete = False
+    try:
+        with zipfile.ZipFile(output, 'w') as archive:
+            for path, arcname in entries:
+                zinfo = zipfile.ZipInfo.from_file(path, arcname)
+                zinfo.compress_type = compress_type_for(path)
+                with open(path, 'rb') as source, archive.open(zinfo, 'w') as dest:
+                    for chunk in iter(lambda: source.read(ARCHIVE_CHUNK_SIZE), b''):
+                        dest.write(chunk)
+                        data = drain()
+                        if data:
+                            yield data
+                data = drain()
+                if data:
+                    yield data
+        data = drain()  # central directory
+        if data:
+            yield data
+        complete = True
+    finally:
+        if cache_file is not None:
+            cache_file.close()
+            if complete:
+                os.replace(temp_path, cache_path)
+            else:
+                # Client went away (or an entry failed) midway: never cache a truncated archive
+                os.remove(temp_path)
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it the parsed-dataset cache is disabled
+    feather = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def compute_content_hash(file_obj):
+    """SHA-256 of a file object or path, read in chunks"""
+    digest = hashlib.sha256()
+    if isinstance(file_obj, (str, os.PathLike)):
+        with open(file_obj, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    else:
+        for chunk in file_obj.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Upload handler that hashes file bytes as they stream in, then hands them to the next handler"""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.hashes = {}
+        self._digest = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.hashes[self.field_name] = self._digest.hexdigest()
+        return None
+
+
+def graph_cache_dir(source_key=None):
+    """Root of the render cache, or the directory holding the renders of one graph source"""
+    root = os.path.join(settings.MEDIA_ROOT, 'cache', 'graphs')
+    return root if source_key is None else os.path.join(root, source_key)
+
+
+def graph_cache_path(source_key, graph_type, columns, profile, extension):
+    """Cache location of one rendered graph, keyed by graph source, graph spec and render profile"""
+    spec = json.dumps([graph_type, list(columns), profile])
+    spec_key = hashlib.sha256(spec.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(graph_cache_dir(source_key), f'{spec_key}.{extension}')
+
+
+def read_cached_graph(cache_path):
+    """
+    True on a cache hit. Eviction is least-recently-used by access time, which is
+    set here explicitly: noatime and relatime mounts only stop the kernel's implicit
+    updates on read, never utime() calls. The mtime stays the render time, which
+    media validators use.
+    """
+    try:
+        os.utime(cache_path, ns=(time.time_ns(), os.stat(cache_path).st_mtime_ns))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# Stores between full rescans of the render cache; see store_cached_graph
+GRAPH_CACHE_RESCAN_STORES = 100
+# Per cache root: bytes found by this process's last scan plus what it stored since, and stores since that scan
+_graph_cache_usage = {}
+
+
+def store_cached_graph(rendered_path, cache_path):
+    """
+    Move a freshly rendered graph into the cache. Walking the cache costs a stat per
+    entry, so it only happens when this process's running size estimate passes
+    ANALYSIS_GRAPH_CACHE_SIZE, or every GRAPH_CACHE_RESCAN_STORES stores to pick up
+    what other workers stored.
+    """
+    size = os.path.getsize(rendered_path)
+    os.replace(rendered_path, cache_path)
+    usage = _graph_cache_usage.setdefault(graph_cache_dir(), {'bytes': None, 'stores': 0})
+    usage['stores'] += 1
+    if usage['bytes'] is not None:
+        usage['bytes'] += size
+    if (usage['bytes'] is None or usage['bytes'] > settings.ANALYSIS_GRAPH_CACHE_SIZE
+            or usage['stores'] >= GRAPH_CACHE_RESCAN_STORES):
+        usage['bytes'] = evict_graph_cache(keep=cache_path)
+        usage['stores'] = 0
+
+
+def evict_graph_cache(max_bytes=None, keep=None):
+    """
+    Delete least recently used renders (never `keep`) until the cache fits in
+    ANALYSIS_GRAPH_CACHE_SIZE bytes; returns the bytes left
+    """
+    if max_bytes is None:
+        max_bytes = settings.ANALYSIS_GRAPH_CACHE_SIZE
+    entries = []
+    with os.scandir(graph_cache_dir()) as sources:
+        for source in sources:
+            if not source.is_dir():
+                continue
+            # Renders in progress live in temp subdirectories and are skipped
+            with os.scandir(source.path) as it:
+                for entry in it:
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        stat = entry.stat()
+                        entries.append((stat.st_atime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # evicted concurrently by another worker
+            pass
+        total_size -= size
+    return total_size
+
+
+def delete_cached_graphs(source_key):
+    """Drop every cached render of one graph source"""
+    shutil.rmtree(graph_cache_dir(source_key), ignore_errors=True)
+
+
+def archive_cache_dir(analysis_id):
+    """Directory holding the cached download archive of one analysis"""
+    return os.path.join(settings.MEDIA_ROOT, 'cache', 'archives', str(analysis_id))
+
+
+def archive_cache_path(analysis_id, version_key):
+    """Cache location of an analysis' download archive; the key changes whenever its contents would"""
+    return os.path.join(archive_cache_dir(analysis_id), f'{version_key}.zip')
+
+
+def prune_cached_archives(analysis_id, keep=None):
+    """Drop the cached archives of an analysis (all of them, or all but `keep`), including partial writes"""
+    directory = archive_cache_dir(analysis_id)
+    if keep is None:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if path != keep and name.endswith('.zip'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def parsed_cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'cache', 'parsed')
+
+
+def parsed_cache_path(content_hash):
+    return os.path.join(parsed_cache_dir(), f'{content_hash}.arrow')
+
+
+def evict_parsed_cache(max_bytes=None, keep=None):
+    """
+    Delete least recently used parsed uploads (never `keep`) until the cache fits in
+    ANALYSIS_PARSED_CACHE_SIZE bytes. The directory is flat and holds one file per
+    distinct upload, and it only runs after a parse, so listing it is cheap by comparison.
+    """
+    if max_bytes is None:
+        max_bytes = settings.ANALYSIS_PARSED_CACHE_SIZE
+    entries = []
+    with os.scandir(parsed_cache_dir()) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith('.arrow'):
+                stat = entry.stat()
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_size -= size
+
+
+def delete_cached_frame(content_hash):
+    """Drop the parsed copy of an upload"""
+    try:
+        os.remove(parsed_cache_path(content_hash))
+    except FileNotFoundError:
+        pass
+
+
+def read_cached_frame(content_hash):
+    """Memory-map a previously parsed upload, or return None on a cache miss"""
+    if feather is None or not content_hash:
+        return None
+    cache_path = parsed_cache_path(content_hash)
+    try:
+        # Mark the entry used for eviction, which is least recently used first
+        os.utime(cache_path, ns=(time.time_ns(), os.stat(cache_path).st_mtime_ns))
+    except FileNotFoundError:
+        return None
+    try:
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+    except Exception as e:
+        print(f"Error reading parsed cache {cache_path}: {str(e)}")
+        return None
+
+
+def write_cached_frame(content_hash, df):
+    """Store a parsed upload as uncompressed Arrow IPC so later loads can memory-map it"""
+    if feather is None or not content_hash:
+        return False
+    if not isinstance(df.index, pd.RangeIndex) or not all(isinstance(c, str) for c in df.columns):
+        return False
+
+    cache_path = parsed_cache_path(content_hash)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(df, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, cache_path)
+        evict_parsed_cache(keep=cache_path)
+        return True
+    except Exception as e:
+        # e.g. object columns holding mixed Python types that Arrow cannot represent
+        print(f"Error writing parsed cache {cache_path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+TOP_VALUES = 10
+TIMESERIES_POINTS = 1000
+SCATTER_POINTS = 1000
+
+# Pre-aggregated data behind each graph type, for drawing charts in the browser.
+# Everything is built from a kept graph source (cleaned frame plus precomputed
+# statistics) and returned as plain JSON values; non-finite numbers become None.
+
+
+def _json_values(values):
+    """Floats as a JSON-safe list (NaN and infinities become None)"""
+    values = np.asarray(values, dtype=np.float64)
+    return [float(v) if np.isfinite(v) else None for v in values.ravel()]
+
+
+def _json_float(value):
+    return _json_values([value])[0] if value is not None else None
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets
+    downsampling: first and last points are kept and each bucket in between
+    contributes the point forming the largest triangle with its neighbours.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def _overview_data(source, columns):
+    df = source['df']
+    return {
+        'total_rows': int(source['total_rows']),
+        'column_count': len(df.columns),
+        'column_kinds': {
+            'numeric': len(df.select_dtypes(include=[np.number]).columns),
+            'categorical': len(df.select_dtypes(include=['object', 'category', 'string']).columns),
+            'datetime': len(df.select_dtypes(include=['datetime64']).columns),
+        },
+        'dtype_counts': {str(dtype): int(count) for dtype, count in df.dtypes.astype(str).value_counts().items()},
+        'missing_values': int(df.isnull().sum().sum()),
+    }
+
+
+def _histogram_data(source, columns):
+    stats = source['column_stats'].get(columns[0])
+    if stats is None:
+        return None
+    return {
+        'bin_edges': _json_values(stats['bin_edges']),
+        'bin_counts': [int(c) for c in stats['bin_counts']],
+        'mean': _json_float(stats['mean']),
+        'median': _json_float(stats['median']),
+    }
+
+
+def _boxplot_data(source, columns):
+    stats = source['column_stats'].get(columns[0])
+    if stats is None:
+        return None
+    return {key: _json_float(stats[key]) for key in ('min', 'whislo', 'q1', 'median', 'q3', 'whishi', 'max')}
+
+
+def _countplot_data(source, columns):
+    counts = source['value_counts'].get(columns[0])
+    if counts is None:
+        return None
+    counts = counts.head(TOP_VALUES)
+    return {
+        'labels': [str(label) for label in counts.index],
+        'counts': [int(c) for c in counts.values],
+        'total_rows': int(source['total_rows']),
+    }
+
+
+def _correlation_data(source, columns):
+    matrix = source['correlation']
+    if matrix is None:
+        return None
+    matrix = matrix.loc[columns, columns]
+    return {
+        'columns': list(columns),
+        'matrix': [_json_values(row) for row in matrix.to_numpy()],
+    }
+
+
+def _scatter_data(source, columns):
+    df = source['df'][columns]
+    sample = df.sample(n=min(len(df), SCATTER_POINTS), random_state=0)
+    return {
+        'columns': list(columns),
+        'points': [_json_values(row) for row in sample.to_numpy(dtype=np.float64)],
+    }
+
+
+def _timeseries_data(source, columns):
+    date_col, value_col = columns
+    series = source['df'][[date_col, value_col]].dropna().sort_values(date_col)
+    x = series[date_col].to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64)
+    y = series[value_col].to_numpy(dtype=np.float64)
+    keep = lttb(x, y, TIMESERIES_POINTS)
+    return {
+        'x': [ts.isoformat() for ts in pd.to_datetime(series[date_col].iloc[keep])],
+        'y': _json_values(y[keep]),
+        'points': len(series),
+    }
+
+
+CHART_DATA = {
+    'overview': _overview_data,
+    'histogram': _histogram_data,
+    'boxplot': _boxplot_data,
+    'countplot': _countplot_data,
+    'correlation': _correlation_data,
+    'scatter': _scatter_data,
+    'timeseries': _timeseries_data,
+}
+
+
+def chart_data(source, graph_type, columns):
+    """Chart data of one graph, or None if the source cannot provide it"""
+    data = CHART_DATA[graph_type](source, list(columns))
+    if data is None:
+        return None
+    return {'graph_type': graph_type, 'columns': list(columns), 'data': data}
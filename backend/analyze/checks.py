@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Error, register
+from .insights import INSIGHT_DETECTORS
+
+
+@register()
+def check_insight_detectors(app_configs, **kwargs):
+    """ANALYSIS_INSIGHT_DETECTORS may only name registered detectors"""
+    unknown = [name for name in settings.ANALYSIS_INSIGHT_DETECTORS if name not in INSIGHT_DETECTORS]
+    if not unknown:
+        return []
+    return [Error(
+        f"ANALYSIS_INSIGHT_DETECTORS names unknown detectors: {', '.join(unknown)}",
+        hint=f"Registered detectors: {', '.join(INSIGHT_DETECTORS)}",
+        id='analyze.E001',
+    )]
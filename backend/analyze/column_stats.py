@@ -0,0 +1,103 @@
+import numpy as np
+from scipy import stats
+
+HISTOGRAM_BINS = 30
+SKETCH_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+SKETCH_TOP_VALUES = 10
+
+# Per-column statistics are plain JSON-compatible dicts so they can travel inside
+# Celery graph jobs and be cached alongside pipeline checkpoints.
+
+
+def _box_stats(values, q1, median, q3):
+    """Quartiles plus 1.5*IQR whiskers in the form matplotlib's bxp expects"""
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'whislo': float(inside.min()) if len(inside) > 0 else float(q1),
+        'whishi': float(inside.max()) if len(inside) > 0 else float(q3),
+    }
+
+
+def compute_column_stats(df, bins=HISTOGRAM_BINS):
+    """
+    Count, mean, std, min/max, quartiles, box-plot whiskers, skewness and a
+    pre-binned histogram for every numeric column of the frame. Aggregates and
+    quantiles are computed frame-wide; only the binning runs per column.
+    """
+    numeric_df = df.select_dtypes(include=[np.number])
+    if numeric_df.shape[1] == 0:
+        return {}
+
+    aggregates = numeric_df.agg(['count', 'mean', 'std', 'min', 'max'])
+    quartiles = numeric_df.quantile([0.25, 0.5, 0.75])
+
+    column_stats = {}
+    for column in numeric_df.columns:
+        values = numeric_df[column].to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        counts, edges = np.histogram(values, bins=bins)
+        column_stats[column] = {
+            'count': int(aggregates.at['count', column]),
+            'mean': float(aggregates.at['mean', column]),
+            'std': float(aggregates.at['std', column]),
+            'min': float(aggregates.at['min', column]),
+            'max': float(aggregates.at['max', column]),
+            'skewness': float(stats.skew(values)),
+            'bin_edges': edges.tolist(),
+            'bin_counts': counts.tolist(),
+            **_box_stats(values, quartiles.at[0.25, column], quartiles.at[0.5, column], quartiles.at[0.75, column]),
+        }
+    return column_stats
+
+
+def accumulator_stats(acc, histogram=None):
+    """
+    Same statistics from a streaming ColumnAccumulator: exact count, moments and
+    extremes, quantiles from its value sample, and the exact histogram
+    accumulated during the cleaning pass when one is given.
+    """
+    q1, median, q3 = acc.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    column_stats = {
+        'count': int(acc.count),
+        'mean': float(acc.mean),
+        'std': acc.std(),
+        'min': float(acc.min),
+        'max': float(acc.max),
+        'skewness': acc.skewness(),
+        'bin_edges': histogram.edges.tolist() if histogram is not None else [],
+        'bin_counts': histogram.counts.tolist() if histogram is not None else [],
+        'q1': float(q1),
+        'median': float(median),
+        'q3': float(q3),
+        'whislo': float(max(acc.min, q1 - 1.5 * iqr)),
+        'whishi': float(min(acc.max, q3 + 1.5 * iqr)),
+    }
+    return column_stats
+
+
+def sketch_summary(acc):
+    """
+    Sketch estimates of a streaming ColumnAccumulator with their error bounds:
+    distinct count (relative standard error), most frequent values (maximum
+    undercount of any count) and, when it keeps a KLL sketch, quantiles
+    (normalized rank error)
+    """
+    summary = {
+        'rows': int(acc.rows),
+        'distinct': int(min(acc.distinct.estimate(), acc.rows - acc.missing)),
+        'distinct_relative_error': float(acc.distinct.relative_error()),
+        'top': [[str(value), int(count)] for value, count in acc.top.most_common(SKETCH_TOP_VALUES).items()],
+        'top_count_error': int(acc.top.error),
+    }
+    if acc.quantiles is not None and acc.quantiles.count > 0:
+        values = acc.quantiles.quantile(list(SKETCH_QUANTILES))
+        summary['quantiles'] = {str(q): float(value) for q, value in zip(SKETCH_QUANTILES, values)}
+        summary['quantile_rank_error'] = float(acc.quantiles.rank_error())
+    return summary
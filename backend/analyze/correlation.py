@@ -0,0 +1,81 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+CORRELATION_METHODS = ('pearson', 'spearman')
+STRONG_CORRELATION = 0.7
+
+# Correlation matrices are computed with a handful of matrix products over one
+# float block (BLAS) instead of pandas' per-pair loop. Chunked CSVs accumulate
+# mergeable co-moments instead, see streaming.CorrelationAccumulator.
+
+
+def _block_dtype(dtypes):
+    """float32 when every column fits in it exactly (downcast frames), float64 otherwise"""
+    try:
+        dtype = np.result_type(np.float32, *(getattr(dtype, 'numpy_dtype', dtype) for dtype in dtypes))
+    except TypeError:
+        return np.float64
+    return np.float32 if dtype == np.float32 else np.float64
+
+
+def correlation_matrix(df, method='pearson'):
+    """
+    Pairwise correlation of the numeric columns of `df`, equal to
+    `DataFrame.corr(method)`: each pair uses the rows where both values are
+    present. Spearman is Pearson over average ranks, ranked per column (pandas
+    re-ranks every pair, which only differs when values are missing). None
+    below two columns.
+    """
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'. Allowed: {', '.join(CORRELATION_METHODS)}")
+    numeric_df = df.select_dtypes(include=[np.number])
+    if numeric_df.shape[1] < 2:
+        return None
+    if method == 'spearman':
+        numeric_df = numeric_df.rank()
+
+    x = numeric_df.to_numpy(dtype=_block_dtype(numeric_df.dtypes), na_value=np.nan)
+    valid = ~np.isnan(x)
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN columns; their correlations are NaN
+        # Centering first keeps the products well conditioned (correlation is shift invariant)
+        x -= np.nanmean(x, axis=0)
+        if valid.all():
+            cross = (x.T @ x).astype(np.float64)
+            variance = np.diag(cross)
+            corr = cross / np.sqrt(np.outer(variance, variance))
+        else:
+            # Pairwise-complete sums as matrix products over the validity mask
+            mask = valid.astype(x.dtype)
+            x[~valid] = 0
+            n = (mask.T @ mask).astype(np.float64)
+            sums = (x.T @ mask).astype(np.float64)  # sums[i, j]: x_i over rows where x_j is present too
+            squares = ((x * x).T @ mask).astype(np.float64)
+            cross = (x.T @ x).astype(np.float64)
+            covariance = cross - sums * sums.T / n
+            variance = squares - sums * sums / n
+            corr = covariance / np.sqrt(variance * variance.T)
+            corr[n < 2] = np.nan
+
+    corr = np.clip(corr, -1.0, 1.0)
+    diagonal = np.diag_indices_from(corr)
+    corr[diagonal] = np.where(np.isnan(corr[diagonal]), np.nan, 1.0)
+    return pd.DataFrame(corr, index=numeric_df.columns, columns=numeric_df.columns)
+
+
+def strongest_pairs(matrix, threshold=STRONG_CORRELATION, k=5):
+    """
+    (column, column, r) of the at most `k` column pairs with |r| above
+    `threshold`, strongest first, from the upper triangle of `matrix`
+    """
+    values = matrix.to_numpy()
+    rows, cols = np.triu_indices(len(values), k=1)
+    r = values[rows, cols]
+    strength = np.abs(r)
+    candidates = np.flatnonzero(strength > threshold)  # NaN never passes
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-strength[candidates], k - 1)[:k]]
+    candidates = candidates[np.argsort(-strength[candidates], kind='stable')]
+    columns = matrix.columns
+    return [(columns[rows[i]], columns[cols[i]], float(r[i])) for i in candidates]
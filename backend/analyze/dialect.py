@@ -0,0 +1,83 @@
+import csv
+from collections import Counter
+
+SAMPLE_BYTES = 64 * 1024
+CANDIDATE_ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+CANDIDATE_DELIMITERS = [',', ';', '\t', '|']
+
+
+def _decode_sample(raw):
+    """Pick the first candidate encoding that decodes the byte prefix"""
+    if raw.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig', raw[3:].decode('utf-8', errors='ignore')
+
+    for encoding in CANDIDATE_ENCODINGS:
+        try:
+            return encoding, raw.decode(encoding)
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off by the prefix boundary is not a real failure
+            if encoding == 'utf-8' and e.start >= len(raw) - 3:
+                return encoding, raw[:e.start].decode(encoding)
+            continue
+    return 'latin-1', raw.decode('latin-1')
+
+
+def _complete_lines(text, truncated):
+    """Split the sample into lines, dropping a trailing partial line"""
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]
+    return [line for line in lines if line.strip()]
+
+
+def _field_counts(lines, delimiter, quotechar):
+    return [len(row) for row in csv.reader(lines, delimiter=delimiter, quotechar=quotechar)]
+
+
+def _guess_delimiter(lines):
+    """Delimiter giving the most consistent multi-column split when csv.Sniffer gives up"""
+    best, best_score = ',', (0, 0)
+    for delimiter in CANDIDATE_DELIMITERS:
+        counts = _field_counts(lines, delimiter, '"')
+        if not counts:
+            continue
+        width, frequency = Counter(counts).most_common(1)[0]
+        score = (frequency, width) if width > 1 else (0, 0)
+        if score > best_score:
+            best, best_score = delimiter, score
+    return best
+
+
+def sniff_csv_dialect(file_path, sample_size=SAMPLE_BYTES):
+    """
+    Detect encoding, delimiter, quote char and header row from a bounded
+    byte prefix of a CSV file, so it can be parsed with a single read_csv call.
+    """
+    with open(file_path, 'rb') as f:
+        raw = f.read(sample_size + 1)
+    truncated = len(raw) > sample_size
+    raw = raw[:sample_size]
+
+    encoding, text = _decode_sample(raw)
+    lines = _complete_lines(text, truncated)
+    if not lines:
+        return {'encoding': encoding, 'delimiter': ',', 'quotechar': '"', 'header_row': 0}
+
+    sample = '\n'.join(lines)
+    try:
+        sniffed = csv.Sniffer().sniff(sample, delimiters=''.join(CANDIDATE_DELIMITERS))
+        delimiter, quotechar = sniffed.delimiter, sniffed.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = _guess_delimiter(lines), '"'
+
+    # Header is the first line that has the dominant number of fields (skips preamble lines)
+    counts = _field_counts(lines, delimiter, quotechar)
+    width = Counter(counts).most_common(1)[0][0]
+    header_row = next((i for i, count in enumerate(counts) if count == width), 0)
+
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'quotechar': quotechar,
+        'header_row': header_row,
+    }
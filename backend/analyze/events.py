@@ -0,0 +1,104 @@
+"""
+Pub/sub of analysis progress events. Pipeline stages publish from Celery
+workers (synchronous code); the server-sent events view subscribes from the
+ASGI event loop. The broker class is chosen by ANALYSIS_EVENTS_BACKEND so
+Redis can be swapped for the in-process broker in tests and eager mode.
+"""
+import asyncio
+import json
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def user_channel(user_id):
+    """Channel carrying the events of every analysis owned by one profile"""
+    return f'analysis-events:user:{user_id}'
+
+
+class InMemoryBroker:
+    """Broker for a single process: subscribers are asyncio queues fed thread-safely"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # channel -> list of (event loop, queue)
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    async def subscribe(self, channel, timeout):
+        """Yield events as they arrive, or None after `timeout` seconds without one"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[channel].remove(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker:
+    """Broker shared by web and worker processes through Redis pub/sub"""
+
+    def __init__(self, url=None):
+        self.url = url or settings.ANALYSIS_EVENTS_REDIS_URL
+        self._client = None
+
+    def publish(self, channel, event):
+        import redis
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, json.dumps(event))
+
+    async def subscribe(self, channel, timeout):
+        """Yield events as they arrive, or None after `timeout` seconds without one"""
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        try:
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+                yield json.loads(message['data']) if message else None
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+
+
+def get_broker():
+    """Process-wide broker instance of the configured ANALYSIS_EVENTS_BACKEND class"""
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.ANALYSIS_EVENTS_BACKEND)()
+    return _broker
+
+
+def publish_analysis_event(analysis):
+    """Push the current status and progress of an analysis to its owner's subscribers"""
+    if analysis is None or analysis.get('user_id') is None:
+        return
+    event = {
+        'id': str(analysis['id']),
+        'status': analysis['status'],
+        'progress_stage': analysis['progress_stage'],
+        'progress': analysis['progress'],
+    }
+    try:
+        get_broker().publish(user_channel(analysis['user_id']), event)
+    except Exception as e:
+        # Progress events are best effort; the pipeline never fails because of them
+        print(f"Error publishing analysis event: {str(e)}")
@@ -0,0 +1,81 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas.core.tools.datetimes import guess_datetime_format
+
+SAMPLE_SIZE = 1000
+FORMAT_CANDIDATES = 20
+NUMERIC_THRESHOLD = 0.8  # share of values that must parse as numbers
+CATEGORY_THRESHOLD = 0.1  # max unique/rows ratio for a categorical column
+
+
+def stratified_sample(series, sample_size=SAMPLE_SIZE, seed=0):
+    """One random non-null value from each of `sample_size` equal-width strata of the column"""
+    n = len(series)
+    if n <= sample_size:
+        return series.dropna()
+    rng = np.random.default_rng(seed)
+    edges = np.linspace(0, n, sample_size + 1)
+    positions = (edges[:-1] + rng.random(sample_size) * np.diff(edges)).astype(np.int64)
+    return series.iloc[np.minimum(positions, n - 1)].dropna()
+
+
+def detect_datetime_format(sample):
+    """strftime format that parses every sampled value, or None"""
+    if sample.empty:
+        return None
+    guesses = Counter(
+        guess_datetime_format(value)
+        for value in sample.head(FORMAT_CANDIDATES)
+        if isinstance(value, str)
+    )
+    guesses.pop(None, None)
+    for fmt, _ in guesses.most_common():
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+        if parsed.notna().all():
+            return fmt
+    return None
+
+
+def is_text_column(series, sample_size=SAMPLE_SIZE):
+    """True if sampled values look neither like datetimes nor like numbers"""
+    sample = stratified_sample(series, sample_size)
+    if detect_datetime_format(sample) is not None:
+        return False
+    return not pd.to_numeric(sample, errors='coerce').notna().mean() > NUMERIC_THRESHOLD
+
+
+def infer_column_type(series, sample_size=SAMPLE_SIZE):
+    """
+    Decide the type of a string column from a bounded sample and convert it
+    once. Returns (converted series or None if unchanged, type report dict).
+    """
+    sample = stratified_sample(series, sample_size)
+
+    # Datetime: explicit format from the sample, then a single vectorized conversion.
+    # Columns where any value fails to parse are left unchanged.
+    fmt = detect_datetime_format(sample)
+    if fmt is not None:
+        converted = pd.to_datetime(series, format=fmt, errors='coerce')
+        if converted.isna().sum() == series.isna().sum():
+            return converted, {'type': 'datetime', 'format': fmt, 'dtype': str(converted.dtype)}
+
+    # Numeric: only convert the full column when the sample says it is worth it
+    if pd.to_numeric(sample, errors='coerce').notna().mean() > NUMERIC_THRESHOLD:
+        converted = pd.to_numeric(series, errors='coerce')
+        if converted.notna().sum() > len(series) * NUMERIC_THRESHOLD:
+            return converted, {'type': 'numeric', 'dtype': str(converted.dtype)}
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return None, {'type': 'category', 'dtype': 'category'}
+
+    # Categorical: building the categories gives the distinct count in the same pass
+    categorical = series.astype('category')
+    if len(categorical.cat.categories) / len(series) < CATEGORY_THRESHOLD:
+        return categorical, {'type': 'category', 'dtype': 'category'}
+
+    return None, {'type': 'text', 'dtype': str(series.dtype)}
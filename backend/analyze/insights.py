@@ -0,0 +1,436 @@
+"""
+Registry of insight detectors. Each detector is a function registered with
+@insight_detector; it declares the shared statistics it reads, a CPU-time
+budget, and a row cap above which it sees a uniform sample instead of the
+whole frame. Shared statistics are computed once per run, whatever the
+number of detectors reading them, and every detector reports its own timing.
+"""
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .correlation import STRONG_CORRELATION, strongest_pairs
+
+INSIGHT_DETECTORS = {}
+DEFAULT_DETECTOR_BUDGET = 0.5  # CPU seconds
+SAMPLE_SEED = 0
+
+HIGH_CARDINALITY_MIN_DISTINCT = 50
+HIGH_CARDINALITY_RATIO = 0.5
+TREND_MIN_R2 = 0.5
+SEASONALITY_MIN_AUTOCORRELATION = 0.3
+SEASONALITY_MAX_POINTS = 65536
+OUTLIER_CLUSTER_MIN_SHARE = 0.001
+
+
+def insight_detector(name, requires=(), budget=DEFAULT_DETECTOR_BUDGET, max_rows=None):
+    """
+    Register `func(context, data, budget)` as detector `name`, returning a list of
+    insight dicts. Detectors run in registration order; `data` is the cleaned frame,
+    or a sample of `max_rows` rows of it.
+    """
+    def register(func):
+        INSIGHT_DETECTORS[name] = {'func': func, 'requires': tuple(requires), 'budget': budget, 'max_rows': max_rows}
+        return func
+    return register
+
+
+class Budget:
+    """
+    CPU time allowance of one detector; detectors looping over columns stop once it is
+    spent. Measured as process CPU time so BLAS and other native threads count too;
+    Celery's prefork workers run one task per process, so nothing else is billed.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.truncated = False
+        self._start = time.process_time()
+
+    def spent(self):
+        return time.process_time() - self._start
+
+    def exhausted(self):
+        if self.spent() >= self.seconds:
+            self.truncated = True
+        return self.truncated
+
+
+# Shared statistics detectors can declare, computed on first request
+STATISTICS = {
+    'numeric_columns': lambda context: list(context.df.select_dtypes(include=[np.number]).columns),
+    'categorical_columns': lambda context: list(
+        context.df.select_dtypes(include=['object', 'category', 'string']).columns
+    ),
+    'datetime_columns': lambda context: list(context.df.select_dtypes(include=['datetime64']).columns),
+    'column_stats': lambda context: context.service.get_column_stats(),
+    'correlation': lambda context: context.service.get_correlation(),
+    'value_counts': lambda context: {
+        column: context.service._value_counts(column) for column in context.stat('categorical_columns')
+    },
+    'distinct_counts': lambda context: context.service._distinct_counts(context.stat('categorical_columns')),
+    'sketch_summaries': lambda context: context.service.get_sketch_summaries(),
+    'outlier_bounds': lambda context: context.service.get_outlier_bounds(),
+}
+
+
+class InsightContext:
+    """Read-only view of the cleaned dataset handed to detectors, with lazily shared statistics"""
+
+    def __init__(self, service):
+        self.service = service
+        self.analysis = service.analysis
+        self.df = service.df
+        self.total_rows = service._total_rows()
+        self._statistics = {}
+        self._samples = {}
+
+    def stat(self, name):
+        if name not in self._statistics:
+            self._statistics[name] = STATISTICS[name](self)
+        return self._statistics[name]
+
+    def sample(self, max_rows):
+        """The frame, or a reproducible uniform sample of `max_rows` of its rows"""
+        if max_rows is None or len(self.df) <= max_rows:
+            return self.df
+        if max_rows not in self._samples:
+            self._samples[max_rows] = self.df.sample(n=max_rows, random_state=SAMPLE_SEED)
+        return self._samples[max_rows]
+
+
+def run_insight_detectors(service, detectors=None, total_budget=None):
+    """
+    Run the enabled detectors (ANALYSIS_INSIGHT_DETECTORS, or all registered ones)
+    against the service's cleaned data. Returns the insights and a timing report:
+    CPU seconds per shared statistic and, per detector, CPU and wall seconds, rows
+    seen and a status. Detectors left once ANALYSIS_INSIGHTS_BUDGET CPU seconds
+    are spent are skipped.
+    """
+    names = detectors or settings.ANALYSIS_INSIGHT_DETECTORS or list(INSIGHT_DETECTORS)
+    unknown = [name for name in names if name not in INSIGHT_DETECTORS]
+    if unknown:
+        # Also reported by the analyze.E001 system check; a typo must not fail the whole stage
+        print(f"Skipping unknown insight detectors: {', '.join(unknown)}")
+        names = [name for name in names if name in INSIGHT_DETECTORS]
+    total_budget = settings.ANALYSIS_INSIGHTS_BUDGET if total_budget is None else total_budget
+    context = InsightContext(service)
+    run_start = time.process_time()
+    timings = {'statistics': {}, 'detectors': {}}
+
+    required = dict.fromkeys(requirement for name in names for requirement in INSIGHT_DETECTORS[name]['requires'])
+    for statistic in required:
+        start = time.process_time()
+        context.stat(statistic)
+        timings['statistics'][statistic] = round(time.process_time() - start, 4)
+
+    insights = []
+    for name in names:
+        detector = INSIGHT_DETECTORS[name]
+        if time.process_time() - run_start >= total_budget:
+            timings['detectors'][name] = {'status': 'skipped'}
+            continue
+        data = context.sample(detector['max_rows'])
+        budget = Budget(detector['budget'])
+        wall_start = time.perf_counter()
+        try:
+            found = detector['func'](context, data, budget)
+            status = 'partial' if budget.truncated else ('over_budget' if budget.exhausted() else 'ok')
+        except Exception as e:
+            print(f"Error in insight detector {name}: {str(e)}")
+            found, status = [], 'failed'
+        insights.extend(found)
+        timings['detectors'][name] = {
+            'status': status,
+            'cpu': round(budget.spent(), 4),
+            'wall': round(time.perf_counter() - wall_start, 4),
+            'rows': len(data),
+            'insights': len(found),
+        }
+    timings['total_cpu'] = round(time.process_time() - run_start, 4)
+    return insights, timings
+
+
+@insight_detector('overview')
+def detect_overview(context, data, budget):
+    return [{
+        'type': 'overview',
+        'description': f"Dataset contains {context.total_rows} rows and {len(context.df.columns)} columns after cleaning.",
+        'importance': 0.9
+    }]
+
+
+@insight_detector('missing_values')
+def detect_missing_values(context, data, budget):
+    if not context.analysis.missing_values_count:
+        return []
+    return [{
+        'type': 'data_quality',
+        'description': f"Found and handled {context.analysis.missing_values_count} missing values across the dataset.",
+        'importance': 0.8
+    }]
+
+
+@insight_detector('duplicates')
+def detect_duplicates(context, data, budget):
+    if not context.analysis.duplicates_count:
+        return []
+    return [{
+        'type': 'data_quality',
+        'description': f"Removed {context.analysis.duplicates_count} duplicate records.",
+        'importance': 0.7
+    }]
+
+
+@insight_detector('correlation', requires=('correlation',))
+def detect_correlation(context, data, budget):
+    correlation = context.stat('correlation')
+    if correlation is None:
+        return []
+    method = '' if settings.ANALYSIS_CORRELATION_METHOD == 'pearson' else 'Spearman '
+    return [{
+        'type': 'correlation',
+        'column': f"{col1} vs {col2}",
+        'description': f"Strong {'positive' if corr_val > 0 else 'negative'} {method}correlation ({corr_val:.3f}) between {col1} and {col2}.",
+        'value': corr_val,
+        'importance': abs(corr_val)
+    } for col1, col2, corr_val in strongest_pairs(correlation, STRONG_CORRELATION, 5)]
+
+
+@insight_detector('skewness', requires=('numeric_columns', 'column_stats'))
+def detect_skewness(context, data, budget):
+    column_stats = context.stat('column_stats')
+    insights = []
+    for column in context.stat('numeric_columns'):
+        if budget.exhausted():
+            break
+        if column not in column_stats:
+            continue
+        skewness = column_stats[column]['skewness']
+        if abs(skewness) > 1:
+            insights.append({
+                'type': 'distribution',
+                'column': column,
+                'description': f"Column '{column}' shows {'right' if skewness > 0 else 'left'} skewed distribution (skewness: {skewness:.3f}).",
+                'value': skewness,
+                'importance': min(abs(skewness) / 3, 1.0)
+            })
+    return insights
+
+
+@insight_detector('categorical_mode', requires=('value_counts', 'sketch_summaries'))
+def detect_categorical_mode(context, data, budget):
+    summaries = context.stat('sketch_summaries')
+    insights = []
+    for column, value_counts in context.stat('value_counts').items():
+        if budget.exhausted():
+            break
+        if len(value_counts) > 0:
+            most_common = value_counts.index[0]
+            percentage = (value_counts.iloc[0] / context.total_rows) * 100
+            value = {'value': most_common, 'percentage': percentage}
+            if column in summaries:
+                # Heavy-hitter counts may undercount by at most top_count_error rows
+                count_error = summaries[column]['top_count_error']
+                value.update(approximate=True, count_error=count_error,
+                             percentage_error=count_error / context.total_rows * 100)
+            insights.append({
+                'type': 'categorical',
+                'column': column,
+                'description': f"Most common value in '{column}' is '{most_common}' ({percentage:.1f}% of data).",
+                'value': value,
+                'importance': 0.6
+            })
+    return insights
+
+
+@insight_detector('high_cardinality', requires=('distinct_counts', 'sketch_summaries'))
+def detect_high_cardinality(context, data, budget):
+    summaries = context.stat('sketch_summaries')
+    insights = []
+    for column, distinct in context.stat('distinct_counts').items():
+        if budget.exhausted():
+            break
+        ratio = distinct / context.total_rows if context.total_rows else 0
+        if distinct >= HIGH_CARDINALITY_MIN_DISTINCT and ratio >= HIGH_CARDINALITY_RATIO:
+            value = {'distinct': int(distinct), 'ratio': float(ratio)}
+            if column in summaries:
+                value.update(approximate=True, relative_error=summaries[column]['distinct_relative_error'])
+            insights.append({
+                'type': 'high_cardinality',
+                'column': column,
+                'description': f"Column '{column}' has {distinct} distinct values ({ratio * 100:.1f}% of rows); "
+                               f"it looks like an identifier or free text rather than a category.",
+                'value': value,
+                'importance': 0.5
+            })
+    return insights
+
+
+def _time_axis(data, date_column, value_columns):
+    """Rows with a timestamp, sorted by it, as (float seconds, value matrix with column means for gaps)"""
+    frame = data[[date_column, *value_columns]].dropna(subset=[date_column]).sort_values(date_column)
+    t = frame[date_column].to_numpy(dtype='datetime64[ns]').astype(np.int64).astype(np.float64) / 1e9
+    values = frame[value_columns].to_numpy(dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        values = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+    return t, values
+
+
+@insight_detector('trend', requires=('datetime_columns', 'numeric_columns'), max_rows=50000)
+def detect_trend(context, data, budget):
+    """Linear trend of every numeric column over the first datetime column, fitted in one least-squares solve"""
+    datetime_columns, numeric_columns = context.stat('datetime_columns'), context.stat('numeric_columns')
+    if not datetime_columns or not numeric_columns:
+        return []
+    date_column = datetime_columns[0]
+    t, values = _time_axis(data, date_column, numeric_columns)
+    if len(t) < 10 or t[-1] == t[0]:
+        return []
+
+    design = np.column_stack([(t - t.mean()) / (t[-1] - t[0]), np.ones(len(t))])
+    coefficients = np.linalg.lstsq(design, values, rcond=None)[0]
+    residual = ((values - design @ coefficients) ** 2).sum(axis=0)
+    total = ((values - values.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = np.where(total > 0, 1 - residual / total, 0.0)
+        # Fitted change over the whole period, relative to the column's mean level
+        relative_change = coefficients[0] / np.abs(values.mean(axis=0))
+
+    insights = []
+    for i in np.argsort(-r2, kind='stable')[:5]:
+        if r2[i] < TREND_MIN_R2 or not np.isfinite(r2[i]):
+            break
+        column = numeric_columns[i]
+        change = f" ({relative_change[i] * 100:+.1f}% over the period)" if np.isfinite(relative_change[i]) else ''
+        insights.append({
+            'type': 'trend',
+            'column': column,
+            'description': f"Column '{column}' trends {'upward' if coefficients[0, i] > 0 else 'downward'} over "
+                           f"'{date_column}'{change}, R² {r2[i]:.2f}.",
+            'value': {'slope_per_period': float(coefficients[0, i]), 'r2': float(r2[i])},
+            'importance': float(min(r2[i], 1.0) * 0.8)
+        })
+    return insights
+
+
+def _format_period(seconds):
+    for unit, size in (('day', 86400), ('hour', 3600), ('minute', 60)):
+        if seconds >= size:
+            value = seconds / size
+            return f"{value:.3g} {unit}{'' if value == 1 else 's'}"
+    return f"{seconds:.3g} seconds"
+
+
+@insight_detector('seasonality', requires=('datetime_columns', 'numeric_columns'), budget=1.0, max_rows=200000)
+def detect_seasonality(context, data, budget):
+    """
+    Dominant period of each numeric column over the first datetime column: the series
+    is averaged onto a regular grid, detrended, and its autocorrelation (FFT, all
+    columns at once) searched for the highest local peak.
+    """
+    datetime_columns, numeric_columns = context.stat('datetime_columns'), context.stat('numeric_columns')
+    if not datetime_columns or not numeric_columns:
+        return []
+    date_column = datetime_columns[0]
+    t, values = _time_axis(data, date_column, numeric_columns)
+    steps = np.diff(np.unique(t))
+    if len(steps) < 8:
+        return []
+    # A whole multiple of the sampling interval, so regular series leave no grid cell empty
+    step = float(np.median(steps))
+    step *= max(np.ceil((t[-1] - t[0]) / step / SEASONALITY_MAX_POINTS), 1)
+
+    # Mean per grid cell; empty cells take the previous cell's value
+    cells = ((t - t[0]) // step).astype(np.int64)
+    n = int(cells[-1]) + 1
+    counts = np.bincount(cells, minlength=n)
+    grid = np.column_stack([np.bincount(cells, weights=values[:, i], minlength=n) for i in range(values.shape[1])])
+    filled = counts > 0
+    last_filled = np.maximum.accumulate(np.where(filled, np.arange(n), 0))
+    grid = (grid / np.maximum(counts, 1)[:, None])[last_filled]
+    if n < 16 or budget.exhausted():
+        return []
+
+    design = np.column_stack([np.arange(n, dtype=np.float64), np.ones(n)])
+    detrended = grid - design @ np.linalg.lstsq(design, grid, rcond=None)[0]
+    spectrum = np.fft.rfft(detrended, n=2 * n, axis=0)
+    acf = np.fft.irfft(spectrum * np.conj(spectrum), axis=0)[:n]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acf = acf / acf[0]
+
+    insights = []
+    lags = np.arange(2, n // 3)
+    if len(lags) < 2:
+        return []
+    for i, column in enumerate(numeric_columns):
+        column_acf = acf[:, i]
+        if not np.isfinite(column_acf[0]):
+            continue
+        # Peaks before the first zero crossing are just the series' smoothness, not a cycle
+        negative = np.flatnonzero(column_acf[:n // 3] < 0)
+        if len(negative) == 0:
+            continue
+        peaks = lags[(column_acf[lags] > column_acf[lags - 1]) & (column_acf[lags] >= column_acf[lags + 1])
+                     & (lags > negative[0])]
+        if len(peaks) == 0:
+            continue
+        lag = peaks[np.argmax(column_acf[peaks])]
+        strength = float(column_acf[lag])
+        if strength < SEASONALITY_MIN_AUTOCORRELATION:
+            continue
+        insights.append({
+            'type': 'seasonality',
+            'column': column,
+            'description': f"Column '{column}' repeats with a period of about {_format_period(lag * step)} "
+                           f"(autocorrelation {strength:.2f}).",
+            'value': {'period_seconds': float(lag * step), 'autocorrelation': strength},
+            'importance': 0.7 * strength
+        })
+    return insights
+
+
+@insight_detector('outlier_clusters', requires=('numeric_columns', 'outlier_bounds'), max_rows=100000)
+def detect_outlier_clusters(context, data, budget):
+    """
+    Rows that are outliers in several numeric columns at once. Cleaning caps
+    outliers at the 1.5*IQR fences, so values sitting on a fence mark them.
+    """
+    bounds = context.stat('outlier_bounds') or {}
+    columns = [column for column in context.stat('numeric_columns')
+               if column in bounds and bounds[column][1] > bounds[column][0]]
+    if len(columns) < 2 or len(data) == 0:
+        return []
+
+    lower = np.array([bounds[column][0] for column in columns], dtype=np.float64)
+    upper = np.array([bounds[column][1] for column in columns], dtype=np.float64)
+    # Tolerance for capped values stored in float32 columns
+    tolerance = 1e-6 * np.maximum(np.maximum(np.abs(lower), np.abs(upper)), upper - lower)
+    values = data[columns].to_numpy(dtype=np.float64)
+    extreme = (values <= lower + tolerance) | (values >= upper - tolerance)
+    clustered = extreme[extreme.sum(axis=1) >= 2].astype(np.float32)
+    share = len(clustered) / len(data)
+    if share < OUTLIER_CLUSTER_MIN_SHARE or len(clustered) < 5:
+        return []
+
+    # Co-occurrence of outliers between column pairs, as one matrix product
+    co_occurrence = clustered.T @ clustered
+    np.fill_diagonal(co_occurrence, 0)
+    first, second = np.unravel_index(np.argmax(co_occurrence), co_occurrence.shape)
+    rows = int(round(share * context.total_rows))
+    return [{
+        'type': 'outlier_cluster',
+        'column': f"{columns[first]} vs {columns[second]}",
+        'description': f"About {rows} rows ({share * 100:.1f}%) are outliers in two or more columns at once, "
+                       f"most often in '{columns[first]}' and '{columns[second]}' together.",
+        'value': {
+            'rows': rows,
+            'share': float(share),
+            'columns': [columns[first], columns[second]],
+            'pair_share': float(co_occurrence[first, second] / len(data)),
+            'sampled': len(data) < len(context.df),
+        },
+        'importance': float(min(0.5 + share * 5, 0.85))
+    }]
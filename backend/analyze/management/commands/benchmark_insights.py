@@ -0,0 +1,67 @@
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+from analyze.insights import INSIGHT_DETECTORS, run_insight_detectors
+from analyze.models import DataAnalysis
+from analyze.services import DataAnalysisService
+
+
+def make_insight_frame(rows, columns, seed=0):
+    """Hourly frame with trending, seasonal and noise columns plus an identifier and a category"""
+    rng = np.random.default_rng(seed)
+    hours = np.arange(rows)
+    data = {'timestamp': pd.date_range('2020-01-01', periods=rows, freq='h')}
+    for i in range(columns):
+        kind = i % 3
+        if kind == 0:
+            values = hours * 0.01 + rng.normal(size=rows)
+        elif kind == 1:
+            values = np.sin(2 * np.pi * hours / 24) + rng.normal(scale=0.3, size=rows)
+        else:
+            values = rng.normal(size=rows)
+        data[f'col_{i}'] = values
+    data['record_id'] = [f'r{i}' for i in rng.permutation(rows)]
+    data['segment'] = rng.choice(['a', 'b', 'c', 'd'], size=rows)
+    return pd.DataFrame(data)
+
+
+def make_service(df):
+    """Service over an in-memory frame, with nothing memoized yet"""
+    service = DataAnalysisService(DataAnalysis(missing_values_count=0, duplicates_count=0))
+    service.df = df
+    return service
+
+
+class Command(BaseCommand):
+    help = "Time every insight detector, sharing statistics across detectors versus one detector per run"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--columns', type=int, default=30)
+
+    def handle(self, *args, **options):
+        source = make_insight_frame(options['rows'], options['columns'])
+        self.stdout.write(f"Frame: {source.shape[0]} rows x {source.shape[1]} columns")
+        names = list(INSIGHT_DETECTORS)
+
+        # Every detector on its own, recomputing the statistics it declares
+        start = time.perf_counter()
+        for name in names:
+            run_insight_detectors(make_service(source), detectors=[name], total_budget=float('inf'))
+        isolated = time.perf_counter() - start
+
+        start = time.perf_counter()
+        insights, timings = run_insight_detectors(make_service(source), total_budget=float('inf'))
+        shared = time.perf_counter() - start
+
+        for statistic, seconds in timings['statistics'].items():
+            self.stdout.write(f"  statistic {statistic:<22} {seconds:.4f}s cpu")
+        for name, timing in timings['detectors'].items():
+            self.stdout.write(f"  detector  {name:<22} {timing['cpu']:.4f}s cpu, {timing['rows']} rows, "
+                              f"{timing['insights']} insights, {timing['status']}")
+        self.stdout.write(f"One detector per run: {isolated:.3f}s")
+        self.stdout.write(f"Shared statistics:    {shared:.3f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(insights)} insights from {len(names)} detectors; speedup {isolated / shared:.1f}x"
+        ))
@@ -0,0 +1,230 @@
+"""
+Serving of generated files (graph renders, reports, cleaned datasets, archives).
+Views resolve the file and its cache policy; how the bytes reach the client is
+up to the backend named by ANALYSIS_MEDIA_BACKEND, so a front proxy or the
+storage service can send them instead of the Django worker.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.module_loading import import_string
+
+MEDIA_CHUNK_SIZE = 1024 * 1024
+# URLs carrying the current version of their file never change content
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MEDIA_SIGNATURE_SALT = 'analyze.media'
+MEDIA_SIGNATURE_ROTATION = 24 * 60 * 60
+
+
+def file_version(path):
+    """
+    Version token of a file: changes whenever the file is rewritten, without
+    reading it (a true content digest of a large cleaned CSV would cost a full pass)
+    """
+    stat = os.stat(path)
+    identity = f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+
+
+class _MediaSigner(signing.TimestampSigner):
+    """
+    Timestamps rounded down to the day (or to half the URL lifetime if that is
+    shorter), so an analysis' URLs stay the same for that long and remain cacheable
+    """
+
+    def timestamp(self):
+        period = max(min(MEDIA_SIGNATURE_ROTATION, settings.ANALYSIS_MEDIA_URL_MAX_AGE // 2), 1)
+        now = int(time.time())
+        return signing.b62_encode(now - now % period)
+
+
+def media_signature(analysis_id):
+    """
+    ?sig= of the file and graph URLs of one analysis: a timestamp and a signature
+    of the analysis id. Browsers load those URLs through <img> and window.open,
+    which send no Authorization header, so the URL itself carries the owner's
+    access; it is only ever handed out to the owner.
+    """
+    signed = _MediaSigner(salt=MEDIA_SIGNATURE_SALT).sign(str(analysis_id))
+    return signed[len(str(analysis_id)) + 1:]
+
+
+def can_read_media(request, analysis):
+    """
+    True for the analysis owner, or for a request carrying a media signature of
+    the analysis issued within ANALYSIS_MEDIA_URL_MAX_AGE. A leaked URL thus stops
+    working after at most that long. The cost is that the ?sig= part of every URL
+    changes once a day (see _MediaSigner), and browsers fetch the file again under
+    the new URL even though its ?v= version, and so its content, is unchanged.
+    """
+    sig = request.GET.get('sig')
+    if sig:
+        try:
+            _MediaSigner(salt=MEDIA_SIGNATURE_SALT).unsign(
+                f'{analysis.id}:{sig}', max_age=settings.ANALYSIS_MEDIA_URL_MAX_AGE
+            )
+            return True
+        except signing.BadSignature:
+            pass
+    return request.user.is_authenticated and analysis.user_id == request.user.profile.id
+
+
+def media_name(path):
+    """Path of a file relative to MEDIA_ROOT, or None for files outside it"""
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(settings.MEDIA_ROOT))
+    if relative.startswith(os.pardir):
+        return None
+    return relative.replace(os.sep, '/')
+
+
+def _read_range(file, length):
+    """Yield `length` bytes of an open file from its current position, closing it afterwards"""
+    try:
+        while length > 0:
+            chunk = file.read(min(length, MEDIA_CHUNK_SIZE))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+async def _iterate_in_thread(iterator):
+    """Async view of a blocking iterator: each chunk is produced in a worker thread, one at a time"""
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def async_safe(request, response):
+    """
+    Under ASGI, Django reads a synchronous streaming iterator into a list before
+    sending any of it. Hand such responses an async iterator instead, which pulls
+    chunks through a thread as the client consumes them; WSGI responses are unchanged.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest) and response.streaming and not response.is_async:
+        response.streaming_content = _iterate_in_thread(iter(response.streaming_content))
+    return response
+
+
+def _content_disposition(filename, attachment):
+    return f'{"attachment" if attachment else "inline"}; filename="{filename}"'
+
+
+class DjangoMediaBackend:
+    """The worker sends the file itself, honouring single byte ranges (development, no proxy)"""
+
+    def serve(self, request, path, content_type, filename, attachment):
+        size = os.path.getsize(path)
+        match = re.fullmatch(r'bytes=(\d*)-(\d*)', request.META.get('HTTP_RANGE', '').strip())
+        # If-Range holds a validator of the copy the client has; ranges only apply to that copy
+        if_range = request.META.get('HTTP_IF_RANGE')
+        validators = (http_date(os.path.getmtime(path)), quote_etag(file_version(path)))
+        if match is None or match.groups() == ('', '') or (if_range and if_range not in validators):
+            response = FileResponse(open(path, 'rb'), content_type=content_type, as_attachment=attachment,
+                                    filename=filename)
+            response.block_size = MEDIA_CHUNK_SIZE
+        else:
+            first, last = match.groups()
+            if first == '':
+                start, end = max(size - int(last), 0), size - 1
+            else:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            if start > end:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+            file = open(path, 'rb')
+            file.seek(start)
+            response = StreamingHttpResponse(_read_range(file, end - start + 1), status=206, content_type=content_type)
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Disposition'] = _content_disposition(filename, attachment)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+
+class XAccelRedirectMediaBackend:
+    """
+    nginx sends the file from an internal location aliasing MEDIA_ROOT at
+    ANALYSIS_MEDIA_ACCEL_PREFIX; nginx also handles ranges. Files outside
+    MEDIA_ROOT fall back to the worker.
+    """
+
+    def serve(self, request, path, content_type, filename, attachment):
+        name = media_name(path)
+        if name is None:
+            return DjangoMediaBackend().serve(request, path, content_type, filename, attachment)
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.ANALYSIS_MEDIA_ACCEL_PREFIX.rstrip('/')}/{name}"
+        response['Content-Disposition'] = _content_disposition(filename, attachment)
+        return response
+
+
+class XSendfileMediaBackend:
+    """Apache (mod_xsendfile) or lighttpd sends the file named by absolute path"""
+
+    def serve(self, request, path, content_type, filename, attachment):
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(path)
+        response['Content-Disposition'] = _content_disposition(filename, attachment)
+        return response
+
+
+class StorageRedirectMediaBackend:
+    """Redirect to the file's URL on the default storage (object storage, CDN, or /media/ on the proxy)"""
+
+    def serve(self, request, path, content_type, filename, attachment):
+        name = media_name(path)
+        if name is None:
+            return DjangoMediaBackend().serve(request, path, content_type, filename, attachment)
+        return HttpResponseRedirect(default_storage.url(name))
+
+
+_backend = None
+
+
+def get_media_backend():
+    """Process-wide instance of the configured ANALYSIS_MEDIA_BACKEND class"""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.ANALYSIS_MEDIA_BACKEND)()
+    return _backend
+
+
+def serve_media(request, path, content_type=None, filename=None, attachment=False, immutable=False):
+    """
+    Response for a generated file with ETag/Last-Modified validators (304 when the
+    client's copy is current). `immutable` marks URLs that pin the file's version,
+    which browsers may then keep for a year without revalidating. Files the worker
+    sends itself are read chunk by chunk under ASGI too, never all at once.
+    """
+    etag = quote_etag(file_version(path))
+    last_modified = int(os.path.getmtime(path))
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        response = get_media_backend().serve(request, path, content_type, filename or os.path.basename(path), attachment)
+        if response.status_code in (301, 302):
+            return response  # the storage URL may expire; never cache the redirect itself
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if immutable:
+        patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return async_safe(request, response)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from .inference import CATEGORY_THRESHOLD, is_text_column
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = pd.StringDtype('pyarrow')
+except ImportError:  # without pyarrow, high-cardinality strings stay as object columns
+    STRING_DTYPE = None
+
+
+def _compact_column(series):
+    """Smallest dtype that represents the column without changing any value"""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        downcast = series.astype(np.float32)
+        # float32 only when every value survives the round trip (e.g. whole numbers, halves)
+        if np.array_equal(downcast.to_numpy(np.float64), series.to_numpy(np.float64), equal_nan=True):
+            return downcast
+        return series
+
+    if series.dtype == 'object':
+        # Columns that may later be parsed as dates or numbers are left for type inference
+        if pd.api.types.infer_dtype(series, skipna=True) != 'string' or not is_text_column(series):
+            return series
+        categorical = series.astype('category')
+        if len(categorical.cat.categories) / len(series) < CATEGORY_THRESHOLD:
+            return categorical
+        if STRING_DTYPE is not None:
+            return series.astype(STRING_DTYPE)
+
+    return series
+
+
+def optimize_dtypes(df):
+    """
+    Downcast numerics, turn low-cardinality strings into categories and other
+    strings into pyarrow-backed strings, in place. Returns the per-column
+    memory profile before and after.
+    """
+    memory_before = df.memory_usage(deep=True, index=False)
+    dtypes_before = df.dtypes.astype(str)
+
+    for column in df.columns:
+        series = df[column]
+        compacted = _compact_column(series)
+        if compacted is not series:
+            df[column] = compacted
+
+    memory_after = df.memory_usage(deep=True, index=False)
+    dtypes_after = df.dtypes.astype(str)
+
+    return {
+        'total_before': int(memory_before.sum()),
+        'total_after': int(memory_after.sum()),
+        'columns': {
+            str(column): {
+                'dtype_before': dtypes_before[column],
+                'dtype_after': dtypes_after[column],
+                'bytes_before': int(memory_before[column]),
+                'bytes_after': int(memory_after[column]),
+            }
+            for column in df.columns
+        },
+    }
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0013_generatedgraph_graph_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='dialect',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
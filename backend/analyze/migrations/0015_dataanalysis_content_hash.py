@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0014_dataanalysis_dialect'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0015_dataanalysis_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='pipeline_version',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0016_dataanalysis_pipeline_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='column_types',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0017_dataanalysis_column_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='memory_profile',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
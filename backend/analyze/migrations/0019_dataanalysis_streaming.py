@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0018_dataanalysis_memory_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='streaming',
+            field=models.BooleanField(default=False),
+        ),
+    ]
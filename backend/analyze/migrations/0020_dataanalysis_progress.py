@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0019_dataanalysis_streaming'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='progress_stage',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
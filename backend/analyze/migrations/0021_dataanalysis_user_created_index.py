@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0020_dataanalysis_progress'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dataanalysis',
+            index=models.Index(fields=['user', '-created_at'], name='analyze_dat_user_created_idx'),
+        ),
+    ]
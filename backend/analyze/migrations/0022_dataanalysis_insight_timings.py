@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0021_dataanalysis_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='insight_timings',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
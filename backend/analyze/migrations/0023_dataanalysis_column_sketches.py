@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyze', '0022_dataanalysis_insight_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataanalysis',
+            name='column_sketches',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
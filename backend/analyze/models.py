@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from accounts.models import Profile
 import uuid
@@ -15,15 +16,25 @@ class DataAnalysis(models.Model):
     user = models.ForeignKey(Profile, on_delete=models.CASCADE, null=True, blank=True)
     dataset_name = models.CharField(max_length=255,blank=True,null=True)
     original_file = models.FileField(upload_to='datasets/original/',blank=True,null=True)
+    streaming = models.BooleanField(default=False)  # Analysed chunk by chunk instead of in memory
     cleaned_file = models.FileField(upload_to='datasets/cleaned/', null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)  # SHA-256 of the uploaded file
+    pipeline_version = models.CharField(max_length=20, blank=True, default='')  # Version of the pipeline that produced the results
+    dialect = models.JSONField(null=True, blank=True)  # Detected CSV encoding/delimiter/quotechar/header row
     
     # Analysis results
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress_stage = models.CharField(max_length=50, blank=True, default='')  # Pipeline stage currently running
+    progress = models.PositiveSmallIntegerField(default=0)  # Percentage of pipeline stages started
     rows_count = models.IntegerField(null=True, blank=True)
     columns_count = models.IntegerField(null=True, blank=True)
     missing_values_count = models.IntegerField(null=True, blank=True)
     duplicates_count = models.IntegerField(null=True, blank=True)
     outliers_count = models.IntegerField(null=True, blank=True)
+    column_types = models.JSONField(null=True, blank=True)  # Inferred type (and datetime format) per column
+    memory_profile = models.JSONField(null=True, blank=True)  # Per-column dtype and bytes before/after dtype compaction
+    insight_timings = models.JSONField(null=True, blank=True)  # CPU/wall seconds per insight detector and shared statistic
+    column_sketches = models.JSONField(null=True, blank=True)  # Per-column sketch estimates (distinct, top values, quantiles) with error bounds
     
     # Generated files
     report_pdf = models.FileField(upload_to='reports/pdf/', null=True, blank=True)
@@ -37,6 +48,19 @@ class DataAnalysis(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Backs the per-user, newest-first analysis list and its cursor pagination
+            models.Index(fields=['user', '-created_at'], name='analyze_dat_user_created_idx'),
+        ]
+
+    def file_is_shared(self, name):
+        """True if another analysis references the same stored file (deduplicated uploads)"""
+        if not name:
+            return False
+        return DataAnalysis.objects.exclude(id=self.id).filter(
+            Q(original_file=name) | Q(cleaned_file=name) | Q(report_html=name)
+            | Q(report_pdf=name) | Q(graphs_zip=name)
+        ).exists()
 
 class AnalysisInsight(models.Model):
     analysis = models.ForeignKey(DataAnalysis, on_delete=models.CASCADE, related_name='insights')
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class AnalysisCursorPagination(CursorPagination):
+    """Newest-first cursor pages; stable while the pipeline inserts and updates rows"""
+    ordering = '-created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
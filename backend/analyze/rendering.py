@@ -0,0 +1,385 @@
+import os
+import tempfile
+import threading
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import seaborn as sns
+from .column_stats import compute_column_stats
+from .correlation import correlation_matrix
+
+# Raster output per render profile. Previews are sized for the UI's thumbnails and
+# encode quickly; print renders are full resolution and only produced on request.
+RENDER_PROFILES = {
+    'preview': {'dpi': 100, 'format': 'webp', 'pil_kwargs': {'quality': 80, 'method': 4}},
+    'print': {'dpi': 300, 'format': 'png'},
+}
+DEFAULT_RENDER_PROFILE = 'preview'
+
+SCATTER_MATRIX_MAX_COLUMNS = 6
+SCATTER_MATRIX_MAX_ROWS = 200000  # rows binned for the scatter matrix (uniform sample above this)
+SCATTER_MATRIX_SCATTER_POINTS = 5000  # above this, off-diagonal cells are density images
+SCATTER_MATRIX_BINS = 50
+
+# Graph rendering is kept free of database access and service state so each job
+# can run in any process (request handler, Celery worker) against a read-only frame.
+
+
+def plan_graph_jobs(df, total_rows=None, column_stats=None, correlation=None):
+    """
+    List of graph jobs (type plus columns) to render for a cleaned frame.
+    Histogram and box plot jobs carry the column's precomputed statistics;
+    the scatter matrix columns are picked from the precomputed correlation.
+    """
+    column_stats = column_stats or {}
+    numeric_columns = list(df.select_dtypes(include=[np.number]).columns)
+    categorical_columns = list(df.select_dtypes(include=['object', 'category', 'string']).columns)
+    datetime_columns = list(df.select_dtypes(include=['datetime64']).columns)
+
+    jobs = [{'graph_type': 'overview', 'columns': ['all'], 'total_rows': total_rows or len(df)}]
+    jobs += [{'graph_type': 'histogram', 'columns': [col], 'stats': column_stats.get(col)} for col in numeric_columns]
+    jobs += [{'graph_type': 'boxplot', 'columns': [col], 'stats': column_stats.get(col)} for col in numeric_columns]
+    jobs += [{'graph_type': 'countplot', 'columns': [col]} for col in categorical_columns[:5]]
+
+    if len(numeric_columns) > 1:
+        jobs.append({'graph_type': 'correlation', 'columns': numeric_columns})
+        scatter_columns = select_scatter_columns(df, numeric_columns, correlation=correlation)
+        jobs.append({'graph_type': 'scatter', 'columns': scatter_columns})
+
+    if len(datetime_columns) > 0 and len(numeric_columns) > 0:
+        jobs.append({'graph_type': 'timeseries', 'columns': [datetime_columns[0], numeric_columns[0]]})
+    return jobs
+
+
+# Title and description templates per graph type, formatted with the job's columns
+GRAPH_DESCRIPTIONS = {
+    'overview': ('Dataset Overview', 'Overview of the dataset structure and basic statistics'),
+    'histogram': ('Histogram - {0}', 'Distribution analysis of {0}'),
+    'boxplot': ('Box Plot - {0}', 'Outlier analysis of {0}'),
+    'countplot': ('Count Plot - {0}', 'Frequency analysis of {0} categories'),
+    'correlation': ('Correlation Heatmap', 'Correlation analysis between numeric variables'),
+    'scatter': ('Scatter Matrix', 'Pairwise relationships between numeric variables'),
+    'timeseries': ('Time Series - {1}', 'Temporal analysis of {1} over time'),
+}
+
+
+def graph_record(job, file_path=''):
+    """GeneratedGraph fields of a job; known before rendering, so graphs can be registered unrendered"""
+    title, description = GRAPH_DESCRIPTIONS[job['graph_type']]
+    return dict(
+        graph_type=job['graph_type'],
+        column_names=list(job['columns']),
+        file_path=file_path,
+        title=title.format(*job['columns']),
+        description=description.format(*job['columns']),
+    )
+
+
+def job_for_graph(graph_type, columns, total_rows=None, column_stats=None, correlation=None,
+                  correlation_method='pearson', value_counts=None):
+    """Rebuild the render job of a stored graph record"""
+    job = {'graph_type': graph_type, 'columns': list(columns)}
+    if graph_type == 'overview':
+        job['total_rows'] = total_rows
+    elif graph_type in ('histogram', 'boxplot'):
+        job['stats'] = (column_stats or {}).get(columns[0])
+    elif graph_type == 'correlation':
+        if correlation is not None and set(columns) <= set(correlation.columns):
+            job['matrix'] = correlation.loc[list(columns), list(columns)]
+        job['method'] = correlation_method
+    elif graph_type == 'countplot' and value_counts is not None and columns[0] in value_counts:
+        # Counts over all rows (heavy-hitter sketch), not just the rows of a sampled frame
+        job['value_counts'] = value_counts[columns[0]]
+    return job
+
+
+# pyplot keeps a global current figure, so threads of one process render one at a time
+_render_lock = threading.Lock()
+
+
+def render_graph(df, job, graphs_dir, profile=DEFAULT_RENDER_PROFILE):
+    """Render one graph job; returns the GeneratedGraph fields, or None if rendering failed"""
+    with _render_lock:
+        try:
+            # Reset global pyplot/seaborn state so jobs render the same in any order or process
+            plt.style.use('default')
+            sns.set_palette("husl")
+            return RENDERERS[job['graph_type']](df, job, graphs_dir, profile)
+        except Exception as e:
+            print(f"Error creating {job['graph_type']} for {job['columns']}: {str(e)}")
+            plt.close('all')
+            return None
+
+
+def graph_file_path(graphs_dir, name, profile):
+    """Output path of a graph for a render profile (the default profile keeps the plain name)"""
+    suffix = '' if profile == DEFAULT_RENDER_PROFILE else f'.{profile}'
+    return os.path.join(graphs_dir, f"{name}{suffix}.{RENDER_PROFILES[profile]['format']}")
+
+
+def _save_figure(graphs_dir, name, profile):
+    """
+    Save the current figure with the render profile's format and DPI; returns its
+    path. The image is written to a temp file and renamed into place, so readers
+    never see a partial file and concurrent renders of the same graph cannot interleave.
+    """
+    options = RENDER_PROFILES[profile]
+    file_path = graph_file_path(graphs_dir, name, profile)
+    fd, tmp_path = tempfile.mkstemp(dir=graphs_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        plt.savefig(tmp_path, format=options['format'], dpi=options['dpi'], bbox_inches='tight',
+                    pil_kwargs=options.get('pil_kwargs'))
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return file_path
+
+
+def _render_overview(df, job, graphs_dir, profile):
+    """Create dataset overview visualization"""
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle('Dataset Overview', fontsize=16, fontweight='bold')
+
+    # Data types distribution
+    dtype_counts = df.dtypes.value_counts()
+    axes[0, 0].pie(dtype_counts.values, labels=dtype_counts.index, autopct='%1.1f%%')
+    axes[0, 0].set_title('Data Types Distribution')
+
+    # Missing values heatmap
+    if df.isnull().sum().sum() > 0:
+        sns.heatmap(df.isnull(), ax=axes[0, 1], cbar=True, yticklabels=False)
+        axes[0, 1].set_title('Missing Values Pattern')
+    else:
+        axes[0, 1].text(0.5, 0.5, 'No Missing Values', ha='center', va='center', transform=axes[0, 1].transAxes)
+        axes[0, 1].set_title('Missing Values Pattern')
+
+    # Column info
+    info_text = f"Rows: {job['total_rows']}\nColumns: {len(df.columns)}\nMemory Usage: {df.memory_usage(deep=True).sum() / 1024**2:.2f} MB"
+    axes[1, 0].text(0.1, 0.5, info_text, transform=axes[1, 0].transAxes, fontsize=12, verticalalignment='center')
+    axes[1, 0].set_title('Dataset Statistics')
+    axes[1, 0].axis('off')
+
+    # Numeric vs Categorical columns
+    numeric_count = len(df.select_dtypes(include=[np.number]).columns)
+    categorical_count = len(df.select_dtypes(include=['object', 'category', 'string']).columns)
+    datetime_count = len(df.select_dtypes(include=['datetime64']).columns)
+
+    column_types = ['Numeric', 'Categorical', 'Datetime']
+    counts = [numeric_count, categorical_count, datetime_count]
+    axes[1, 1].bar(column_types, counts, color=['skyblue', 'lightcoral', 'lightgreen'])
+    axes[1, 1].set_title('Column Types Distribution')
+    axes[1, 1].set_ylabel('Count')
+
+    plt.tight_layout()
+    file_path = _save_figure(graphs_dir, 'dataset_overview', profile)
+    plt.close()
+
+    return graph_record(job, file_path)
+
+
+def select_scatter_columns(df, numeric_columns, max_columns=SCATTER_MATRIX_MAX_COLUMNS, correlation=None):
+    """Columns taking part in the strongest pairwise correlations, at most `max_columns` of them"""
+    numeric_columns = list(numeric_columns)
+    if len(numeric_columns) <= max_columns:
+        return numeric_columns
+
+    if correlation is None or not set(numeric_columns) <= set(correlation.columns):
+        correlation = correlation_matrix(df[numeric_columns])
+    corr = np.nan_to_num(np.abs(correlation.loc[numeric_columns, numeric_columns].to_numpy()))
+    rows, cols = np.triu_indices(len(numeric_columns), k=1)
+    selected = []
+    for pair in np.argsort(-corr[rows, cols], kind='stable'):
+        for index in (rows[pair], cols[pair]):
+            if index not in selected and len(selected) < max_columns:
+                selected.append(index)
+        if len(selected) == max_columns:
+            break
+    return [numeric_columns[i] for i in sorted(selected)]
+
+
+def _render_scatter_matrix(df, job, graphs_dir, profile):
+    """
+    Create scatter matrix for the most correlated numeric columns. Diagonal
+    cells are pre-binned histograms; off-diagonal cells are plain scatters for
+    small frames and 2D-binned density images otherwise, so drawing cost
+    depends on the bin count rather than the row count.
+    """
+    numeric_columns = select_scatter_columns(df, job['columns'])
+    values = df[numeric_columns].to_numpy(dtype=np.float64)
+    if len(values) > SCATTER_MATRIX_MAX_ROWS:
+        rng = np.random.default_rng(0)
+        values = values[rng.choice(len(values), SCATTER_MATRIX_MAX_ROWS, replace=False)]
+
+    k = len(numeric_columns)
+    fig, axes = plt.subplots(k, k, figsize=(2.5 * k, 2.5 * k), squeeze=False)
+    for i in range(k):
+        for j in range(k):
+            ax = axes[i, j]
+            if i == j:
+                data = values[:, i][np.isfinite(values[:, i])]
+                counts, edges = np.histogram(data, bins=SCATTER_MATRIX_BINS)
+                ax.stairs(counts, edges, fill=True, alpha=0.6)
+            else:
+                x, y = values[:, j], values[:, i]
+                finite = np.isfinite(x) & np.isfinite(y)
+                x, y = x[finite], y[finite]
+                if len(x) <= SCATTER_MATRIX_SCATTER_POINTS:
+                    ax.scatter(x, y, s=6, alpha=0.6)
+                elif len(x) > 0:
+                    density, x_edges, y_edges = np.histogram2d(x, y, bins=SCATTER_MATRIX_BINS)
+                    ax.imshow(np.log1p(density.T), origin='lower', aspect='auto', cmap='Blues',
+                              extent=[x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]])
+            if i == k - 1:
+                ax.set_xlabel(numeric_columns[j])
+            else:
+                ax.set_xticklabels([])
+            if j == 0:
+                ax.set_ylabel(numeric_columns[i])
+            else:
+                ax.set_yticklabels([])
+
+    fig.suptitle('Scatter Matrix of Numeric Variables', y=1.02, fontsize=16, fontweight='bold')
+    plt.tight_layout()
+    file_path = _save_figure(graphs_dir, 'scatter_matrix', profile)
+    plt.close('all')
+
+    return graph_record(job, file_path)
+
+
+def _job_stats(df, job):
+    """Precomputed statistics of the job's column, computed from the frame if the job has none"""
+    column = job['columns'][0]
+    return job.get('stats') or compute_column_stats(df[[column]])[column]
+
+
+def _render_histogram(df, job, graphs_dir, profile):
+    """Create histogram for numeric column from its pre-binned counts"""
+    column = job['columns'][0]
+    stats = _job_stats(df, job)
+    plt.figure(figsize=(10, 6))
+
+    plt.stairs(stats['bin_counts'], stats['bin_edges'], fill=True, alpha=0.7, color='skyblue')
+    plt.stairs(stats['bin_counts'], stats['bin_edges'], color='black', linewidth=0.8)
+    plt.axvline(stats['mean'], color='red', linestyle='--', label=f"Mean: {stats['mean']:.2f}")
+    plt.axvline(stats['median'], color='green', linestyle='--', label=f"Median: {stats['median']:.2f}")
+
+    plt.title(f'Distribution of {column}', fontsize=14, fontweight='bold')
+    plt.xlabel(column)
+    plt.ylabel('Frequency')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+    file_path = _save_figure(graphs_dir, f'histogram_{column}', profile)
+    plt.close()
+
+    if not os.path.exists(file_path):
+        raise Exception(f"Failed to save graph at {file_path}")
+
+    return graph_record(job, file_path)
+
+
+def _render_boxplot(df, job, graphs_dir, profile):
+    """Create boxplot for numeric column from its precomputed quartiles and whiskers"""
+    column = job['columns'][0]
+    stats = _job_stats(df, job)
+    plt.figure(figsize=(8, 6))
+
+    box = {key: stats[key] for key in ('q1', 'median', 'q3', 'whislo', 'whishi')}
+    box['med'] = box.pop('median')
+    box_plot = plt.gca().bxp([box], patch_artist=True, showfliers=False)
+    box_plot['boxes'][0].set_facecolor('lightblue')
+
+    plt.title(f'Box Plot of {column}', fontsize=14, fontweight='bold')
+    plt.ylabel(column)
+    plt.grid(True, alpha=0.3)
+
+    file_path = _save_figure(graphs_dir, f'boxplot_{column}', profile)
+    plt.close()
+
+    return graph_record(job, file_path)
+
+
+def _render_countplot(df, job, graphs_dir, profile):
+    """Create count plot for categorical column"""
+    column = job['columns'][0]
+    plt.figure(figsize=(12, 6))
+
+    value_counts = job.get('value_counts')
+    if value_counts is None:
+        value_counts = df[column].value_counts()
+    value_counts = value_counts.head(10)  # Top 10 categories
+
+    plt.bar(range(len(value_counts)), value_counts.values, color='lightcoral')
+    plt.title(f'Count Plot of {column}', fontsize=14, fontweight='bold')
+    plt.xlabel(column)
+    plt.ylabel('Count')
+    plt.xticks(range(len(value_counts)), value_counts.index, rotation=45, ha='right')
+    plt.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+
+    file_path = _save_figure(graphs_dir, f'countplot_{column}', profile)
+    plt.close()
+
+    return graph_record(job, file_path)
+
+
+def _render_correlation_heatmap(df, job, graphs_dir, profile):
+    """Create correlation heatmap"""
+    numeric_columns = job['columns']
+    plt.figure(figsize=(12, 10))
+
+    # The matrix computed once by the pipeline; recomputed only for graph sources without one
+    matrix = job.get('matrix')
+    if matrix is None:
+        matrix = correlation_matrix(df[numeric_columns], job.get('method', 'pearson'))
+
+    mask = np.triu(np.ones_like(matrix, dtype=bool))
+    sns.heatmap(matrix, annot=True, cmap='coolwarm', center=0,
+                square=True, mask=mask, cbar_kws={'label': 'Correlation Coefficient'})
+
+    title = 'Correlation Heatmap' if job.get('method', 'pearson') == 'pearson' else 'Correlation Heatmap (Spearman)'
+    plt.title(title, fontsize=14, fontweight='bold')
+    plt.tight_layout()
+
+    file_path = _save_figure(graphs_dir, 'correlation_heatmap', profile)
+    plt.close()
+
+    return graph_record(job, file_path)
+
+
+def _render_timeseries(df, job, graphs_dir, profile):
+    """Create time series plot"""
+    date_col, value_col = job['columns']
+    plt.figure(figsize=(14, 6))
+
+    # Sort by date
+    df_sorted = df.sort_values(date_col)
+
+    plt.plot(df_sorted[date_col], df_sorted[value_col], linewidth=2, color='navy')
+    plt.title(f'Time Series: {value_col} over {date_col}', fontsize=14, fontweight='bold')
+    plt.xlabel(date_col)
+    plt.ylabel(value_col)
+    plt.grid(True, alpha=0.3)
+    plt.xticks(rotation=45)
+
+    plt.tight_layout()
+
+    file_path = _save_figure(graphs_dir, f'timeseries_{date_col}_{value_col}', profile)
+    plt.close()
+
+    return graph_record(job, file_path)
+
+
+RENDERERS = {
+    'overview': _render_overview,
+    'histogram': _render_histogram,
+    'boxplot': _render_boxplot,
+    'countplot': _render_countplot,
+    'correlation': _render_correlation_heatmap,
+    'scatter': _render_scatter_matrix,
+    'timeseries': _render_timeseries,
+}
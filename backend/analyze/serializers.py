@@ -1,5 +1,10 @@
+import os
 from rest_framework import serializers
+from django.conf import settings
+from django.urls import reverse
 from .models import DataAnalysis, AnalysisInsight, GeneratedGraph
+from .media import file_version, media_signature
+from .services import DataAnalysisService
 
 class AnalysisInsightSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,22 +13,68 @@ class AnalysisInsightSerializer(serializers.ModelSerializer):
 
 class GeneratedGraphSerializer(serializers.ModelSerializer):
     graph_url = serializers.SerializerMethodField()
+    print_url = serializers.SerializerMethodField()
+    data_url = serializers.SerializerMethodField()
 
     class Meta:
         model = GeneratedGraph
         fields = '__all__'
 
+    def _image_url(self, obj, profile):
+        # Graphs are rendered lazily the first time this URL is requested; ?v= pins the
+        # render's version so the response can be cached indefinitely, ?sig= grants access
+        url = reverse('graph_image', kwargs={'analysis_id': obj.analysis_id, 'graph_id': obj.id})
+        version = DataAnalysisService(obj.analysis).graph_version(obj, profile)
+        query = f'v={version}&sig={media_signature(obj.analysis_id)}'
+        if profile != settings.ANALYSIS_GRAPH_PROFILE:
+            return f'{url}?profile={profile}&{query}'
+        return f'{url}?{query}'
+
     def get_graph_url(self, obj):
-        if obj.file_path:
-            # Ensure proper MEDIA_URL prefix
-            from django.conf import settings
-            return settings.MEDIA_URL + obj.file_path
-        return None
+        return self._image_url(obj, settings.ANALYSIS_GRAPH_PROFILE)
+
+    def get_print_url(self, obj):
+        return self._image_url(obj, 'print')
+
+    def get_data_url(self, obj):
+        return reverse('graph_data', kwargs={'analysis_id': obj.analysis_id, 'graph_id': obj.id})
 
 class DataAnalysisSerializer(serializers.ModelSerializer):
+    report_url = serializers.SerializerMethodField()
+    cleaned_file_url = serializers.SerializerMethodField()
+
+    # Model fields the computed fields read, for querysets limited with only()
+    field_sources = {'report_url': 'report_html', 'cleaned_file_url': 'cleaned_file'}
+
     class Meta:
         model = DataAnalysis
         fields = '__all__'
+
+    def __init__(self, *args, fields=None, **kwargs):
+        # Optional sparse fieldset: serialize only the named fields
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def _file_url(self, obj, field_file, kind):
+        # Versioned, signed URL of a generated file, served with long-lived caching
+        if not field_file or not os.path.exists(field_file.path):
+            return None
+        url = reverse('analysis_file', kwargs={'analysis_id': obj.id, 'kind': kind})
+        return f'{url}?v={file_version(field_file.path)}&sig={media_signature(obj.id)}'
+
+    def get_report_url(self, obj):
+        return self._file_url(obj, obj.report_html, 'report')
+
+    def get_cleaned_file_url(self, obj):
+        return self._file_url(obj, obj.cleaned_file, 'cleaned')
+
+class DataAnalysisDetailSerializer(DataAnalysisSerializer):
+    """Analysis with its prefetched top insights and graphs"""
+    insights = AnalysisInsightSerializer(source='top_insights', many=True, read_only=True)
+    insights_total = serializers.IntegerField(read_only=True)
+    graphs = GeneratedGraphSerializer(many=True, read_only=True)
   
 class GraphSelectionSerializer(serializers.Serializer):
     graph_types = serializers.ListField(
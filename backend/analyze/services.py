@@ -1,25 +1,197 @@
 import pandas as pd
 import numpy as np
-import matplotlib 
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
 import warnings
 warnings.filterwarnings('ignore')
 import os
-from scipy import stats
+import json
+import hashlib
+import shutil
+import tempfile
 from django.conf import settings
-from .models import AnalysisInsight, GeneratedGraph
+from django.db import transaction
+from .models import DataAnalysis, AnalysisInsight, GeneratedGraph
+from .dialect import sniff_csv_dialect
+from .cache import (
+    archive_cache_path, compute_content_hash, delete_cached_frame, delete_cached_graphs, graph_cache_dir,
+    graph_cache_path, read_cached_frame, read_cached_graph, store_cached_graph, write_cached_frame,
+)
+from .inference import CATEGORY_THRESHOLD, detect_datetime_format, infer_column_type
+from .memory import optimize_dtypes
+from .streaming import CorrelationAccumulator, HistogramAccumulator, StreamingProfile, sketch_frame, sketch_quantiles
+from .column_stats import HISTOGRAM_BINS, accumulator_stats, compute_column_stats, sketch_summary
+from .chart_data import TOP_VALUES, chart_data
+from .correlation import correlation_matrix
+from .insights import run_insight_detectors
+from .rendering import RENDER_PROFILES, graph_record, job_for_graph, plan_graph_jobs, render_graph
+
+# Bump whenever cleaning/insight/graph output changes so deduplicated uploads are not served stale results
+PIPELINE_VERSION = '9'
+
+
+_graph_sources = {}
+
+
+def _load_graph_source(source_path):
+    """Kept graph source, unpickled once per process and reused while the file is unchanged"""
+    mtime = os.path.getmtime(source_path)
+    cached = _graph_sources.get(source_path)
+    if cached is None or cached[0] != mtime:
+        _graph_sources.clear()
+        cached = _graph_sources[source_path] = (mtime, pd.read_pickle(source_path))
+    return cached[1]
+
+
+def find_reusable_analysis(content_hash, file_extension):
+    """Completed analysis of identical content (and format) produced by the current pipeline version"""
+    if not content_hash:
+        return None
+    candidates = DataAnalysis.objects.filter(
+        content_hash=content_hash,
+        pipeline_version=PIPELINE_VERSION,
+        status='completed',
+    ).order_by('created_at')
+    for candidate in candidates:
+        if os.path.splitext(candidate.original_file.name or '')[1].lower() == file_extension:
+            return candidate
+    return None
+
+
+def clone_analysis(source, user, dataset_name):
+    """
+    Create a completed analysis for `user` that shares the content-addressed files
+    of `source` and copies its insights and graph records instead of recomputing
+    them. The HTML report names the dataset and its dates, so the clone gets its own.
+    """
+    with transaction.atomic():
+        analysis = DataAnalysis.objects.create(
+            user=user,
+            dataset_name=dataset_name,
+            original_file=source.original_file.name,
+            cleaned_file=source.cleaned_file.name,
+            graphs_zip=source.graphs_zip.name,
+            content_hash=source.content_hash,
+            pipeline_version=source.pipeline_version,
+            dialect=source.dialect,
+            column_types=source.column_types,
+            streaming=source.streaming,
+            memory_profile=source.memory_profile,
+            insight_timings=source.insight_timings,
+            column_sketches=source.column_sketches,
+            status='completed',
+            progress_stage='completed',
+            progress=100,
+            rows_count=source.rows_count,
+            columns_count=source.columns_count,
+            missing_values_count=source.missing_values_count,
+            duplicates_count=source.duplicates_count,
+            outliers_count=source.outliers_count,
+            processing_time=source.processing_time,
+        )
+        AnalysisInsight.objects.bulk_create([
+            AnalysisInsight(
+                analysis=analysis,
+                insight_type=insight.insight_type,
+                column_name=insight.column_name,
+                description=insight.description,
+                value=insight.value,
+                importance_score=insight.importance_score,
+            )
+            for insight in source.insights.all()
+        ])
+        GeneratedGraph.objects.bulk_create([
+            GeneratedGraph(
+                analysis=analysis,
+                graph_type=graph.graph_type,
+                column_names=graph.column_names,
+                file_path=graph.file_path,
+                graph_file=graph.graph_file.name,
+                title=graph.title,
+                description=graph.description,
+            )
+            for graph in source.graphs.all()
+        ])
+    DataAnalysisService(analysis).generate_clone_report()
+    return analysis
+
+
+def clean_column_names(columns):
+    """Lowercase, underscore spaces and strip other special characters"""
+    return columns.str.lower().str.replace(' ', '_').str.replace('[^a-zA-Z0-9_]', '', regex=True)
+
 
 class DataAnalysisService:
     def __init__(self, analysis_instance):
         self.analysis = analysis_instance
         self.df = None
-        self.original_df = None
+        self.profile = None  # StreamingProfile when the dataset is analysed in streaming mode
+        self.column_stats = None  # per-column statistics of the cleaned data, see get_column_stats
+        self.correlation = None  # correlation matrix of the cleaned data, see get_correlation
+        self.sketches = None  # approximate per-column accumulators of the cleaned frame (ANALYSIS_APPROXIMATE_STATS)
+        self.outlier_bounds = None  # IQR fences numeric columns were capped to, see get_outlier_bounds
+        self.source_rows = None  # rows of the cleaned data when self.df was restored from the graph source
         self.insights = []
         self.graphs = []
-        self.graphs_dir = os.path.join(settings.MEDIA_ROOT,"graphs")
-        os.makedirs(self.graphs_dir, exist_ok=True)
+        self._dirty_fields = set()
+        self.work_dir = os.path.join(settings.MEDIA_ROOT, "work", str(self.analysis.id))
+
+    def _set_fields(self, **fields):
+        """Change analysis fields in memory; they are written by the next save_changes()"""
+        for name, value in fields.items():
+            setattr(self.analysis, name, value)
+        self._dirty_fields.update(fields)
+
+    def save_changes(self):
+        """
+        Write only the analysis fields changed since the last call, so stages never
+        overwrite columns other writers own (status, processing time, progress, files).
+        """
+        if self._dirty_fields:
+            self.analysis.save(update_fields=[*sorted(self._dirty_fields), 'updated_at'])
+            self._dirty_fields.clear()
+
+    def save_checkpoint(self, stage):
+        """Persist the current DataFrame (and streaming profile) so the next pipeline task can pick it up"""
+        os.makedirs(self.work_dir, exist_ok=True)
+        if self.df is not None:
+            self.df.to_pickle(os.path.join(self.work_dir, f"{stage}.pkl"))
+        if self.profile is not None:
+            pd.to_pickle(self.profile, os.path.join(self.work_dir, f"{stage}.profile.pkl"))
+        if self.column_stats is not None:
+            pd.to_pickle(self.column_stats, os.path.join(self.work_dir, f"{stage}.stats.pkl"))
+        if self.correlation is not None:
+            pd.to_pickle(self.correlation, os.path.join(self.work_dir, f"{stage}.corr.pkl"))
+        if self.sketches is not None:
+            pd.to_pickle(self.sketches, os.path.join(self.work_dir, f"{stage}.sketches.pkl"))
+        if self.outlier_bounds is not None:
+            pd.to_pickle(self.outlier_bounds, os.path.join(self.work_dir, f"{stage}.bounds.pkl"))
+
+    def load_checkpoint(self, stage):
+        """Restore the DataFrame (and streaming profile) saved by a previous pipeline task"""
+        checkpoint_path = os.path.join(self.work_dir, f"{stage}.pkl")
+        profile_path = os.path.join(self.work_dir, f"{stage}.profile.pkl")
+        if not os.path.exists(checkpoint_path) and not os.path.exists(profile_path):
+            return False
+        if os.path.exists(checkpoint_path):
+            self.df = pd.read_pickle(checkpoint_path)
+        if os.path.exists(profile_path):
+            self.profile = pd.read_pickle(profile_path)
+        stats_path = os.path.join(self.work_dir, f"{stage}.stats.pkl")
+        if os.path.exists(stats_path):
+            self.column_stats = pd.read_pickle(stats_path)
+        correlation_path = os.path.join(self.work_dir, f"{stage}.corr.pkl")
+        if os.path.exists(correlation_path):
+            self.correlation = pd.read_pickle(correlation_path)
+        sketches_path = os.path.join(self.work_dir, f"{stage}.sketches.pkl")
+        if os.path.exists(sketches_path):
+            self.sketches = pd.read_pickle(sketches_path)
+        bounds_path = os.path.join(self.work_dir, f"{stage}.bounds.pkl")
+        if os.path.exists(bounds_path):
+            self.outlier_bounds = pd.read_pickle(bounds_path)
+        return True
+
+    def clear_checkpoints(self):
+        """Remove intermediate DataFrames once the pipeline is done"""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
 
     def load_data(self):
         """Load data from uploaded file"""
@@ -27,22 +199,15 @@ class DataAnalysisService:
         file_extension = os.path.splitext(file_path)[1].lower()
         
         try:
+            content_hash = self._content_hash(file_path)
+            self.df = read_cached_frame(content_hash)
+            if self.df is not None:
+                return True
+
             if file_extension == '.csv':
-                # Try different encodings and separators
-                for encoding in ['utf-8', 'latin-1', 'cp1252']:
-                    try:
-                        for sep in [',', ';', '\t']:
-                            try:
-                                df = pd.read_csv(file_path, encoding=encoding, sep=sep)
-                                if df.shape[1] > 1:  # Valid if more than 1 column
-                                    self.df = df
-                                    break
-                            except:
-                                continue
-                        if self.df is not None:
-                            break
-                    except:
-                        continue
+                self.df = self._read_csv(file_path)
+                if self.df.shape[1] <= 1:  # Valid if more than 1 column
+                    raise ValueError("Could not detect CSV delimiter")
                         
             elif file_extension in ['.xlsx', '.xls']:
                 self.df = pd.read_excel(file_path)
@@ -55,14 +220,64 @@ class DataAnalysisService:
             
             if self.df is None or self.df.empty:
                 raise ValueError("Could not load data or file is empty")
-                
-            self.original_df = self.df.copy()
+
+            write_cached_frame(content_hash, self.df)
             return True
             
         except Exception as e:
             print(f"Error loading data: {str(e)}")
             return False
     
+    def _content_hash(self, file_path):
+        """Content hash of the upload, computed once and stored on the analysis"""
+        if not self.analysis.content_hash:
+            self._set_fields(content_hash=compute_content_hash(file_path))
+            self.save_changes()
+        return self.analysis.content_hash
+
+    def _csv_dialect(self, file_path):
+        """Sniffed (or previously recorded) CSV dialect of the upload"""
+        if not self.analysis.dialect:
+            self._set_fields(dialect=sniff_csv_dialect(file_path))
+            self.save_changes()
+        return self.analysis.dialect
+
+    def _fallback_to_latin1(self):
+        """Prefix decoded cleanly but later bytes did not; latin-1 accepts any byte"""
+        self._set_fields(dialect={**self.analysis.dialect, 'encoding': 'latin-1'})
+        self.save_changes()
+
+    def _csv_read_kwargs(self, dialect):
+        return dict(
+            encoding=dialect['encoding'],
+            sep=dialect['delimiter'],
+            quotechar=dialect['quotechar'],
+            header=dialect['header_row'],
+        )
+
+    def _read_csv(self, file_path):
+        """Parse a CSV in one pass using the sniffed (or previously recorded) dialect"""
+        dialect = self._csv_dialect(file_path)
+        try:
+            return pd.read_csv(file_path, **self._csv_read_kwargs(dialect))
+        except UnicodeDecodeError:
+            self._fallback_to_latin1()
+            return pd.read_csv(file_path, **self._csv_read_kwargs(dialect))
+
+    def _read_csv_chunks(self, file_path):
+        """Iterate over the CSV in chunks of ANALYSIS_STREAMING_CHUNK_ROWS rows"""
+        dialect = self._csv_dialect(file_path)
+        return pd.read_csv(file_path, chunksize=settings.ANALYSIS_STREAMING_CHUNK_ROWS,
+                           **self._csv_read_kwargs(dialect))
+
+    def optimize_memory(self):
+        """Compact dtypes after loading and record per-column memory before/after"""
+        if self.df is None:
+            return False
+        self._set_fields(memory_profile=optimize_dtypes(self.df))
+        self.save_changes()
+        return True
+
     def clean_data(self):
         """Automatic data cleaning"""
         if self.df is None:
@@ -73,82 +288,38 @@ class DataAnalysisService:
             original_rows = len(self.df)
             
             # 1. Clean column names
-            self.df.columns = self.df.columns.str.lower().str.replace(' ', '_').str.replace('[^a-zA-Z0-9_]', '', regex=True)
+            self.df.columns = clean_column_names(self.df.columns)
             
             # 2. Handle duplicates
             duplicates_count = self.df.duplicated().sum()
             self.df = self.df.drop_duplicates()
             
             # 3. Handle missing values
-            missing_before = self.df.isnull().sum().sum()
-            
-            for column in self.df.columns:
-                missing_pct = self.df[column].isnull().sum() / len(self.df)
-                
-                if missing_pct > 0.5:  # Drop columns with >50% missing
-                    self.df = self.df.drop(column, axis=1)
-                    continue
-                
-                if self.df[column].dtype in ['object', 'string']:
-                    # Fill categorical with mode
-                    mode_value = self.df[column].mode()
-                    if not mode_value.empty:
-                        self.df[column] = self.df[column].fillna(mode_value[0])
-                    else:
-                        self.df[column] = self.df[column].fillna('Unknown')
-                        
-                elif self.df[column].dtype in ['int64', 'float64']:
-                    # Fill numerical with median
-                    median_value = self.df[column].median()
-                    self.df[column] = self.df[column].fillna(median_value)
+            missing_before = self._fill_missing_values()
             
             # 4. Data type conversion
-            for column in self.df.columns:
-                # Try to convert to datetime
-                if self.df[column].dtype == 'object':
-                    # Check if it's a date
-                    try:
-                        pd.to_datetime(self.df[column].dropna().head(100))
-                        self.df[column] = pd.to_datetime(self.df[column], errors='ignore')
-                    except:
-                        # Check if it's numeric
-                        try:
-                            numeric_series = pd.to_numeric(self.df[column], errors='coerce')
-                            if numeric_series.notna().sum() > len(self.df) * 0.8:  # >80% convertible
-                                self.df[column] = numeric_series
-                        except:
-                            pass
-                
-                # Convert to categorical if few unique values
-                if self.df[column].dtype == 'object':
-                    unique_ratio = self.df[column].nunique() / len(self.df)
-                    if unique_ratio < 0.1:  # Less than 10% unique values
-                        self.df[column] = self.df[column].astype('category')
+            column_types = self._convert_types()
             
             # 5. Handle outliers (for numeric columns only)
-            outliers_count = 0
-            numeric_columns = self.df.select_dtypes(include=[np.number]).columns
-            
-            for column in numeric_columns:
-                Q1 = self.df[column].quantile(0.25)
-                Q3 = self.df[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                
-                outliers = ((self.df[column] < lower_bound) | (self.df[column] > upper_bound))
-                outliers_count += outliers.sum()
-                
-                # Cap outliers instead of removing
-                self.df[column] = np.clip(self.df[column], lower_bound, upper_bound)
+            outliers_count = self._cap_outliers()
+
+            # 6. Statistics shared by insights, graphs and the report
+            self.get_column_stats()
+            self.get_correlation()
+            if settings.ANALYSIS_APPROXIMATE_STATS:
+                self.sketches = sketch_frame(self.df)
             
             # Update analysis stats
-            self.analysis.rows_count = len(self.df)
-            self.analysis.columns_count = len(self.df.columns)
-            self.analysis.duplicates_count = duplicates_count
-            self.analysis.missing_values_count = missing_before
-            self.analysis.outliers_count = outliers_count
-            self.analysis.save()
+            self._set_fields(
+                rows_count=len(self.df),
+                columns_count=len(self.df.columns),
+                duplicates_count=duplicates_count,
+                missing_values_count=missing_before,
+                outliers_count=outliers_count,
+                column_types=column_types,
+                column_sketches=self.get_sketch_summaries() or None,
+            )
+            self.save_changes()
             
             return True
             
@@ -156,359 +327,494 @@ class DataAnalysisService:
             print(f"Error cleaning data: {str(e)}")
             return False
     
-    def generate_insights(self):
-        """Generate automatic insights"""
-        if self.df is None:
-            return
-        
-        insights = []
-        
-        # Dataset overview insights
-        insights.append({
-            'type': 'overview',
-            'description': f"Dataset contains {len(self.df)} rows and {len(self.df.columns)} columns after cleaning.",
-            'importance': 0.9
-        })
-        
-        # Missing data insights
-        if self.analysis.missing_values_count > 0:
-            insights.append({
-                'type': 'data_quality',
-                'description': f"Found and handled {self.analysis.missing_values_count} missing values across the dataset.",
-                'importance': 0.8
-            })
-        
-        # Duplicates insights
-        if self.analysis.duplicates_count > 0:
-            insights.append({
-                'type': 'data_quality',
-                'description': f"Removed {self.analysis.duplicates_count} duplicate records.",
-                'importance': 0.7
-            })
-        
-        # Correlation insights
+    def _fill_missing_values(self):
+        """
+        Drop columns with >50% missing values, fill categorical columns with
+        their mode and numeric columns with their median. Statistics are
+        computed frame-wide in a single pass per kind; returns the number of
+        missing values before filling.
+        """
+        missing_per_column = self.df.isnull().sum()
+        missing_before = missing_per_column.sum()
+
+        drop_columns = missing_per_column.index[missing_per_column / len(self.df) > 0.5]
+        if len(drop_columns) > 0:
+            self.df.drop(columns=drop_columns, inplace=True)
+            missing_per_column = missing_per_column.drop(drop_columns)
+
+        columns_with_missing = missing_per_column.index[missing_per_column > 0]
+        dtypes = self.df.dtypes
+        categorical_columns = [
+            c for c in columns_with_missing
+            if dtypes[c] in ['object', 'string'] or isinstance(dtypes[c], pd.CategoricalDtype)
+        ]
+        numeric_columns = [
+            c for c in columns_with_missing
+            if pd.api.types.is_numeric_dtype(dtypes[c]) and not pd.api.types.is_bool_dtype(dtypes[c])
+        ]
+
+        fill_values = {}
+        if categorical_columns:
+            modes = self.df[categorical_columns].mode()
+            for column in categorical_columns:
+                mode_value = modes[column].iloc[0] if len(modes) > 0 else None
+                fill_values[column] = 'Unknown' if pd.isna(mode_value) else mode_value
+        if numeric_columns:
+            fill_values.update(self.df[numeric_columns].median().to_dict())
+
+        if fill_values:
+            self.df.fillna(value=fill_values, inplace=True)
+        return missing_before
+
+    def _convert_types(self):
+        """
+        Infer datetime/numeric/category types for string columns from a bounded
+        sample and convert each column once. Returns the chosen type per column.
+        """
+        column_types = {}
+        for column in self.df.columns:
+            series = self.df[column]
+            # optimize_dtypes and cached frames may hold strings as pyarrow strings or categories
+            holds_strings = series.dtype == 'object' or isinstance(series.dtype, pd.StringDtype) or (
+                isinstance(series.dtype, pd.CategoricalDtype) and pd.api.types.is_string_dtype(series.cat.categories)
+            )
+            if holds_strings:
+                converted, column_types[column] = infer_column_type(series)
+                if converted is not None:
+                    self.df[column] = converted
+            elif pd.api.types.is_bool_dtype(series):
+                column_types[column] = {'type': 'boolean', 'dtype': str(series.dtype)}
+            elif pd.api.types.is_numeric_dtype(series):
+                column_types[column] = {'type': 'numeric', 'dtype': str(series.dtype)}
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                column_types[column] = {'type': 'datetime', 'dtype': str(series.dtype)}
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                column_types[column] = {'type': 'category', 'dtype': 'category'}
+            else:
+                column_types[column] = {'type': 'text', 'dtype': str(series.dtype)}
+        return column_types
+
+    def _cap_outliers(self):
+        """
+        Cap numeric values to the 1.5*IQR fences. Quartiles and outlier masks
+        are computed for all numeric columns at once; only columns that
+        actually contain outliers are rewritten. Returns the number of capped values.
+        """
         numeric_df = self.df.select_dtypes(include=[np.number])
-        if len(numeric_df.columns) > 1:
-            corr_matrix = numeric_df.corr()
-            
-            # Find strongest correlations
-            corr_pairs = []
-            for i in range(len(corr_matrix.columns)):
-                for j in range(i+1, len(corr_matrix.columns)):
-                    corr_val = corr_matrix.iloc[i, j]
-                    if abs(corr_val) > 0.7:  # Strong correlation
-                        corr_pairs.append({
-                            'col1': corr_matrix.columns[i],
-                            'col2': corr_matrix.columns[j],
-                            'correlation': corr_val
-                        })
-            
-            for pair in sorted(corr_pairs, key=lambda x: abs(x['correlation']), reverse=True)[:5]:
-                insights.append({
-                    'type': 'correlation',
-                    'column': f"{pair['col1']} vs {pair['col2']}",
-                    'description': f"Strong {'positive' if pair['correlation'] > 0 else 'negative'} correlation ({pair['correlation']:.3f}) between {pair['col1']} and {pair['col2']}.",
-                    'value': pair['correlation'],
-                    'importance': abs(pair['correlation'])
-                })
-        
-        # Distribution insights
-        for column in numeric_df.columns:
-            skewness = stats.skew(numeric_df[column].dropna())
-            if abs(skewness) > 1:
-                insights.append({
-                    'type': 'distribution',
-                    'column': column,
-                    'description': f"Column '{column}' shows {'right' if skewness > 0 else 'left'} skewed distribution (skewness: {skewness:.3f}).",
-                    'value': skewness,
-                    'importance': min(abs(skewness) / 3, 1.0)
-                })
-        
-        # Categorical insights
-        categorical_columns = self.df.select_dtypes(include=['object', 'category']).columns
-        for column in categorical_columns:
-            value_counts = self.df[column].value_counts()
-            if len(value_counts) > 0:
-                most_common = value_counts.index[0]
-                percentage = (value_counts.iloc[0] / len(self.df)) * 100
-                
-                insights.append({
-                    'type': 'categorical',
-                    'column': column,
-                    'description': f"Most common value in '{column}' is '{most_common}' ({percentage:.1f}% of data).",
-                    'value': {'value': most_common, 'percentage': percentage},
-                    'importance': 0.6
-                })
-        
-        # Save insights to database
-        for insight in insights:
-            AnalysisInsight.objects.create(
-                analysis=self.analysis,
-                insight_type=insight['type'],
-                column_name=insight.get('column'),
-                description=insight['description'],
-                value=insight.get('value'),
-                importance_score=insight['importance']
+        if numeric_df.shape[1] == 0:
+            return 0
+
+        if settings.ANALYSIS_APPROXIMATE_STATS:
+            quartiles = sketch_quantiles(numeric_df, [0.25, 0.75])
+        else:
+            quartiles = numeric_df.quantile([0.25, 0.75])
+        q1, q3 = quartiles.loc[0.25], quartiles.loc[0.75]
+        iqr = q3 - q1
+        lower_bounds = q1 - 1.5 * iqr
+        upper_bounds = q3 + 1.5 * iqr
+        self.outlier_bounds = {
+            column: (float(lower_bounds[column]), float(upper_bounds[column])) for column in numeric_df.columns
+        }
+
+        outliers = numeric_df.lt(lower_bounds, axis=1) | numeric_df.gt(upper_bounds, axis=1)
+        outliers_per_column = outliers.sum()
+        outliers_count = outliers_per_column.sum()
+
+        affected = outliers_per_column.index[outliers_per_column > 0]
+        # float64 columns keep their dtype when clipped, so they can be clipped as one block;
+        # other numeric dtypes may upcast per column, so they are clipped individually
+        float_columns = [c for c in affected if numeric_df[c].dtype == 'float64']
+        other_columns = [c for c in affected if numeric_df[c].dtype != 'float64']
+        if float_columns:
+            self.df[float_columns] = self.df[float_columns].clip(
+                lower_bounds[float_columns], upper_bounds[float_columns], axis=1
             )
-    
-    def generate_graphs(self):
+        for column in other_columns:
+            self.df[column] = np.clip(self.df[column], lower_bounds[column], upper_bounds[column])
+
+        return outliers_count
+
+    def profile_stream(self):
         """
-        Generate only user-selected graphs.
-        selected_graphs: list of graph types e.g. ["histogram", "boxplot", "correlation"]
+        First streaming pass: accumulate raw per-column statistics chunk by chunk
+        and derive the cleaning plan (dropped columns, fill values, type
+        conversions, approximate IQR fences) from them.
         """
-        if self.df is None:
-            return
+        file_path = self.analysis.original_file.path
+        try:
+            self.profile = StreamingProfile(settings.ANALYSIS_APPROXIMATE_STATS)
+            try:
+                self._profile_chunks(file_path)
+            except UnicodeDecodeError:
+                self._fallback_to_latin1()
+                self.profile = StreamingProfile(settings.ANALYSIS_APPROXIMATE_STATS)
+                self._profile_chunks(file_path)
 
-        plt.style.use('default')
-        sns.set_palette("husl")
+            if len(self.profile.raw) <= 1:
+                raise ValueError("Could not detect CSV delimiter")
+            if all(acc.rows == 0 for acc in self.profile.raw.values()):
+                raise ValueError("Could not load data or file is empty")
 
-        numeric_columns = self.df.select_dtypes(include=[np.number]).columns
-        categorical_columns = self.df.select_dtypes(include=['object', 'category']).columns
-        datetime_columns = self.df.select_dtypes(include=['datetime64']).columns
+            self._plan_stream_cleaning()
+            return True
+        except Exception as e:
+            print(f"Error profiling data: {str(e)}")
+            return False
 
-        # Generate overview
-        self._create_overview_graph()
+    def _profile_chunks(self, file_path):
+        for chunk in self._read_csv_chunks(file_path):
+            chunk.columns = clean_column_names(chunk.columns)
+            self.profile.update_raw(chunk)
 
-        for col in numeric_columns:
-            self._create_histogram(col)
+    def _plan_stream_cleaning(self):
+        """Mirror clean_data's rules using the first-pass accumulators"""
+        profile = self.profile
+        for column, acc in profile.raw.items():
+            if acc.rows > 0 and acc.missing / acc.rows > 0.5:
+                profile.drop_columns.append(column)
+                continue
 
-        for col in numeric_columns:
-            self._create_boxplot(col)
+            if acc.is_numeric:
+                if acc.missing > 0:
+                    profile.fill_values[column] = acc.quantile(0.5)
+                q1, q3 = acc.quantile([0.25, 0.75])
+            else:
+                top = acc.top.most_common(1)
+                if acc.missing > 0:
+                    profile.fill_values[column] = top.index[0] if len(top) > 0 else 'Unknown'
+                sample = acc.sample.values if acc.sample.values is not None else pd.Series(dtype=object)
+                fmt = detect_datetime_format(sample)
+                if fmt is not None:
+                    profile.datetime_formats[column] = fmt
+                    profile.column_types[column] = {'type': 'datetime', 'format': fmt, 'dtype': 'datetime64[ns]'}
+                    continue
+                sample = pd.to_numeric(sample, errors='coerce')
+                if sample.notna().mean() <= 0.8:
+                    # Text columns stay strings in the cleaned CSV; the distinct estimate tells categories apart
+                    distinct_ratio = acc.distinct.estimate() / max(acc.rows - acc.missing, 1)
+                    column_type = 'category' if distinct_ratio < CATEGORY_THRESHOLD else 'text'
+                    profile.column_types[column] = {'type': column_type, 'dtype': 'object'}
+                    continue
+                q1, q3 = sample.quantile(0.25), sample.quantile(0.75)
 
-        for col in categorical_columns[:5]:
-            self._create_countplot(col)
+            profile.numeric_columns.append(column)
+            profile.column_types[column] = {'type': 'numeric', 'dtype': 'float64'}
+            profile.bounds[column] = (q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1))
 
-        # Correlation
-        if len(numeric_columns) > 1:
-            self._create_correlation_heatmap(numeric_columns)
-        
-        #scatter matrix
-        if len(numeric_columns) > 1:
-            self._create_scatter_matrix(numeric_columns)
+    def clean_stream(self):
+        """
+        Second streaming pass: apply the cleaning plan chunk by chunk, append
+        the result to the cleaned CSV and accumulate statistics of the cleaned
+        data. Afterwards `self.df` holds a uniform row sample for graphs.
+        Duplicate detection is skipped since it cannot run in constant memory.
+        """
+        if self.profile is None:
+            return False
 
-        # Time series
-        if len(datetime_columns) > 0 and len(numeric_columns) > 0:
-            self._create_timeseries(datetime_columns[0], numeric_columns[0])
-    
-    def _create_overview_graph(self):
-        """Create dataset overview visualization"""
-        fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-        fig.suptitle('Dataset Overview', fontsize=16, fontweight='bold')
-        
-        # Data types distribution
-        dtype_counts = self.df.dtypes.value_counts()
-        axes[0, 0].pie(dtype_counts.values, labels=dtype_counts.index, autopct='%1.1f%%')
-        axes[0, 0].set_title('Data Types Distribution')
-        
-        # Missing values heatmap
-        if self.df.isnull().sum().sum() > 0:
-            sns.heatmap(self.df.isnull(), ax=axes[0, 1], cbar=True, yticklabels=False)
-            axes[0, 1].set_title('Missing Values Pattern')
-        else:
-            axes[0, 1].text(0.5, 0.5, 'No Missing Values', ha='center', va='center', transform=axes[0, 1].transAxes)
-            axes[0, 1].set_title('Missing Values Pattern')
-        
-        # Column info
-        info_text = f"Rows: {len(self.df)}\nColumns: {len(self.df.columns)}\nMemory Usage: {self.df.memory_usage(deep=True).sum() / 1024**2:.2f} MB"
-        axes[1, 0].text(0.1, 0.5, info_text, transform=axes[1, 0].transAxes, fontsize=12, verticalalignment='center')
-        axes[1, 0].set_title('Dataset Statistics')
-        axes[1, 0].axis('off')
-        
-        # Numeric vs Categorical columns
-        numeric_count = len(self.df.select_dtypes(include=[np.number]).columns)
-        categorical_count = len(self.df.select_dtypes(include=['object', 'category']).columns)
-        datetime_count = len(self.df.select_dtypes(include=['datetime64']).columns)
-        
-        column_types = ['Numeric', 'Categorical', 'Datetime']
-        counts = [numeric_count, categorical_count, datetime_count]
-        axes[1, 1].bar(column_types, counts, color=['skyblue', 'lightcoral', 'lightgreen'])
-        axes[1, 1].set_title('Column Types Distribution')
-        axes[1, 1].set_ylabel('Count')
-        
-        plt.tight_layout()
-        file_path = os.path.join(self.graphs_dir, f'dataset_overview.png')
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        GeneratedGraph.objects.create(
-            analysis=self.analysis,
-            graph_type='overview',
-            column_names=['all'],
-            file_path=file_path,
-            title='Dataset Overview',
-            description='Overview of the dataset structure and basic statistics'
-        )
-    def _create_scatter_matrix(self, numeric_columns):
-        """Create scatter matrix (pairplot) for numeric columns"""
+        profile = self.profile
+        file_path = self.analysis.original_file.path
+        cleaned_path, cleaned_name = self._cleaned_file_location()
         try:
+            numeric_columns = profile.numeric_columns
+            lower = pd.Series({c: profile.bounds[c][0] for c in numeric_columns}, dtype='float64')
+            upper = pd.Series({c: profile.bounds[c][1] for c in numeric_columns}, dtype='float64')
             if len(numeric_columns) > 1:
-                plt.figure()
-                sns.set(style="ticks", color_codes=True)
+                profile.correlation = CorrelationAccumulator(numeric_columns)
+            profile.histograms = self._plan_stream_histograms(lower, upper)
+
+            outliers_count = 0
+            with open(cleaned_path, 'w', encoding='utf-8', newline='') as cleaned_file:
+                for i, chunk in enumerate(self._read_csv_chunks(file_path)):
+                    chunk.columns = clean_column_names(chunk.columns)
+                    chunk = chunk.drop(columns=profile.drop_columns).fillna(profile.fill_values)
+                    for column, fmt in profile.datetime_formats.items():
+                        chunk[column] = pd.to_datetime(chunk[column], format=fmt, errors='coerce')
+
+                    if numeric_columns:
+                        numeric = chunk[numeric_columns].apply(pd.to_numeric, errors='coerce').astype('float64')
+                        outliers_count += int((numeric.lt(lower, axis=1) | numeric.gt(upper, axis=1)).sum().sum())
+                        chunk[numeric_columns] = numeric.clip(lower, upper, axis=1)
+
+                    profile.update_cleaned(chunk)
+                    chunk.to_csv(cleaned_file, index=False, header=(i == 0))
+
+            self.df = profile.row_sample.values
+            self.get_column_stats()
+            self.get_correlation()
+            self._set_fields(
+                rows_count=profile.rows,
+                columns_count=len(self.df.columns),
+                duplicates_count=None,
+                missing_values_count=sum(acc.missing for acc in profile.raw.values()),
+                outliers_count=outliers_count,
+                column_types=profile.column_types,
+                cleaned_file=cleaned_name,
+                column_sketches=self.get_sketch_summaries(),
+            )
+            self.save_changes()
+            return True
+
+        except Exception as e:
+            print(f"Error cleaning data: {str(e)}")
+            return False
+
+    def _plan_stream_histograms(self, lower, upper):
+        """
+        Fixed bin edges for each numeric column before the cleaning pass. Cleaned
+        values are clipped to the IQR fences, so the fences (tightened by the raw
+        extremes where known) bound every value the pass will see.
+        """
+        histograms = {}
+        for column in lower.index:
+            acc = self.profile.raw[column]
+            low, high = lower[column], upper[column]
+            if acc.is_numeric:
+                low, high = max(low, acc.min), min(high, acc.max)
+            if not (np.isfinite(low) and np.isfinite(high)):
+                continue
+            if high <= low:
+                low, high = low - 0.5, low + 0.5
+            histograms[column] = HistogramAccumulator(np.linspace(low, high, HISTOGRAM_BINS + 1))
+        return histograms
+
+    def get_column_stats(self):
+        """Per-column statistics of the cleaned data, computed on first use and cached on the service"""
+        if self.column_stats is None and self.df is not None:
+            if self.profile is not None:
+                numeric_columns = self.df.select_dtypes(include=[np.number]).columns
+                self.column_stats = {
+                    column: accumulator_stats(self.profile.cleaned[column], self.profile.histograms.get(column))
+                    for column in numeric_columns
+                    if self.profile.cleaned[column].count > 0
+                }
+            else:
+                self.column_stats = compute_column_stats(self.df)
+        return self.column_stats
+
+    def get_correlation(self):
+        """
+        Correlation matrix of the numeric columns (ANALYSIS_CORRELATION_METHOD), computed
+        once and shared by insights, graph planning and the heatmap. Streaming mode uses
+        the Pearson co-moments accumulated over all rows; Spearman needs global ranks,
+        so there it is computed from the row sample.
+        """
+        if self.correlation is None and self.df is not None:
+            method = settings.ANALYSIS_CORRELATION_METHOD
+            if self.profile is not None and method == 'pearson':
+                self.correlation = self.profile.correlation_matrix()
+            else:
+                self.correlation = correlation_matrix(self.df, method)
+        return self.correlation
+
+    def _accumulators(self):
+        """Per-column accumulators of the cleaned data when statistics come from sketches, else None"""
+        return self.profile.cleaned if self.profile is not None else self.sketches
+
+    def get_outlier_bounds(self):
+        """IQR fences (lower, upper) the numeric columns were capped to during cleaning"""
+        return self.profile.bounds if self.profile is not None else self.outlier_bounds
+
+    def get_sketch_summaries(self):
+        """Per-column sketch estimates with their error bounds; empty when statistics are exact"""
+        accumulators = self._accumulators()
+        if accumulators is None:
+            return {}
+        return {column: sketch_summary(accumulators[column]) for column in self.df.columns if column in accumulators}
+
+    def _value_counts(self, column, n=None):
+        """Most frequent values of a column (heavy-hitter counts in streaming and approximate mode)"""
+        if self._accumulators() is not None:
+            return self._accumulators()[column].top.most_common(n)
+        counts = self.df[column].value_counts()
+        return counts if n is None else counts.head(n)
 
-                # Use seaborn pairplot
-                pairplot = sns.pairplot(self.df[numeric_columns], diag_kind="hist", plot_kws={'alpha': 0.6})
+    def _total_rows(self):
+        """Rows in the cleaned dataset (self.df is only a sample in streaming mode)"""
+        if self.profile is not None:
+            return self.profile.rows
+        return self.source_rows if self.source_rows is not None else len(self.df)
 
-                pairplot.fig.suptitle('Scatter Matrix of Numeric Variables', y=1.02, fontsize=16, fontweight='bold')
-                file_path = os.path.join(self.graphs_dir, 'scatter_matrix.png')
-                plt.savefig(file_path, dpi=300, bbox_inches='tight')
-                plt.close()
+    def _distinct_counts(self, columns):
+        """Distinct values per column (sketch estimates in streaming and approximate mode)"""
+        accumulators = self._accumulators()
+        if accumulators is not None:
+            # Estimates may overshoot slightly; a column never has more distinct values than values
+            return {
+                column: min(accumulators[column].distinct.estimate(), accumulators[column].rows - accumulators[column].missing)
+                for column in columns
+            }
+        return {column: int(self.df[column].nunique()) for column in columns}
 
-                GeneratedGraph.objects.create(
+    def generate_insights(self):
+        """Generate automatic insights with the registered detectors (see insights.py)"""
+        if self.df is None:
+            return
+
+        insights, timings = run_insight_detectors(self)
+        self._set_fields(insight_timings=timings)
+
+        # Save insights to database: one bulk insert, all or nothing
+        with transaction.atomic():
+            AnalysisInsight.objects.bulk_create([
+                AnalysisInsight(
                     analysis=self.analysis,
-                    graph_type='scatter',
-                    column_names=list(numeric_columns),
-                    file_path=file_path,
-                    title='Scatter Matrix',
-                    description='Pairwise relationships between numeric variables'
+                    insight_type=insight['type'],
+                    column_name=insight.get('column'),
+                    description=insight['description'],
+                    value=insight.get('value'),
+                    importance_score=insight['importance']
                 )
-        except Exception as e:
-            print(f"Error creating scatter matrix: {str(e)}")
-            plt.close('all')
+                for insight in insights
+            ])
+            self.save_changes()
+    
+    def generate_graphs(self):
+        """
+        Register the graphs of the analysis as unrendered GeneratedGraph specs and
+        keep the frame they are drawn from; each graph is rendered on first request.
+        """
+        if self.df is None:
+            return
+
+        self.save_graph_source()
+        jobs = plan_graph_jobs(self.df, self._total_rows(), self.get_column_stats(), self.get_correlation())
+        with transaction.atomic():
+            GeneratedGraph.objects.bulk_create([
+                GeneratedGraph(analysis=self.analysis, **graph_record(job))
+                for job in jobs
+            ])
+
+    def _graph_source_key(self):
+        """Identifies the cleaned frame behind the graphs; analyses of identical content share it"""
+        key = self.analysis.content_hash or str(self.analysis.id)
+        return f'{key}_{self.analysis.pipeline_version or PIPELINE_VERSION}'
+
+    def _graph_source_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'graph_sources', f'{self._graph_source_key()}.pkl')
+
+    def save_graph_source(self):
+        """Keep the cleaned frame (a row sample in streaming mode) and its statistics after the pipeline"""
+        source_path = self._graph_source_path()
+        os.makedirs(os.path.dirname(source_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(source_path), suffix='.tmp')
+        os.close(fd)
+        categorical_columns = self.df.select_dtypes(include=['object', 'category', 'string']).columns
+        pd.to_pickle({
+            'df': self.df,
+            'column_stats': self.get_column_stats(),
+            'total_rows': self._total_rows(),
+            'value_counts': {column: self._value_counts(column, TOP_VALUES) for column in categorical_columns},
+            'correlation': self.get_correlation(),
+            'correlation_method': settings.ANALYSIS_CORRELATION_METHOD,
+        }, tmp_path)
+        os.replace(tmp_path, source_path)
+
+    def delete_graph_source(self):
+        """Remove the kept frame and its cached renders unless another analysis of the same content still uses them"""
+        shared = self.analysis.content_hash and DataAnalysis.objects.exclude(id=self.analysis.id).filter(
+            content_hash=self.analysis.content_hash,
+            pipeline_version=self.analysis.pipeline_version,
+        ).exists()
+        if shared:
+            return
+        source_path = self._graph_source_path()
+        if os.path.exists(source_path):
+            os.remove(source_path)
+        delete_cached_graphs(self._graph_source_key())
+
+    def delete_parsed_cache(self):
+        """Remove the parsed copy of the upload unless another analysis of the same content may still load it"""
+        content_hash = self.analysis.content_hash
+        if content_hash and not DataAnalysis.objects.exclude(id=self.analysis.id).filter(content_hash=content_hash).exists():
+            delete_cached_frame(content_hash)
 
-    def _create_histogram(self, column):
-        """Create histogram for numeric column"""
+    def graph_version(self, graph, profile):
+        """
+        Version token of a graph render. The render is fixed by the graph source
+        (content hash and pipeline version), the graph spec and the profile, so the
+        token is known without rendering.
+        """
+        extension = RENDER_PROFILES[profile]['format']
+        cache_path = graph_cache_path(self._graph_source_key(), graph.graph_type, graph.column_names, profile, extension)
+        return hashlib.sha256(cache_path.encode('utf-8')).hexdigest()[:16]
+
+    def render_graph_file(self, graph, profile):
+        """
+        Path of `graph` rendered with `profile`, served from the render cache and
+        rendered from the kept graph source on a miss; None if it cannot be rendered.
+        """
+        source_key = self._graph_source_key()
+        extension = RENDER_PROFILES[profile]['format']
+        cache_path = graph_cache_path(source_key, graph.graph_type, graph.column_names, profile, extension)
+        if read_cached_graph(cache_path):
+            return cache_path
+
+        source_path = self._graph_source_path()
+        if not os.path.exists(source_path):
+            # Graphs rendered eagerly by earlier pipeline versions have no graph source
+            return graph.file_path if graph.file_path and os.path.exists(graph.file_path) else None
+        source = _load_graph_source(source_path)
+        job = job_for_graph(graph.graph_type, graph.column_names, source['total_rows'], source['column_stats'],
+                            source['correlation'], source.get('correlation_method', 'pearson'),
+                            source.get('value_counts'))
+
+        # Each render gets its own directory inside the source's namespace, so concurrent
+        # workers rendering graphs with the same file name never touch each other's files
+        os.makedirs(graph_cache_dir(source_key), exist_ok=True)
+        render_dir = tempfile.mkdtemp(dir=graph_cache_dir(source_key))
         try:
-            plt.figure(figsize=(10, 6))
-            
-            data = self.df[column].dropna()
-            plt.hist(data, bins=30, alpha=0.7, color='skyblue', edgecolor='black')
-            plt.axvline(data.mean(), color='red', linestyle='--', label=f'Mean: {data.mean():.2f}')
-            plt.axvline(data.median(), color='green', linestyle='--', label=f'Median: {data.median():.2f}')
-            
-            plt.title(f'Distribution of {column}', fontsize=14, fontweight='bold')
-            plt.xlabel(column)
-            plt.ylabel('Frequency')
-            plt.legend()
-            plt.grid(True, alpha=0.3)
-            
-            file_path = os.path.join(self.graphs_dir, f'histogram_{column}.png')
-            plt.savefig(file_path, dpi=300, bbox_inches='tight')
-            plt.close()
+            record = render_graph(source['df'], job, render_dir, profile)
+            if record is None:
+                return None
+            store_cached_graph(record['file_path'], cache_path)
+        finally:
+            shutil.rmtree(render_dir, ignore_errors=True)
+        return cache_path
 
-            if not os.path.exists(file_path):
-                raise Exception(f"Failed to save graph at {file_path}")
-            
-            GeneratedGraph.objects.create(
-                analysis=self.analysis,
-                graph_type='histogram',
-                column_names=[column],
-                file_path=file_path,
-                title=f'Histogram - {column}',
-                description=f'Distribution analysis of {column}'
-            )
-        except Exception as e:
-            print(f"Error creating histogram for {column}: {str(e)}")
-            plt.close()
+    def archive_path(self, graphs, profile):
+        """
+        Cache location of the download archive. Its key covers everything that
+        goes into it; pipeline runs bump updated_at when they rewrite the files.
+        """
+        version = json.dumps([
+            self.analysis.updated_at.isoformat() if self.analysis.updated_at else '',
+            self.analysis.pipeline_version or PIPELINE_VERSION,
+            profile,
+            [graph.id for graph in graphs],
+        ])
+        return archive_cache_path(self.analysis.id, hashlib.sha256(version.encode('utf-8')).hexdigest()[:32])
 
-    def _create_boxplot(self, column):
-        """Create boxplot for numeric column"""
-        plt.figure(figsize=(8, 6))
-        
-        box_plot = plt.boxplot(self.df[column].dropna(), patch_artist=True)
-        box_plot['boxes'][0].set_facecolor('lightblue')
-        
-        plt.title(f'Box Plot of {column}', fontsize=14, fontweight='bold')
-        plt.ylabel(column)
-        plt.grid(True, alpha=0.3)
-        
-        file_path = os.path.join(self.graphs_dir, f'boxplot_{column}.png')
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        GeneratedGraph.objects.create(
-            analysis=self.analysis,
-            graph_type='boxplot',
-            column_names=[column],
-            file_path=file_path,
-            title=f'Box Plot - {column}',
-            description=f'Outlier analysis of {column}'
-        )
-    
-    def _create_countplot(self, column):
-        """Create count plot for categorical column"""
-        plt.figure(figsize=(12, 6))
-        
-        value_counts = self.df[column].value_counts().head(10)  # Top 10 categories
-        
-        plt.bar(range(len(value_counts)), value_counts.values, color='lightcoral')
-        plt.title(f'Count Plot of {column}', fontsize=14, fontweight='bold')
-        plt.xlabel(column)
-        plt.ylabel('Count')
-        plt.xticks(range(len(value_counts)), value_counts.index, rotation=45, ha='right')
-        plt.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        file_path = os.path.join(self.graphs_dir, f'countplot_{column}.png')
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        GeneratedGraph.objects.create(
-            analysis=self.analysis,
-            graph_type='countplot',
-            column_names=[column],
-            file_path=file_path,
-            title=f'Count Plot - {column}',
-            description=f'Frequency analysis of {column} categories'
-        )
-    
-    def _create_correlation_heatmap(self, numeric_columns):
-        """Create correlation heatmap"""
-        plt.figure(figsize=(12, 10))
-        
-        correlation_matrix = self.df[numeric_columns].corr()
-        
-        mask = np.triu(np.ones_like(correlation_matrix, dtype=bool))
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0,
-                    square=True, mask=mask, cbar_kws={'label': 'Correlation Coefficient'})
-        
-        plt.title('Correlation Heatmap', fontsize=14, fontweight='bold')
-        plt.tight_layout()
-        
-        file_path = os.path.join(self.graphs_dir, 'correlation_heatmap.png')
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        GeneratedGraph.objects.create(
-            analysis=self.analysis,
-            graph_type='correlation',
-            column_names=list(numeric_columns),
-            file_path=file_path,
-            title='Correlation Heatmap',
-            description='Correlation analysis between numeric variables'
-        )
-    
-    
+    def archive_entries(self, graphs, profile):
+        """(path, name in archive) of the cleaned CSV, the HTML report and the graphs, rendering graphs lazily"""
+        for field_file, folder in ((self.analysis.cleaned_file, 'dataset'), (self.analysis.report_html, 'reports')):
+            if field_file and os.path.exists(field_file.path):
+                yield field_file.path, f"{folder}/{os.path.basename(field_file.name)}"
+
+        if self.analysis.graphs_zip and os.path.exists(self.analysis.graphs_zip.path):
+            yield self.analysis.graphs_zip.path, f"graphs/{os.path.basename(self.analysis.graphs_zip.name)}"
+            return
+        extension = RENDER_PROFILES[profile]['format']
+        for graph in graphs:
+            # Rendered through the render cache if not requested before
+            graph_path = self.render_graph_file(graph, profile)
+            if graph_path:
+                name = '_'.join([graph.graph_type] + [str(c) for c in graph.column_names or []])
+                yield graph_path, f"graphs/{name}.{extension}"
+
+    def graph_chart_data(self, graph):
+        """Pre-aggregated data behind `graph` for drawing it client-side; None if the source is gone"""
+        source_path = self._graph_source_path()
+        if not os.path.exists(source_path):
+            return None
+        return chart_data(_load_graph_source(source_path), graph.graph_type, graph.column_names)
+
+    def _cleaned_file_location(self):
+        """Absolute path and storage name of the cleaned CSV"""
+        cleaned_filename = f"cleaned_{self.analysis.dataset_name}_{self.analysis.id}.csv"
+        cleaned_path = os.path.join(settings.MEDIA_ROOT, 'datasets', 'cleaned', cleaned_filename)
+        os.makedirs(os.path.dirname(cleaned_path), exist_ok=True)
+        return cleaned_path, f'datasets/cleaned/{cleaned_filename}'
 
-    def _create_timeseries(self, date_col, value_col):
-        """Create time series plot"""
-        plt.figure(figsize=(14, 6))
-        
-        # Sort by date
-        df_sorted = self.df.sort_values(date_col)
-        
-        plt.plot(df_sorted[date_col], df_sorted[value_col], linewidth=2, color='navy')
-        plt.title(f'Time Series: {value_col} over {date_col}', fontsize=14, fontweight='bold')
-        plt.xlabel(date_col)
-        plt.ylabel(value_col)
-        plt.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        
-        plt.tight_layout()
-        
-        file_path = os.path.join(self.graphs_dir, f'timeseries_{date_col}_{value_col}.png')
-        plt.savefig(file_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        GeneratedGraph.objects.create(
-            analysis=self.analysis,
-            graph_type='timeseries',
-            column_names=[date_col, value_col],
-            file_path=file_path,
-            title=f'Time Series - {value_col}',
-            description=f'Temporal analysis of {value_col} over time'
-        )
-    
     def save_cleaned_data(self):
         """Save cleaned dataset"""
         if self.df is None:
@@ -516,21 +822,29 @@ class DataAnalysisService:
         
         try:
             # Save as CSV
-            cleaned_filename = f"cleaned_{self.analysis.dataset_name}_{self.analysis.id}.csv"
-            cleaned_path = os.path.join(settings.MEDIA_ROOT, 'datasets', 'cleaned', cleaned_filename)
-            os.makedirs(os.path.dirname(cleaned_path), exist_ok=True)
-            
+            cleaned_path, cleaned_name = self._cleaned_file_location()
             self.df.to_csv(cleaned_path, index=False)
             
             # Update model
-            self.analysis.cleaned_file.name = f'datasets/cleaned/{cleaned_filename}'
-            self.analysis.save()
+            self._set_fields(cleaned_file=cleaned_name)
+            self.save_changes()
             
             return True
         except Exception as e:
             print(f"Error saving cleaned data: {str(e)}")
             return False
 
+    def generate_clone_report(self):
+        """HTML report of a cloned analysis, rendered from the graph source it shares with the original"""
+        source_path = self._graph_source_path()
+        if not os.path.exists(source_path):
+            return False
+        source = _load_graph_source(source_path)
+        self.df = source['df']
+        self.column_stats = source['column_stats']
+        self.source_rows = source['total_rows']
+        return self.generate_html_report()
+
     def generate_html_report(self):
         """Generate comprehensive HTML report"""
         try:
@@ -539,7 +853,7 @@ class DataAnalysisService:
             
             # Basic statistics
             numeric_df = self.df.select_dtypes(include=[np.number])
-            categorical_df = self.df.select_dtypes(include=['object', 'category'])
+            categorical_df = self.df.select_dtypes(include=['object', 'category', 'string'])
             
             html_content = f"""
             <!DOCTYPE html>
@@ -581,7 +895,7 @@ class DataAnalysisService:
                         
                         <div class="stat-grid">
                             <div class="stat-card">
-                                <div class="stat-number">{len(self.df)}</div>
+                                <div class="stat-number">{self._total_rows()}</div>
                                 <div class="stat-label">Total Rows</div>
                             </div>
                             <div class="stat-card">
@@ -627,13 +941,16 @@ class DataAnalysisService:
                         <tr><th>Column</th><th>Mean</th><th>Median</th><th>Std Dev</th><th>Min</th><th>Max</th></tr>
                 """
                 
+                column_stats = self.get_column_stats()
                 for col in numeric_df.columns:
-                    stats = numeric_df[col].describe()
+                    if col not in column_stats:
+                        continue
+                    stats = column_stats[col]
                     html_content += f"""
                         <tr>
                             <td>{col}</td>
                             <td>{stats['mean']:.2f}</td>
-                            <td>{stats['50%']:.2f}</td>
+                            <td>{stats['median']:.2f}</td>
                             <td>{stats['std']:.2f}</td>
                             <td>{stats['min']:.2f}</td>
                             <td>{stats['max']:.2f}</td>
@@ -661,8 +978,8 @@ class DataAnalysisService:
             with open(html_path, 'w', encoding='utf-8') as f:
                 f.write(html_content)
             
-            self.analysis.report_html.name = f'reports/html/{html_filename}'
-            self.analysis.save()
+            self._set_fields(report_html=f'reports/html/{html_filename}')
+            self.save_changes()
             
             return True
             
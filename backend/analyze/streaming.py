@@ -0,0 +1,503 @@
+"""
+One-pass, mergeable accumulators for analysing CSVs that do not fit in memory.
+
+Every accumulator consumes pandas chunks with ``update`` and can be combined
+with another instance of itself through ``merge``, so statistics can be
+computed per chunk (or per worker) and reduced afterwards. Memory use depends
+only on the configured capacities, never on the number of rows.
+"""
+import warnings
+import numpy as np
+import pandas as pd
+
+QUANTILE_SAMPLE_SIZE = 10000
+DISTINCT_SKETCH_SIZE = 4096
+TOP_K_CAPACITY = 100
+ROW_SAMPLE_SIZE = 100000
+HLL_PRECISION = 14
+KLL_CAPACITY = 200
+SKETCH_CHUNK_ROWS = 100000
+
+_HASH_SPACE = float(2 ** 64)
+
+
+class BottomKSample:
+    """
+    Uniform sample of fixed size: every item gets a random priority and the k
+    smallest priorities are kept. Two samples merge by keeping the k smallest
+    priorities of their union.
+    """
+
+    def __init__(self, capacity, seed=0):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.priorities = np.empty(0)
+        self.values = None
+
+    def _keep_smallest(self, priorities, values):
+        if len(priorities) > self.capacity:
+            keep = np.argpartition(priorities, self.capacity - 1)[:self.capacity]
+            priorities = priorities[keep]
+            values = values.iloc[keep] if isinstance(values, (pd.Series, pd.DataFrame)) else values[keep]
+        return priorities, values
+
+    def _combine(self, priorities, values):
+        if self.values is None:
+            return self._keep_smallest(priorities, values)
+        all_priorities = np.concatenate([self.priorities, priorities])
+        if isinstance(values, (pd.Series, pd.DataFrame)):
+            all_values = pd.concat([self.values, values], ignore_index=True)
+        else:
+            all_values = np.concatenate([self.values, values])
+        return self._keep_smallest(all_priorities, all_values)
+
+    def update(self, values):
+        if len(values) == 0:
+            return
+        if isinstance(values, (pd.Series, pd.DataFrame)):
+            values = values.reset_index(drop=True)
+        priorities = self.rng.random(len(values))
+        # Pre-trim the chunk so concatenation stays bounded
+        priorities, values = self._keep_smallest(priorities, values)
+        self.priorities, self.values = self._combine(priorities, values)
+
+    def merge(self, other):
+        if other.values is not None:
+            self.priorities, self.values = self._combine(other.priorities, other.values)
+        return self
+
+
+def _hash_values(values, unique=False):
+    """64-bit hashes of a Series; `unique` skips pandas' dedup pass for values known to be distinct"""
+    return pd.util.hash_pandas_object(values, index=False, categorize=not unique).to_numpy()
+
+
+class DistinctSketch:
+    """K-minimum-values estimator of the number of distinct values (exact below k)"""
+
+    def __init__(self, capacity=DISTINCT_SKETCH_SIZE):
+        self.capacity = capacity
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def _add_hashes(self, hashes):
+        hashes = np.union1d(self.hashes, hashes)  # sorted and unique
+        self.hashes = hashes[:self.capacity]
+
+    def update(self, values, unique=False):
+        values = values.dropna()
+        if len(values) > 0:
+            self._add_hashes(_hash_values(values, unique))
+
+    def merge(self, other):
+        self._add_hashes(other.hashes)
+        return self
+
+    def estimate(self):
+        if len(self.hashes) < self.capacity:
+            return len(self.hashes)
+        return int((self.capacity - 1) * _HASH_SPACE / (float(self.hashes[-1]) + 1))
+
+    def relative_error(self):
+        """Relative standard error of the estimate (0 while exact)"""
+        return 0.0 if len(self.hashes) < self.capacity else 1 / np.sqrt(self.capacity - 2)
+
+
+def _leading_zeros(hashes):
+    """Leading zero bits of 64-bit hashes, from the bit lengths of their 32-bit halves (exact in float64)"""
+    high = (hashes >> np.uint64(32)).astype(np.float64)
+    low = (hashes & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 - np.frexp(high)[1], 64 - np.frexp(low)[1])
+
+
+class HyperLogLog:
+    """
+    HyperLogLog estimator of the number of distinct values: 2**precision one-byte
+    registers hold the longest run of leading zeros seen per hash bucket. Fixed
+    size (16 KiB by default) and relative standard error 1.04 / sqrt(2**precision).
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def _add_hashes(self, hashes):
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        ranks = np.minimum(_leading_zeros(rest) + 1, 64 - self.precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def update(self, values, unique=False):
+        values = values.dropna()
+        if len(values) > 0:
+            self._add_hashes(_hash_values(values, unique))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty > 0:
+            return int(round(m * np.log(m / empty)))  # linear counting for small cardinalities
+        return int(round(raw))
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch. Level h holds items of weight 2**h; a level over its
+    capacity (shrinking geometrically from `capacity` at the top) is sorted and
+    every other item, from a random offset, is promoted to the next level.
+    Memory stays around 3 * capacity items whatever the number of values.
+    """
+
+    def __init__(self, capacity=KLL_CAPACITY, seed=0):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.count = 0
+
+    def _level_capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.capacity * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            level += 1
+            if len(items) <= self._level_capacity(level - 1):
+                continue
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays behind, so the promoted half has exactly half the weight
+            keep, items = items[:len(items) % 2], items[len(items) % 2:]
+            self.levels[level - 1] = keep
+            self.levels[level] = np.concatenate([self.levels[level], items[self.rng.integers(2)::2]])
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) > 0:
+            self.count += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Value at quantile(s) `q`, NaN while empty"""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        result = items[order][np.minimum(positions, len(items) - 1)]
+        return result if np.ndim(q) else float(result)
+
+    def rank_error(self):
+        """Normalized rank error at 99% confidence (0 while nothing was compacted)"""
+        return 0.0 if len(self.levels) == 1 else 2.296 / self.capacity ** 0.9723
+
+
+class TopKCounter:
+    """
+    Heavy-hitter counts in at most `capacity` counters: the mergeable Misra-Gries
+    form of SpaceSaving (Agarwal et al., "Mergeable Summaries"). Counts are added
+    a whole chunk at a time; whenever more than `capacity` values are tracked,
+    the (capacity + 1)-th largest count is subtracted from every counter and the
+    ones left at zero are dropped. Reported counts are therefore lower bounds,
+    short by at most `error` (the sum of the subtracted amounts), and `error`
+    never exceeds rows / (capacity + 1). SpaceSaving's counters are these plus
+    `error`, i.e. the upper bounds.
+    """
+
+    def __init__(self, capacity=TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='int64')
+        self.error = 0
+
+    @staticmethod
+    def _above(counts, threshold):
+        # Numpy masks: a boolean Series key makes pandas probe the object index for attribute names
+        keep = counts.to_numpy() > threshold
+        return pd.Series(counts.to_numpy()[keep], index=counts.index[keep])
+
+    def _reduce(self, counts):
+        if len(counts) > self.capacity:
+            position = len(counts) - self.capacity - 1
+            cutoff = int(np.partition(counts.to_numpy(), position)[position])
+            counts = self._above(counts, cutoff) - cutoff
+            self.error += cutoff
+        return counts
+
+    def update_counts(self, counts):
+        """Add value counts of a chunk (a Series indexed by value)"""
+        counts = self._above(counts, 0)
+        if len(counts) > 0:
+            # Reducing the chunk first keeps the union small; object-typed index
+            # keeps values from different chunk dtypes comparable
+            counts = self._reduce(counts.astype('int64'))
+            counts.index = counts.index.astype(object)
+            self.counts = self._reduce(self.counts.add(counts, fill_value=0).astype('int64'))
+
+    def update(self, values):
+        self.update_counts(values.value_counts(dropna=True))
+
+    def merge(self, other):
+        self.error += other.error
+        self.counts = self._reduce(self.counts.add(other.counts, fill_value=0).astype('int64'))
+        return self
+
+    def most_common(self, n=None):
+        counts = self.counts.sort_values(ascending=False, kind='stable')
+        return counts if n is None else counts.head(n)
+
+
+class ColumnAccumulator:
+    """
+    Missing/row counts, moments, min/max, quantile sample, distinct and top-k for
+    one column. `approximate` swaps in HyperLogLog distinct counts and KLL
+    quantiles, which carry error bounds.
+    """
+
+    def __init__(self, seed=0, approximate=False):
+        self.rows = 0
+        self.missing = 0
+        self.non_numeric_chunks = 0
+        self.count = 0  # non-null numeric values
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sample = BottomKSample(QUANTILE_SAMPLE_SIZE, seed)
+        self.distinct = HyperLogLog() if approximate else DistinctSketch()
+        self.top = TopKCounter()
+        self.quantiles = KLLSketch(seed=seed) if approximate else None
+
+    @property
+    def is_numeric(self):
+        return self.non_numeric_chunks == 0 and self.count > 0
+
+    def _merge_moments(self, n_b, mean_b, m2_b, m3_b):
+        n_a = self.count
+        n = n_a + n_b
+        if n_b == 0:
+            return
+        delta = mean_b - self.mean
+        self.m3 = (self.m3 + m3_b
+                   + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+                   + 3 * delta * (n_a * m2_b - n_b * self.m2) / n)
+        self.m2 = self.m2 + m2_b + delta ** 2 * n_a * n_b / n
+        self.mean = self.mean + delta * n_b / n
+        self.count = n
+
+    def update(self, series):
+        # One factorization serves every sketch: missing values get code -1, the
+        # distinct sketches only need each value once, and top-k its count
+        codes, uniques = pd.factorize(series)
+        present = codes >= 0
+        self.rows += len(series)
+        self.missing += len(codes) - int(np.count_nonzero(present))
+        uniques = pd.Series(uniques)
+        self.distinct.update(uniques, unique=True)
+        self.top.update_counts(pd.Series(np.bincount(codes[present], minlength=len(uniques)), index=uniques))
+
+        values = series[present]
+        self.sample.update(values)
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            x = values.to_numpy(dtype=np.float64)
+            if len(x) > 0:
+                mean_b = x.mean()
+                centered = x - mean_b
+                self._merge_moments(len(x), mean_b, float((centered ** 2).sum()), float((centered ** 3).sum()))
+                if self.quantiles is not None:
+                    self.quantiles.update(x)
+                self.min = min(self.min, float(x.min()))
+                self.max = max(self.max, float(x.max()))
+        elif len(values) > 0:
+            self.non_numeric_chunks += 1
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.missing += other.missing
+        self.non_numeric_chunks += other.non_numeric_chunks
+        self._merge_moments(other.count, other.mean, other.m2, other.m3)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sample.merge(other.sample)
+        self.distinct.merge(other.distinct)
+        self.top.merge(other.top)
+        if self.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.count - ddof) if self.count > ddof else np.nan
+
+    def std(self):
+        return float(np.sqrt(self.variance()))
+
+    def skewness(self):
+        """Biased sample skewness (same definition as scipy.stats.skew)"""
+        if self.count == 0 or self.m2 == 0:
+            return np.nan
+        return float(np.sqrt(self.count) * self.m3 / self.m2 ** 1.5)
+
+    def quantile(self, q):
+        """Approximate quantile(s) from the KLL sketch, or else from the uniform value sample"""
+        if self.quantiles is not None and self.quantiles.count > 0:
+            return self.quantiles.quantile(q)
+        if self.sample.values is None or len(self.sample.values) == 0:
+            return np.nan
+        return pd.to_numeric(self.sample.values, errors='coerce').quantile(q)
+
+
+class HistogramAccumulator:
+    """Counts over fixed bin edges (chosen before the pass); two histograms merge by adding counts"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def update(self, series):
+        values = series.to_numpy(dtype=np.float64)
+        counts, _ = np.histogram(values[~np.isnan(values)], bins=self.edges)
+        self.counts += counts
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+
+class CorrelationAccumulator:
+    """
+    Pairwise-complete Pearson correlation of numeric columns, like
+    DataFrame.corr(): every pair of columns uses the rows where both are present.
+    Per pair it keeps the row count, both means, both sums of squared deviations
+    and the co-moment as k x k matrices, merged with the pairwise update formulas.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.count = np.zeros((k, k))
+        self.mean = np.zeros((k, k))  # [i, j]: mean of column i over the rows where i and j are present
+        self.m2 = np.zeros((k, k))  # [i, j]: squared deviations of column i over those rows
+        self.comoment = np.zeros((k, k))
+
+    def _merge(self, n_b, mean_b, m2_b, comoment_b):
+        n_a = self.count
+        n = n_a + n_b
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(n > 0, n_a * n_b / n, 0.0)
+            share = np.where(n > 0, n_b / n, 0.0)
+        delta = mean_b - self.mean
+        self.comoment += comoment_b + delta * delta.T * weight
+        self.m2 += m2_b + delta ** 2 * weight
+        self.mean += delta * share
+        self.count = n
+
+    def update(self, df):
+        x = df[self.columns].to_numpy(dtype=np.float64)
+        present = ~np.isnan(x)
+        if not present.any():
+            return
+        # Shift by the chunk's column means first, so the sums below stay small and exact enough
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            shift = np.nan_to_num(np.nanmean(x, axis=0))
+        y = np.where(present, x - shift, 0.0)
+        mask = present.astype(np.float64)
+        n = mask.T @ mask
+        sums = y.T @ mask  # [i, j]: sum of column i over the rows where j is present too
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n > 0, sums / n, 0.0)
+        m2 = (y ** 2).T @ mask - mean * sums
+        comoment = y.T @ y - mean * sums.T
+        self._merge(n, mean + shift[:, None], m2, comoment)
+
+    def merge(self, other):
+        self._merge(other.count, other.mean, other.m2, other.comoment)
+        return self
+
+    def matrix(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class StreamingProfile:
+    """Per-column accumulators for the raw and cleaned passes over a chunked CSV"""
+
+    def __init__(self, approximate=False):
+        self.approximate = approximate
+        self.raw = {}
+        self.cleaned = {}
+        self.correlation = None
+        self.histograms = {}
+        self.row_sample = BottomKSample(ROW_SAMPLE_SIZE)
+        self.rows = 0
+        self.drop_columns = []
+        self.fill_values = {}
+        self.bounds = {}
+        self.datetime_formats = {}
+        self.numeric_columns = []
+        self.column_types = {}  # type report per kept column, as DataAnalysisService._convert_types gives
+
+    def _update_columns(self, accumulators, chunk):
+        update_accumulators(accumulators, chunk, self.approximate)
+
+    def update_raw(self, chunk):
+        self._update_columns(self.raw, chunk)
+
+    def update_cleaned(self, chunk):
+        self.rows += len(chunk)
+        self._update_columns(self.cleaned, chunk)
+        if self.correlation is not None:
+            self.correlation.update(chunk)
+        for column, histogram in self.histograms.items():
+            histogram.update(chunk[column])
+        self.row_sample.update(chunk)
+
+    def correlation_matrix(self):
+        return self.correlation.matrix() if self.correlation is not None else None
+
+
+def update_accumulators(accumulators, chunk, approximate=False):
+    """Feed every column of a chunk to its accumulator in `accumulators`, creating missing ones"""
+    for seed, column in enumerate(chunk.columns):
+        accumulators.setdefault(column, ColumnAccumulator(seed, approximate)).update(chunk[column])
+
+
+def sketch_quantiles(df, q, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Like `df.quantile(q)` for a numeric frame, from one KLL sketch per column fed `chunk_rows` rows at a time"""
+    sketches = {column: KLLSketch(seed=seed) for seed, column in enumerate(df.columns)}
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        for column, sketch in sketches.items():
+            sketch.update(chunk[column].to_numpy(dtype=np.float64, na_value=np.nan))
+    return pd.DataFrame({column: sketch.quantile(q) for column, sketch in sketches.items()}, index=q)
+
+
+def sketch_frame(df, chunk_rows=SKETCH_CHUNK_ROWS):
+    """Approximate accumulators of every column of an in-memory frame, fed `chunk_rows` rows at a time"""
+    accumulators = {}
+    for start in range(0, len(df), chunk_rows):
+        update_accumulators(accumulators, df.iloc[start:start + chunk_rows], approximate=True)
+    return accumulators
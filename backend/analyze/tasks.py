@@ -0,0 +1,196 @@
+import time
+from celery import Task, chain, group, shared_task
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import DataAnalysis, GeneratedGraph
+from .events import publish_analysis_event
+from .services import PIPELINE_VERSION, DataAnalysisService
+
+# Graphs the analysis page shows above the fold; the rest render lazily when opened
+PRERENDER_GRAPH_TYPES = ('overview', 'correlation')
+
+def _analysis_id(args, kwargs):
+    """Stages take analysis_id as their first argument (or keyword)"""
+    return kwargs['analysis_id'] if 'analysis_id' in kwargs else args[0]
+
+
+class AnalysisTask(Task):
+    """
+    Base task for pipeline stages: records the running stage and its progress,
+    accumulates processing time and marks the analysis failed on error
+    """
+    # `progress` is consumed by __call__, so the stage functions do not declare it;
+    # skip Celery's check of call arguments against their signatures
+    typing = False
+
+    def __call__(self, *args, progress=None, **kwargs):
+        start_time = time.time()
+        analysis_id = _analysis_id(args, kwargs)
+        if progress is not None:
+            _update_analysis(
+                analysis_id, status='processing', progress_stage=self.name.rsplit('.', 1)[-1], progress=progress
+            )
+            _publish_progress(analysis_id)
+        result = super().__call__(*args, **kwargs)
+        _update_analysis(
+            analysis_id, processing_time=Coalesce(F('processing_time'), Value(0.0)) + (time.time() - start_time)
+        )
+        return result
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        analysis_id = _analysis_id(args, kwargs)
+        print(f"Error processing dataset {analysis_id} in {self.name}: {str(exc)}")
+        _update_analysis(analysis_id, status='failed')
+        _publish_progress(analysis_id)
+        analysis = DataAnalysis.objects.filter(id=analysis_id).first()
+        if analysis is not None:
+            DataAnalysisService(analysis).clear_checkpoints()
+
+
+def _update_analysis(analysis_id, **fields):
+    """Queryset update that still bumps updated_at, which list ETags are derived from"""
+    DataAnalysis.objects.filter(id=analysis_id).update(updated_at=timezone.now(), **fields)
+
+
+def _publish_progress(analysis_id):
+    """Push the analysis' current status and progress to subscribed clients"""
+    publish_analysis_event(DataAnalysis.objects.filter(id=analysis_id).values(
+        'id', 'user_id', 'status', 'progress_stage', 'progress'
+    ).first())
+
+
+def _get_service(analysis_id, checkpoint=None):
+    """Build a service for the analysis, restoring the DataFrame from a previous stage if given"""
+    analysis = DataAnalysis.objects.get(id=analysis_id)
+    service = DataAnalysisService(analysis)
+    if checkpoint and not service.load_checkpoint(checkpoint):
+        raise RuntimeError(f"Missing '{checkpoint}' checkpoint for analysis {analysis_id}")
+    return service
+
+
+@shared_task(base=AnalysisTask)
+def load_dataset(analysis_id):
+    """Parse the uploaded file and checkpoint the raw DataFrame"""
+    _update_analysis(analysis_id, status='processing', processing_time=0.0)
+    service = _get_service(analysis_id)
+    if not service.load_data():
+        raise ValueError("Could not load dataset")
+    if settings.ANALYSIS_OPTIMIZE_MEMORY:
+        service.optimize_memory()
+    service.save_checkpoint('loaded')
+
+
+@shared_task(base=AnalysisTask)
+def clean_dataset(analysis_id):
+    """Clean the loaded DataFrame and checkpoint the result"""
+    service = _get_service(analysis_id, 'loaded')
+    if not service.clean_data():
+        raise ValueError("Could not clean dataset")
+    service.save_checkpoint('cleaned')
+
+
+@shared_task(base=AnalysisTask)
+def profile_dataset_stream(analysis_id):
+    """Streaming mode: first pass over the CSV chunks, collecting raw statistics"""
+    _update_analysis(analysis_id, status='processing', processing_time=0.0)
+    service = _get_service(analysis_id)
+    if not service.profile_stream():
+        raise ValueError("Could not profile dataset")
+    service.save_checkpoint('profiled')
+
+
+@shared_task(base=AnalysisTask)
+def clean_dataset_stream(analysis_id):
+    """Streaming mode: second pass writing the cleaned CSV and checkpointing a row sample"""
+    service = _get_service(analysis_id, 'profiled')
+    if not service.clean_stream():
+        raise ValueError("Could not clean dataset")
+    service.save_checkpoint('cleaned')
+
+
+@shared_task(base=AnalysisTask)
+def generate_insights(analysis_id):
+    """Generate insights from the cleaned DataFrame"""
+    _get_service(analysis_id, 'cleaned').generate_insights()
+
+
+@shared_task(base=AnalysisTask)
+def generate_graphs(analysis_id):
+    """Register graph specs; images are rendered on first request, not here"""
+    _get_service(analysis_id, 'cleaned').generate_graphs()
+
+
+@shared_task(base=AnalysisTask)
+def export_cleaned_data(analysis_id):
+    """Write the cleaned dataset CSV"""
+    _get_service(analysis_id, 'cleaned').save_cleaned_data()
+
+
+@shared_task(base=AnalysisTask)
+def generate_report(analysis_id):
+    """Write the HTML report"""
+    _get_service(analysis_id, 'cleaned').generate_html_report()
+
+
+@shared_task(base=AnalysisTask)
+def finalize_analysis(analysis_id):
+    """Mark the analysis completed and drop intermediate checkpoints"""
+    service = _get_service(analysis_id)
+    service.clear_checkpoints()
+    _update_analysis(
+        analysis_id, status='completed', pipeline_version=PIPELINE_VERSION, progress_stage='completed', progress=100
+    )
+    _publish_progress(analysis_id)
+    if settings.ANALYSIS_PRERENDER_GRAPHS:
+        prerender_graphs.delay(analysis_id)
+
+
+@shared_task
+def render_graph_task(graph_id, profile):
+    """Render one graph into the render cache; a cache hit makes this a no-op"""
+    graph = GeneratedGraph.objects.select_related('analysis').filter(id=graph_id).first()
+    if graph is not None:
+        DataAnalysisService(graph.analysis).render_graph_file(graph, profile)
+
+
+@shared_task
+def prerender_graphs(analysis_id):
+    """
+    Warm the render cache with the default profile for the graphs shown first,
+    one task per graph. pyplot serializes renders within a process, so
+    parallelism comes from spreading them over worker processes.
+    """
+    graph_ids = GeneratedGraph.objects.filter(
+        analysis_id=analysis_id, graph_type__in=PRERENDER_GRAPH_TYPES
+    ).order_by('id').values_list('id', flat=True)
+    group(render_graph_task.si(graph_id, settings.ANALYSIS_GRAPH_PROFILE) for graph_id in graph_ids).apply_async()
+
+
+def build_analysis_pipeline(analysis_id):
+    """Chain of pipeline stages for one analysis"""
+    analysis = DataAnalysis.objects.get(id=analysis_id)
+    if analysis.streaming:
+        # The cleaned CSV is written during the second streaming pass
+        stages = [profile_dataset_stream, clean_dataset_stream, generate_insights, generate_graphs,
+                  generate_report, finalize_analysis]
+    else:
+        stages = [load_dataset, clean_dataset, generate_insights, generate_graphs, export_cleaned_data,
+                  generate_report, finalize_analysis]
+    # Each stage reports the share of stages started before it as its progress
+    return chain(*(
+        stage.si(str(analysis_id), progress=100 * i // len(stages))
+        for i, stage in enumerate(stages)
+    ))
+
+
+def start_analysis_pipeline(analysis_id):
+    """Queue the pipeline (runs in-process when CELERY_TASK_ALWAYS_EAGER is set)"""
+    try:
+        return build_analysis_pipeline(analysis_id).apply_async()
+    except Exception as e:
+        print(f"Error starting analysis pipeline: {str(e)}")
+        _update_analysis(analysis_id, status='failed')
+        _publish_progress(analysis_id)
+        return None
@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+import zipfile
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import quote_etag
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.celery import app as celery_app
+import numpy as np
+import pandas as pd
+from PIL import Image
+from .archive import stream_zip
+from .checks import check_insight_detectors
+from .events import InMemoryBroker, user_channel
+from .chart_data import lttb
+from .correlation import correlation_matrix, strongest_pairs
+from .dialect import sniff_csv_dialect
+from .streaming import (
+    BottomKSample, ColumnAccumulator, CorrelationAccumulator, DistinctSketch, HistogramAccumulator, HyperLogLog,
+    KLLSketch, TopKCounter, sketch_frame,
+)
+from .inference import detect_datetime_format, infer_column_type
+from .insights import INSIGHT_DETECTORS, run_insight_detectors
+from . import cache
+from .cache import parsed_cache_path, read_cached_frame, write_cached_frame
+from .media import file_version, media_signature, serve_media
+from .memory import optimize_dtypes
+from .rendering import plan_graph_jobs, render_graph, select_scatter_columns
+from .models import DataAnalysis
+from .services import DataAnalysisService, clone_analysis
 
-# Create your tests here.
+
+class MediaRootMixin:
+    """Runs each test against an empty temporary MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def write_media(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+
+class StreamZipTests(MediaRootMixin, TestCase):
+    def test_round_trips_through_zipfile(self):
+        csv = self.write_media('data.csv', b'a,b\n' + b'1,2\n' * 200000)
+        png = self.write_media('graph.png', os.urandom(50000))
+        cache_path = os.path.join(self.media_root, 'cache', 'report.zip')
+
+        data = b''.join(stream_zip([(csv, 'dataset/data.csv'), (png, 'graphs/graph.png')], cache_path=cache_path))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.getinfo('dataset/data.csv').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.getinfo('graphs/graph.png').compress_type, zipfile.ZIP_STORED)
+            with open(csv, 'rb') as f:
+                self.assertEqual(archive.read('dataset/data.csv'), f.read())
+            with open(png, 'rb') as f:
+                self.assertEqual(archive.read('graphs/graph.png'), f.read())
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_abandoned_stream_leaves_no_cache_file(self):
+        csv = self.write_media('data.csv', os.urandom(3 * 1024 * 1024))
+        cache_path = os.path.join(self.media_root, 'cache', 'report.zip')
+
+        archive = stream_zip([(csv, 'data.csv')], cache_path=cache_path)
+        next(archive)
+        archive.close()
+
+        self.assertEqual(os.listdir(os.path.dirname(cache_path)), [])
+
+
+class DownloadAllFilesTests(MediaRootMixin, TestCase):
+    async def test_asgi_download_streams_without_buffering(self):
+        self.write_media('datasets/cleaned/cleaned.csv', b'a,b\n1,2\n')
+        analysis = await DataAnalysis.objects.acreate(
+            dataset_name='data', status='completed', cleaned_file='datasets/cleaned/cleaned.csv',
+        )
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            response = await AsyncClient().get(f'/api/analyses/{analysis.id}/download/results/')
+            data = b''.join([chunk async for chunk in response])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([w for w in caught if 'must consume synchronous iterators' in str(w.message)])
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertEqual(archive.read('dataset/cleaned.csv'), b'a,b\n1,2\n')
+
+
+class ServeMediaTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = bytes(range(256)) * 40
+        self.path = self.write_media('reports/html/report.html', self.content)
+
+    def get(self, **headers):
+        return serve_media(RequestFactory().get('/', headers=headers), self.path, 'text/html')
+
+    def test_full_response_has_validators(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], quote_etag(file_version(self.path)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+    def test_suffix_and_open_ended_ranges(self):
+        self.assertEqual(b''.join(self.get(range='bytes=-10').streaming_content), self.content[-10:])
+        self.assertEqual(b''.join(self.get(range='bytes=10000-').streaming_content), self.content[10000:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_range_for_another_version_sends_whole_file(self):
+        response = self.get(range='bytes=0-9', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_rewritten_file_changes_etag(self):
+        etag = self.get()['ETag']
+        os.utime(self.path, ns=(0, 10 ** 18))
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    async def test_asgi_responses_are_async_iterators(self):
+        for headers in ({}, {'range': 'bytes=5-'}):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                response = serve_media(AsyncRequestFactory().get('/', headers=headers), self.path, 'text/html')
+                data = b''.join([chunk async for chunk in response])
+            response.close()
+            self.assertTrue(response.is_async)
+            self.assertEqual(data, self.content[5:] if headers else self.content)
+            self.assertFalse([w for w in caught if 'must consume synchronous iterators' in str(w.message)])
+
+
+class EventTicketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('events', password='pw')
+        self.client = APIClient()
+
+    def issue_ticket(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/analyses/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(self.client.post('/api/analyses/events/ticket/').status_code, 401)
+
+    async def test_ticket_opens_stream(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        response = await AsyncClient().get('/api/analyses/events/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+    async def test_published_events_reach_the_stream(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        broker = InMemoryBroker()
+        with mock.patch('analyze.events._broker', broker):
+            response = await AsyncClient().get('/api/analyses/events/', {'ticket': ticket})
+            frames = aiter(response.streaming_content)
+            self.assertEqual(await anext(frames), b'retry: 5000\n\n')
+            next_frame = asyncio.ensure_future(anext(frames))
+            channel = user_channel(str(self.user.profile.id))
+            for _ in range(500):  # until the stream has subscribed
+                if broker._subscribers.get(channel):
+                    break
+                await asyncio.sleep(0.01)
+            broker.publish(channel, {'id': 'a1', 'status': 'processing', 'progress': 40})
+            frame = await asyncio.wait_for(next_frame, 5)
+            await frames.aclose()
+        self.assertEqual(frame, b'event: analysis\ndata: {"id": "a1", "status": "processing", "progress": 40}\n\n')
+
+    async def test_expired_or_forged_ticket_is_rejected(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 60):
+            response = await AsyncClient().get('/api/analyses/events/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+        forged = signing.dumps(str(self.user.profile.id), salt='other')
+        response = await AsyncClient().get('/api/analyses/events/', {'ticket': forged})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_jwt_in_query_string_is_not_accepted(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        response = await AsyncClient().get('/api/analyses/events/', {'token': token})
+        self.assertEqual(response.status_code, 401)
+
+
+class CloneAnalysisTests(MediaRootMixin, TestCase):
+    def test_clone_gets_its_own_report(self):
+        owner = User.objects.create_user('owner')
+        other = User.objects.create_user('other')
+        source = DataAnalysis.objects.create(
+            user=owner.profile, dataset_name='owner-private-name', content_hash='abc', status='completed',
+            rows_count=3, columns_count=2,
+        )
+        service = DataAnalysisService(source)
+        service.df = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'label': ['a', 'b', 'c']})
+        service.save_graph_source()
+        service.generate_html_report()
+
+        clone = clone_analysis(source, other.profile, 'my-upload')
+
+        self.assertNotEqual(clone.report_html.name, source.report_html.name)
+        self.assertFalse(source.file_is_shared(source.report_html.name))
+        with open(clone.report_html.path, encoding='utf-8') as f:
+            report = f.read()
+        self.assertIn('my-upload', report)
+        self.assertNotIn('owner-private-name', report)
+
+
+class ParsedCacheTests(MediaRootMixin, TestCase):
+    def frame(self, seed):
+        return pd.DataFrame({'value': [float(seed)] * 1000, 'label': [f'row{seed}'] * 1000})
+
+    def test_least_recently_used_uploads_are_evicted(self):
+        write_cached_frame('a', self.frame(1))
+        write_cached_frame('b', self.frame(2))
+        os.utime(parsed_cache_path('a'), (1, 1))
+        os.utime(parsed_cache_path('b'), (2, 2))
+        self.assertIsNotNone(read_cached_frame('a'))  # now the most recently used
+
+        size = os.path.getsize(parsed_cache_path('a'))
+        with override_settings(ANALYSIS_PARSED_CACHE_SIZE=2 * size):
+            write_cached_frame('c', self.frame(3))
+
+        self.assertTrue(os.path.exists(parsed_cache_path('a')))
+        self.assertFalse(os.path.exists(parsed_cache_path('b')))
+        self.assertTrue(os.path.exists(parsed_cache_path('c')))
+
+    def test_deleting_last_analysis_of_content_drops_parsed_upload(self):
+        user = User.objects.create_user('parsed')
+        first, second = (
+            DataAnalysis.objects.create(user=user.profile, content_hash='h', status='completed') for _ in range(2)
+        )
+        write_cached_frame('h', self.frame(1))
+        self.client.force_login(user)
+
+        self.client.delete(f'/api/analyses/{first.id}/delete/')
+        self.assertTrue(os.path.exists(parsed_cache_path('h')))
+        self.client.delete(f'/api/analyses/{second.id}/delete/')
+        self.assertFalse(os.path.exists(parsed_cache_path('h')))
+
+
+class AnalysisAccessTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create_user('owner')
+        self.other = User.objects.create_user('other')
+        self.write_media('reports/html/report.html', b'<html></html>')
+        self.analysis = DataAnalysis.objects.create(
+            user=self.owner.profile, status='completed', report_html='reports/html/report.html',
+        )
+        self.client = APIClient()
+
+    def test_detail_is_owner_only(self):
+        url = f'/api/analyses/{self.analysis.id}/detail/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(self.owner)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'sig={media_signature(self.analysis.id)}', response.data['report_url'])
+
+    def test_files_need_owner_or_signature(self):
+        url = f'/api/analyses/{self.analysis.id}/files/report/'
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, {'sig': 'forged'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'sig': media_signature(self.analysis.id)}).status_code, 200)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_signatures_expire_and_are_bound_to_the_analysis(self):
+        url = f'/api/analyses/{self.analysis.id}/files/report/'
+        sig = media_signature(self.analysis.id)
+        self.assertEqual(sig, media_signature(self.analysis.id))
+        other = DataAnalysis.objects.create(user=self.owner.profile)
+        self.assertEqual(self.client.get(url, {'sig': media_signature(other.id)}).status_code, 404)
+        with override_settings(ANALYSIS_MEDIA_URL_MAX_AGE=3600):
+            later = time.time() + 2 * 24 * 60 * 60
+            with mock.patch('time.time', return_value=later):
+                self.assertEqual(self.client.get(url, {'sig': sig}).status_code, 404)
+                self.assertEqual(self.client.get(url, {'sig': media_signature(self.analysis.id)}).status_code, 200)
+
+
+class GraphCacheTests(MediaRootMixin, TestCase):
+    def store(self, name, size=1000):
+        os.makedirs(cache.graph_cache_dir('source'), exist_ok=True)
+        rendered = self.write_media(f'{name}.rendered', b'x' * size)
+        cache_path = os.path.join(cache.graph_cache_dir('source'), f'{name}.webp')
+        cache.store_cached_graph(rendered, cache_path)
+        return cache_path
+
+    def test_least_recently_read_render_is_evicted(self):
+        with override_settings(ANALYSIS_GRAPH_CACHE_SIZE=2000):
+            first, second = self.store('first'), self.store('second')
+            os.utime(first, (1, 1))
+            os.utime(second, (2, 2))
+            self.assertTrue(cache.read_cached_graph(first))
+            third = self.store('third')
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
+        self.assertFalse(cache.read_cached_graph(second))
+
+    def test_stores_under_the_cap_do_not_rescan(self):
+        with mock.patch.object(cache, 'evict_graph_cache', wraps=cache.evict_graph_cache) as evict:
+            for i in range(10):
+                self.store(f'graph{i}')
+            self.assertEqual(evict.call_count, 1)  # the first store learns the cache size
+            with override_settings(ANALYSIS_GRAPH_CACHE_SIZE=5000):
+                self.store('over')
+            self.assertEqual(evict.call_count, 2)
+        self.assertEqual(len(os.listdir(cache.graph_cache_dir('source'))), 5)
+
+
+class ScatterMatrixTests(MediaRootMixin, TestCase):
+    def frame(self, rows=1000, columns=10):
+        rng = np.random.default_rng(5)
+        df = pd.DataFrame({f'n{i}': rng.normal(size=rows) for i in range(columns)})
+        df['n7'] = df['n2'] * 2 + rng.normal(scale=0.1, size=rows)
+        df['n9'] = -df['n4'] + rng.normal(scale=0.2, size=rows)
+        return df
+
+    def test_columns_are_capped_to_the_strongest_pairs(self):
+        df = self.frame()
+        selected = select_scatter_columns(df, df.columns, max_columns=4)
+        self.assertEqual(selected, ['n2', 'n4', 'n7', 'n9'])
+        self.assertEqual(len(select_scatter_columns(df, df.columns)), 6)
+        self.assertEqual(select_scatter_columns(df, ['n1', 'n3']), ['n1', 'n3'])
+
+    def test_large_frames_render_as_density_cells(self):
+        df = self.frame(rows=6000)
+        with mock.patch('matplotlib.axes.Axes.scatter') as scatter:
+            record = render_graph(df, {'graph_type': 'scatter', 'columns': list(df.columns)}, self.media_root)
+        scatter.assert_not_called()
+        self.assertEqual(record['column_names'], list(df.columns))
+        self.assertTrue(os.path.exists(record['file_path']))
+
+
+class RenderProfileTests(MediaRootMixin, TestCase):
+    def test_preview_and_print_outputs(self):
+        df = pd.DataFrame({'amount': np.random.default_rng(6).lognormal(size=500)})
+        job = {'graph_type': 'histogram', 'columns': ['amount']}
+        preview = render_graph(df, job, self.media_root, 'preview')['file_path']
+        printed = render_graph(df, job, self.media_root, 'print')['file_path']
+
+        self.assertEqual(os.path.basename(preview), 'histogram_amount.webp')
+        self.assertEqual(os.path.basename(printed), 'histogram_amount.print.png')
+        with Image.open(preview) as preview_image, Image.open(printed) as print_image:
+            self.assertEqual((preview_image.format, print_image.format), ('WEBP', 'PNG'))
+            self.assertAlmostEqual(print_image.width / preview_image.width, 3, delta=0.1)
+        self.assertFalse([name for name in os.listdir(self.media_root) if name.endswith('.tmp')])
+
+
+def graph_frame(rows=300):
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'when': pd.date_range('2024-01-01', periods=rows, freq='h'),
+        'price': rng.normal(100, 10, rows),
+        'qty': rng.integers(1, 20, rows),
+        'region': rng.choice(['north', 'south'], rows),
+    })
+
+
+class LazyGraphTests(MediaRootMixin, TestCase):
+    def test_plan_graph_jobs(self):
+        jobs = plan_graph_jobs(graph_frame(), total_rows=1000)
+        self.assertEqual([(job['graph_type'], job['columns']) for job in jobs], [
+            ('overview', ['all']),
+            ('histogram', ['price']), ('histogram', ['qty']),
+            ('boxplot', ['price']), ('boxplot', ['qty']),
+            ('countplot', ['region']),
+            ('correlation', ['price', 'qty']),
+            ('scatter', ['price', 'qty']),
+            ('timeseries', ['when', 'price']),
+        ])
+        self.assertEqual(jobs[0]['total_rows'], 1000)
+        self.assertEqual([job['graph_type'] for job in plan_graph_jobs(pd.DataFrame({'x': [1.0]}))],
+                         ['overview', 'histogram', 'boxplot'])
+
+    def test_image_is_rendered_on_first_request_and_cached(self):
+        owner = User.objects.create_user('owner')
+        analysis = DataAnalysis.objects.create(user=owner.profile, status='completed')
+        service = DataAnalysisService(analysis)
+        service.df = graph_frame()
+        service.generate_graphs()
+        graph = analysis.graphs.get(graph_type='histogram', column_names=['price'])
+        self.assertEqual(graph.file_path, '')
+
+        client = APIClient()
+        client.force_authenticate(owner)
+        url = f'/api/analyses/{analysis.id}/graphs/{graph.id}/image/'
+        with mock.patch('analyze.services.render_graph', wraps=render_graph) as render:
+            first = client.get(url)
+            second = client.get(url)
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(b''.join(first.streaming_content)[:4], b'RIFF')
+        cached = os.listdir(cache.graph_cache_dir(service._graph_source_key()))
+        self.assertEqual(len(cached), 1)
+        self.assertTrue(cached[0].endswith('.webp'))
+        self.assertEqual(client.get(url, {'profile': 'poster'}).status_code, 400)
+
+
+class ChartDataTests(MediaRootMixin, TestCase):
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x = np.arange(100000, dtype=np.float64)
+        y = np.sin(x / 5000)
+        y[54321] = 50.0
+        keep = lttb(x, y, 1000)
+        self.assertEqual(len(keep), 1000)
+        self.assertEqual((keep[0], keep[-1]), (0, len(x) - 1))
+        self.assertTrue((np.diff(keep) > 0).all())
+        self.assertIn(54321, keep)
+        np.testing.assert_array_equal(lttb(x[:500], y[:500], 1000), np.arange(500))
+
+    def test_graph_data_endpoint(self):
+        owner = User.objects.create_user('owner')
+        analysis = DataAnalysis.objects.create(user=owner.profile, status='completed')
+        service = DataAnalysisService(analysis)
+        service.df = graph_frame(5000).assign(flat=1.0)
+        service.generate_graphs()
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        def data(graph_type):
+            graph = analysis.graphs.get(graph_type=graph_type)
+            response = client.get(f'/api/analyses/{analysis.id}/graphs/{graph.id}/data/')
+            self.assertEqual(response.status_code, 200)
+            return json.loads(response.content)['data']
+
+        timeseries = data('timeseries')
+        self.assertEqual((len(timeseries['x']), len(timeseries['y']), timeseries['points']), (1000, 1000, 5000))
+        self.assertEqual(timeseries['x'][0], '2024-01-01T00:00:00')
+        correlation = data('correlation')
+        flat = correlation['columns'].index('flat')
+        # Correlations with a constant column are NaN, sent as null
+        self.assertIsNone(correlation['matrix'][0][flat])
+        self.assertEqual(correlation['matrix'][0][0], 1.0)
+        self.assertEqual(sum(data('countplot')['counts']), 5000)
+
+
+class TypeInferenceTests(TestCase):
+    def test_datetime_formats(self):
+        self.assertEqual(detect_datetime_format(pd.Series(['31/12/2024', '01/02/2024'])), '%d/%m/%Y')
+        self.assertEqual(detect_datetime_format(pd.Series(['2024-01-02 10:30:00'])), '%Y-%m-%d %H:%M:%S')
+        self.assertIsNone(detect_datetime_format(pd.Series(['2024-01-02', 'soon'])))
+        self.assertIsNone(detect_datetime_format(pd.Series([], dtype=object)))
+
+    def test_sample_spans_the_whole_column(self):
+        # Numbers up front, words for the last half: a head sample would call it numeric
+        series = pd.Series([str(i) for i in range(5000)] + [f'item {i % 40}' for i in range(5000)])
+        converted, report = infer_column_type(series)
+        self.assertEqual(report['type'], 'text')
+        self.assertIsNone(converted)
+
+    def test_inferred_types(self):
+        dates = pd.Series([f'2024-03-{i % 28 + 1:02d}' for i in range(300)] + [None])
+        converted, report = infer_column_type(dates)
+        self.assertEqual((report['type'], report['format']), ('datetime', '%Y-%m-%d'))
+        self.assertEqual(converted.isna().sum(), 1)
+
+        # Two thirds numbers is below the numeric threshold
+        converted, report = infer_column_type(pd.Series(['1.5', '2', 'x'] * 100))
+        self.assertEqual(report['type'], 'category')
+        converted, report = infer_column_type(pd.Series(['1.5', '2', '3', '4', '5', '6', '7', '8', '9', 'x'] * 50))
+        self.assertEqual(report['type'], 'numeric')
+        self.assertEqual(converted.isna().sum(), 50)
+
+        converted, report = infer_column_type(pd.Series(['north', 'south'] * 100))
+        self.assertEqual(report['type'], 'category')
+        self.assertEqual(str(converted.dtype), 'category')
+
+    def test_optimize_dtypes_leaves_dates_and_numbers_to_inference(self):
+        df = pd.DataFrame({
+            'count': np.arange(300, dtype=np.int64),
+            'half': np.arange(300) / 2,
+            'ratio': np.arange(300) / 3,
+            'region': ['north', 'south', 'east'] * 100,
+            'name': [f'customer {i}' for i in range(300)],
+            'day': [f'2024-03-{i % 28 + 1:02d}' for i in range(300)],
+            'amount': [str(i) for i in range(300)],
+        })
+        profile = optimize_dtypes(df)
+        self.assertEqual(df.dtypes.astype(str).to_dict(), {
+            'count': 'int16', 'half': 'float32', 'ratio': 'float64', 'region': 'category',
+            'name': 'string', 'day': 'object', 'amount': 'object',
+        })
+        self.assertLess(profile['total_after'], profile['total_before'])
+        self.assertEqual(profile['columns']['count']['dtype_before'], 'int64')
+
+    def test_compacted_string_columns_are_still_converted(self):
+        service = DataAnalysisService(DataAnalysis(dataset_name='types'))
+        days = [f'2024-03-{i % 28 + 1:02d}' for i in range(300)]
+        service.df = pd.DataFrame({
+            'day': pd.Series(days, dtype='category'),
+            'when': pd.Series(days, dtype=pd.StringDtype('pyarrow')),
+            'region': pd.Series(['north', 'south', 'east'] * 100, dtype='category'),
+            'name': pd.Series([f'customer {i}' for i in range(300)], dtype=pd.StringDtype('pyarrow')),
+        })
+        column_types = service._convert_types()
+        self.assertEqual({column: report['type'] for column, report in column_types.items()}, {
+            'day': 'datetime', 'when': 'datetime', 'region': 'category', 'name': 'text',
+        })
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(service.df['day']))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(service.df['when']))
+
+
+class CleaningTests(TestCase):
+    def service(self):
+        service = DataAnalysisService(DataAnalysis(dataset_name='cleaning'))
+        service.df = pd.DataFrame({
+            'price': [1.0, 2.0, 3.0, 4.0, np.nan, 5.0, 6.0, 100.0],
+            'qty': [1, 2, 2, 3, 2, 1, 50, 2],
+            'region': ['n', 's', None, 'n', 'n', None, 's', 'e'],
+            'notes': [None, None, None, None, None, 'a', 'b', 'c'],
+            'flag': [True, False] * 4,
+            'code': pd.Categorical(['x', 'y', 'x', None, 'x', 'y', 'x', 'y']),
+        })
+        return service
+
+    def test_fill_missing_values(self):
+        service = self.service()
+        self.assertEqual(service._fill_missing_values(), 9)
+        df = service.df
+        self.assertEqual(list(df.columns), ['price', 'qty', 'region', 'flag', 'code'])
+        self.assertEqual(df['price'].tolist(), [1.0, 2.0, 3.0, 4.0, 4.0, 5.0, 6.0, 100.0])
+        self.assertEqual(df['region'].tolist(), ['n', 's', 'n', 'n', 'n', 'n', 's', 'e'])
+        self.assertEqual(df['code'].tolist(), ['x', 'y', 'x', 'x', 'x', 'y', 'x', 'y'])
+        self.assertEqual((df['qty'].dtype, df['flag'].dtype), (np.dtype('int64'), np.dtype('bool')))
+
+    def test_cap_outliers(self):
+        service = self.service()
+        service._fill_missing_values()
+        self.assertEqual(service._cap_outliers(), 2)
+        # price: Q1 2.75, Q3 5.25, fences -1 and 9; qty: Q1 1.75, Q3 2.25, fences 1 and 3
+        self.assertEqual(service.outlier_bounds, {'price': (-1.0, 9.0), 'qty': (1.0, 3.0)})
+        self.assertEqual(service.df['price'].tolist(), [1.0, 2.0, 3.0, 4.0, 4.0, 5.0, 6.0, 9.0])
+        self.assertEqual(service.df['qty'].tolist(), [1, 2, 2, 3, 2, 1, 3, 2])
+        self.assertEqual(service.df['flag'].tolist(), [True, False] * 4)
+
+
+def wide_frame(columns, rows=500):
+    """Float columns with gaps and outliers, int columns and text columns, cycling in that order"""
+    rng = np.random.default_rng(columns)
+    data = {}
+    for i in range(columns):
+        if i % 3 == 0:
+            values = rng.normal(100, 15, rows)
+            values[rng.random(rows) < 0.02] *= 10
+            values[rng.random(rows) < 0.1] = np.nan
+            data[f'float_{i}'] = values
+        elif i % 3 == 1:
+            data[f'int_{i}'] = rng.integers(0, 1000, rows)
+        else:
+            data[f'str_{i}'] = rng.choice(['alpha', 'beta', 'gamma', 'delta'], rows).astype(object)
+    return pd.DataFrame(data)
+
+
+class StageQueryCountTests(MediaRootMixin, TestCase):
+    """Each stage writes its rows in one bulk insert, so its query count does not grow with the columns"""
+
+    def assertStageQueries(self, df):
+        analysis = DataAnalysis.objects.create(dataset_name='queries', status='processing')
+        service = DataAnalysisService(analysis)
+        service.df = df
+        with self.assertNumQueries(1):  # the analysis update
+            service.clean_data()
+        with self.assertNumQueries(4):  # savepoint, insert, analysis update, release
+            service.generate_insights()
+        with self.assertNumQueries(3):  # savepoint, insert, release
+            service.generate_graphs()
+        return analysis
+
+    def test_narrow_frame(self):
+        analysis = self.assertStageQueries(wide_frame(3))
+        self.assertTrue(analysis.graphs.exists())
+
+    def test_wide_frame(self):
+        analysis = self.assertStageQueries(wide_frame(60))
+        self.assertGreater(analysis.graphs.count(), 60)
+
+
+class InsightDetectorTests(TestCase):
+    def service(self):
+        service = DataAnalysisService(DataAnalysis(missing_values_count=0, duplicates_count=0))
+        service.df = pd.DataFrame({'x': [1.0, 2.0, 3.0, 4.0], 'y': [2.0, 4.0, 6.0, 8.0]})
+        return service
+
+    @override_settings(ANALYSIS_INSIGHT_DETECTORS=['overview', 'no_such_detector'])
+    def test_unknown_detectors_are_skipped_and_reported(self):
+        insights, timings = run_insight_detectors(self.service())
+        self.assertEqual(list(timings['detectors']), ['overview'])
+        self.assertTrue(insights)
+        errors = check_insight_detectors(None)
+        self.assertEqual([error.id for error in errors], ['analyze.E001'])
+        self.assertIn('no_such_detector', errors[0].msg)
+
+    def test_registered_detectors_pass_the_check(self):
+        self.assertEqual(check_insight_detectors(None), [])
+
+    def test_spent_budget_truncates_column_loops(self):
+        service = self.service()
+        rng = np.random.default_rng(0)
+        service.df = pd.DataFrame({f"c{i}": rng.exponential(size=200) for i in range(20)})
+        insights, timings = run_insight_detectors(service, detectors=['skewness'])
+        self.assertEqual(timings['detectors']['skewness']['status'], 'ok')
+        self.assertEqual(len(insights), 20)
+        with mock.patch.dict(INSIGHT_DETECTORS['skewness'], budget=0):
+            insights, timings = run_insight_detectors(service, detectors=['skewness'])
+        self.assertEqual(timings['detectors']['skewness']['status'], 'partial')
+        self.assertEqual(insights, [])
+
+
+class CorrelationMatrixTests(TestCase):
+    def frame(self):
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=500)
+        df = pd.DataFrame({
+            'a': base,
+            'b': base * 2 + rng.normal(scale=0.1, size=500),
+            'c': rng.normal(size=500),
+            'd': -base + rng.normal(scale=0.5, size=500),
+            'label': ['x'] * 500,
+        })
+        for column, fraction in (('a', 0.1), ('b', 0.2), ('c', 0.3)):
+            df.loc[rng.random(500) < fraction, column] = np.nan
+        return df
+
+    def test_matches_pandas_with_missing_values(self):
+        df = self.frame()
+        expected = df.drop(columns='label').corr()
+        pd.testing.assert_frame_equal(correlation_matrix(df), expected, atol=1e-9)
+
+    def test_float32_frames_match_pandas(self):
+        df = self.frame().drop(columns='label').astype('float32')
+        pd.testing.assert_frame_equal(correlation_matrix(df), df.corr(), atol=1e-5, check_dtype=False)
+
+    def test_spearman_matches_pandas_without_missing_values(self):
+        df = self.frame().drop(columns='label').dropna()
+        pd.testing.assert_frame_equal(correlation_matrix(df, 'spearman'), df.corr('spearman'), atol=1e-9)
+
+    def test_pairs_without_overlap_and_constant_columns_are_nan(self):
+        df = pd.DataFrame({
+            'a': [1.0, 2.0, np.nan, np.nan],
+            'b': [np.nan, np.nan, 3.0, 4.0],
+            'c': [1.0, 1.0, 1.0, 1.0],
+            'd': [4.0, 3.0, 2.0, 1.0],
+        })
+        result = correlation_matrix(df)
+        pd.testing.assert_frame_equal(result, df.corr(), atol=1e-9)
+        self.assertTrue(np.isnan(result.loc['a', 'b']))
+        self.assertTrue(np.isnan(result.loc['c', 'c']))
+
+    def test_fewer_than_two_numeric_columns(self):
+        self.assertIsNone(correlation_matrix(pd.DataFrame({'a': [1.0, 2.0], 'label': ['x', 'y']})))
+        with self.assertRaises(ValueError):
+            correlation_matrix(self.frame(), 'kendall')
+
+    def test_strongest_pairs(self):
+        matrix = self.frame().drop(columns='label').corr()
+        expected = sorted(
+            ((a, b) for i, a in enumerate(matrix.columns) for b in matrix.columns[i + 1:]
+             if abs(matrix.loc[a, b]) > 0.7),
+            key=lambda pair: -abs(matrix.loc[pair]),
+        )
+        pairs = strongest_pairs(correlation_matrix(self.frame()), threshold=0.7, k=2)
+        self.assertEqual([(a, b) for a, b, _ in pairs], expected[:2])
+        self.assertEqual(len(strongest_pairs(matrix, threshold=0.7, k=10)), len(expected))
+
+
+class SniffCsvDialectTests(MediaRootMixin, TestCase):
+    def sniff(self, content, **kwargs):
+        return sniff_csv_dialect(self.write_media('upload.csv', content), **kwargs)
+
+    def test_semicolons(self):
+        dialect = self.sniff(b'name;price;qty\napple;1,5;3\npear;2,25;4\n')
+        self.assertEqual(dialect['delimiter'], ';')
+        self.assertEqual(dialect['header_row'], 0)
+
+    def test_quoted_fields_containing_delimiters(self):
+        dialect = self.sniff(
+            b"'id','comment','city'\n1,'hello, world','Paris'\n2,'a, b, c','Lyon'\n3,'x','Nice'\n"
+        )
+        self.assertEqual(dialect['delimiter'], ',')
+        self.assertEqual(dialect['quotechar'], "'")
+
+    def test_preamble_lines_are_skipped(self):
+        dialect = self.sniff(b'Exported report\n\na\tb\tc\n1\t2\t3\n4\t5\t6\n')
+        self.assertEqual(dialect['delimiter'], '\t')
+        self.assertEqual(dialect['header_row'], 1)
+
+    def test_encodings(self):
+        self.assertEqual(self.sniff('a,b\ncafé,1\n'.encode('cp1252'))['encoding'], 'cp1252')
+        self.assertEqual(self.sniff(b'\xef\xbb\xbfa,b\n1,2\n')['encoding'], 'utf-8-sig')
+        # A multi-byte character cut by the sample boundary still reads as UTF-8
+        content = 'a,b\n' + 'é,1\n' * 100
+        self.assertEqual(self.sniff(content.encode('utf-8'), sample_size=10)['encoding'], 'utf-8')
+
+
+def chunks(frame, size):
+    return [frame.iloc[start:start + size] for start in range(0, len(frame), size)]
+
+
+class StreamingAccumulatorTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.values = pd.Series(rng.lognormal(size=20000))
+        self.values[rng.random(20000) < 0.05] = np.nan
+
+    def accumulate(self, series, size):
+        """One accumulator per chunk, merged pairwise like per-worker results"""
+        parts = []
+        for seed, chunk in enumerate(chunks(series, size)):
+            accumulator = ColumnAccumulator(seed)
+            accumulator.update(chunk)
+            parts.append(accumulator)
+        result = parts[0]
+        for part in parts[1:]:
+            result.merge(part)
+        return result
+
+    def test_merged_moments_match_a_single_pass(self):
+        accumulator = self.accumulate(self.values, 3001)
+        values = self.values.dropna()
+        self.assertEqual(accumulator.rows, len(self.values))
+        self.assertEqual(accumulator.missing, int(self.values.isna().sum()))
+        self.assertEqual(accumulator.count, len(values))
+        self.assertAlmostEqual(accumulator.mean, values.mean(), places=9)
+        self.assertAlmostEqual(accumulator.variance(), values.var(), places=7)
+        centered = values - values.mean()
+        biased_skew = (centered ** 3).mean() / (centered ** 2).mean() ** 1.5
+        self.assertAlmostEqual(accumulator.skewness(), biased_skew, places=7)
+        self.assertEqual((accumulator.min, accumulator.max), (values.min(), values.max()))
+        self.assertTrue(accumulator.is_numeric)
+
+    def test_sample_quantiles_are_close(self):
+        accumulator = self.accumulate(self.values, 2500)
+        values = self.values.dropna()
+        self.assertEqual(len(accumulator.sample.values), 10000)
+        rank = (values < accumulator.quantile(0.5)).mean()
+        self.assertLess(abs(rank - 0.5), 0.02)
+
+    def test_distinct_sketch(self):
+        exact = DistinctSketch()
+        exact.update(pd.Series(np.arange(1000) % 300))
+        self.assertEqual((exact.estimate(), exact.relative_error()), (300, 0.0))
+
+        left, right = DistinctSketch(), DistinctSketch()
+        left.update(pd.Series(np.arange(0, 60000)))
+        right.update(pd.Series(np.arange(40000, 100000)))
+        merged = left.merge(right)
+        self.assertLess(abs(merged.estimate() / 100000 - 1), 3 * merged.relative_error())
+
+    def test_bottom_k_sample_merge_keeps_capacity(self):
+        left, right = BottomKSample(100, seed=1), BottomKSample(100, seed=2)
+        left.update(np.arange(0, 1000))
+        right.update(np.arange(1000, 2000))
+        left.merge(right)
+        self.assertEqual(len(left.values), 100)
+        self.assertEqual(len(set(left.values)), 100)
+        self.assertTrue(0 < (left.values < 1000).mean() < 1)
+
+    def test_histogram_merge(self):
+        edges = np.linspace(0, 10, 21)
+        merged = HistogramAccumulator(edges)
+        for chunk in chunks(self.values, 7000):
+            part = HistogramAccumulator(edges)
+            part.update(chunk)
+            merged.merge(part)
+        expected, _ = np.histogram(self.values.dropna(), bins=edges)
+        np.testing.assert_array_equal(merged.counts, expected)
+
+    def test_correlation_merge_matches_pandas(self):
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame({'a': rng.normal(size=5000)})
+        df['b'] = df['a'] * 3 + rng.normal(size=5000)
+        df['c'] = rng.normal(size=5000)
+        df.loc[rng.random(5000) < 0.1, 'b'] = np.nan
+        merged = CorrelationAccumulator(df.columns)
+        for chunk in chunks(df, 1200):
+            part = CorrelationAccumulator(df.columns)
+            part.update(chunk)
+            merged.merge(part)
+        pd.testing.assert_frame_equal(merged.matrix(), df.corr(), atol=1e-9)
+
+    def test_correlation_is_pairwise_complete(self):
+        # Like DataFrame.corr(): a column missing in some rows does not shrink the other pairs
+        df = pd.DataFrame({
+            'a': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            'b': [2.0, 4.1, 5.9, 8.2, 9.9, 12.1],
+            'c': [np.nan, np.nan, 1.0, 3.0, 2.0, 5.0],
+            'd': [np.nan, np.nan, np.nan, np.nan, 7.0, 7.0],
+        })
+        merged = CorrelationAccumulator(df.columns)
+        for chunk in chunks(df, 4):
+            part = CorrelationAccumulator(df.columns)
+            part.update(chunk)
+            merged.merge(part)
+        pd.testing.assert_frame_equal(merged.matrix(), df.corr(), atol=1e-12)
+        self.assertEqual(merged.count[0, 1], 6)
+
+    def test_text_columns_are_not_numeric(self):
+        accumulator = self.accumulate(pd.Series(['a', 'b', None, 'a'] * 10), 7)
+        self.assertFalse(accumulator.is_numeric)
+        self.assertEqual(accumulator.missing, 10)
+        self.assertEqual(accumulator.distinct.estimate(), 2)
+        self.assertEqual(accumulator.top.most_common(1).to_dict(), {'a': 20})
+
+
+class SketchTests(TestCase):
+    def test_hyperloglog_merge_is_within_error(self):
+        left, right = HyperLogLog(), HyperLogLog()
+        left.update(pd.Series([f'user{i}' for i in range(0, 300000)]))
+        right.update(pd.Series([f'user{i}' for i in range(200000, 500000)]))
+        self.assertLess(abs(left.estimate() / 300000 - 1), 3 * left.relative_error())
+        merged = left.merge(right)
+        self.assertLess(abs(merged.estimate() / 500000 - 1), 3 * merged.relative_error())
+
+    def test_hyperloglog_small_cardinalities(self):
+        sketch = HyperLogLog()
+        sketch.update(pd.Series(np.arange(5000) % 100))
+        self.assertEqual(sketch.estimate(), 100)
+        self.assertEqual(HyperLogLog().estimate(), 0)
+
+    def test_kll_merge_is_within_rank_error(self):
+        rng = np.random.default_rng(3)
+        values = rng.lognormal(size=200000)
+        merged = KLLSketch(seed=0)
+        for seed, chunk in enumerate(np.array_split(values, 8)):
+            part = KLLSketch(seed=seed + 1)
+            part.update(chunk)
+            merged.merge(part)
+        self.assertEqual(merged.count, len(values))
+        self.assertLess(sum(len(level) for level in merged.levels), 3 * merged.capacity)
+        q = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+        ranks = np.searchsorted(np.sort(values), merged.quantile(q)) / len(values)
+        self.assertLessEqual(np.abs(ranks - q).max(), merged.rank_error())
+
+    def test_kll_is_exact_before_compaction(self):
+        sketch = KLLSketch()
+        sketch.update(np.array([3.0, 1.0, np.nan, 2.0]))
+        self.assertEqual((sketch.quantile(0.5), sketch.rank_error()), (2.0, 0.0))
+        self.assertTrue(np.isnan(KLLSketch().quantile(0.5)))
+
+    def test_top_k_undercount_is_bounded(self):
+        rng = np.random.default_rng(4)
+        values = pd.Series(np.minimum(rng.zipf(1.3, size=200000), 5000))
+        merged = TopKCounter(capacity=50)
+        for chunk in chunks(values, 30000):
+            part = TopKCounter(capacity=50)
+            part.update(chunk)
+            merged.merge(part)
+
+        exact = values.value_counts()
+        reported = merged.most_common()
+        undercount = exact[reported.index.astype(int)].to_numpy() - reported.to_numpy()
+        self.assertTrue((undercount >= 0).all())
+        self.assertLessEqual(undercount.max(), merged.error)
+        self.assertLessEqual(merged.error, len(values) / (merged.capacity + 1))
+        self.assertLessEqual(len(merged.counts), merged.capacity)
+        self.assertEqual(list(merged.most_common(5).index), list(exact.index[:5]))
+
+    def test_sketch_frame_approximates_every_column(self):
+        df = pd.DataFrame({'amount': np.arange(50000, dtype=float), 'code': [f'c{i % 700}' for i in range(50000)]})
+        accumulators = sketch_frame(df, chunk_rows=12000)
+        distinct = accumulators['code'].distinct
+        self.assertLess(abs(distinct.estimate() / 700 - 1), 3 * distinct.relative_error())
+        median = accumulators['amount'].quantile(0.5)
+        self.assertLess(abs(median / 50000 - 0.5), accumulators['amount'].quantiles.rank_error())
+
+
+class ListAnalysesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lister')
+        other = User.objects.create_user('someone-else')
+        self.analyses = [
+            DataAnalysis.objects.create(user=self.user.profile, dataset_name=f'set{i}') for i in range(5)
+        ]
+        DataAnalysis.objects.create(user=other.profile, dataset_name='not-mine')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pages_cover_own_analyses_newest_first(self):
+        names, url = [], '/api/analyses/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            names += [item['dataset_name'] for item in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(names, [f'set{i}' for i in reversed(range(5))])
+
+    def test_unchanged_list_answers_304(self):
+        response = self.client.get('/api/analyses/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/analyses/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        DataAnalysis.objects.filter(id=self.analyses[0].id).update(status='completed', updated_at=timezone.now())
+        response = self.client.get('/api/analyses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_page_and_fields(self):
+        etags = {self.client.get(url)['ETag'] for url in (
+            '/api/analyses/', '/api/analyses/?page_size=2', '/api/analyses/?fields=id,status',
+        )}
+        self.assertEqual(len(etags), 3)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/api/analyses/?fields=id,dataset_name,report_url')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'dataset_name', 'report_url'})
+        self.assertEqual(self.client.get('/api/analyses/?fields=id,nope').status_code, 400)
+
+
+def sample_csv(rows=200):
+    """Small upload with numeric, categorical, date and missing values"""
+    lines = ['date,price,qty,region']
+    for i in range(rows):
+        price = '' if i % 17 == 0 else f'{10 + (i % 23) * 1.5:.2f}'
+        lines.append(f'2024-01-{i % 28 + 1:02d},{price},{i % 7},{"north" if i % 3 else "south"}')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+@override_settings(ANALYSIS_PRERENDER_GRAPHS=False)
+class PipelineTests(MediaRootMixin, TestCase):
+    """The Celery chain, run eagerly inside the upload request"""
+
+    def setUp(self):
+        super().setUp()
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.update(CELERY_TASK_ALWAYS_EAGER=True)
+        self.addCleanup(celery_app.conf.update, CELERY_TASK_ALWAYS_EAGER=eager)
+        patcher = mock.patch('analyze.events._broker', InMemoryBroker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('uploader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='sales.csv'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, content)}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return DataAnalysis.objects.get(id=response.data['id'])
+
+    def test_upload_runs_every_stage(self):
+        analysis = self.upload(sample_csv())
+
+        self.assertEqual(analysis.status, 'completed')
+        self.assertEqual((analysis.progress, analysis.progress_stage), (100, 'completed'))
+        self.assertEqual((analysis.rows_count, analysis.columns_count), (200, 4))
+        self.assertTrue(analysis.insights.exists())
+        self.assertTrue(analysis.graphs.exists())
+        self.assertTrue(os.path.exists(analysis.cleaned_file.path))
+        self.assertTrue(os.path.exists(analysis.report_html.path))
+        self.assertFalse(os.path.exists(DataAnalysisService(analysis).work_dir))
+
+    def test_corrupt_upload_fails(self):
+        analysis = self.upload(b'\x00\x01 not a table \x02\n\x03')
+
+        self.assertEqual(analysis.status, 'failed')
+        self.assertFalse(os.path.exists(DataAnalysisService(analysis).work_dir))
+
+    def test_failing_stage_clears_checkpoints(self):
+        with mock.patch.object(DataAnalysisService, 'generate_insights', side_effect=RuntimeError('boom')):
+            analysis = self.upload(sample_csv())
+
+        self.assertEqual(analysis.status, 'failed')
+        self.assertEqual(analysis.progress_stage, 'generate_insights')
+        self.assertFalse(os.path.exists(DataAnalysisService(analysis).work_dir))
+
+    @override_settings(ANALYSIS_OPTIMIZE_MEMORY=True)
+    def test_dates_stored_as_text_are_parsed_after_memory_optimization(self):
+        analysis = self.upload(sample_csv())
+
+        self.assertEqual(analysis.memory_profile['columns']['date']['dtype_after'], 'object')
+        self.assertEqual(analysis.column_types['date']['type'], 'datetime')
+        self.assertEqual(analysis.column_types['region']['type'], 'category')
+
+    @override_settings(ANALYSIS_STREAMING_THRESHOLD=0)
+    def test_streaming_upload_records_column_types(self):
+        analysis = self.upload(sample_csv())
+
+        self.assertTrue(analysis.streaming)
+        self.assertEqual(analysis.status, 'completed')
+        self.assertEqual({column: report['type'] for column, report in analysis.column_types.items()}, {
+            'date': 'datetime', 'price': 'numeric', 'qty': 'numeric', 'region': 'category',
+        })
+        self.assertEqual(analysis.column_types['date']['format'], '%Y-%m-%d')
+
+    @override_settings(ANALYSIS_PRERENDER_GRAPHS=True)
+    def test_prerender_warms_graphs_shown_first(self):
+        with mock.patch.object(DataAnalysisService, 'render_graph_file') as render:
+            analysis = self.upload(sample_csv())
+
+        rendered = sorted(call.args[0].graph_type for call in render.call_args_list)
+        self.assertEqual(rendered, ['correlation', 'overview'])
+        self.assertGreater(analysis.graphs.count(), len(rendered))
@@ -5,9 +5,15 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('upload/', views.upload_dataset, name='upload_dataset'),
     path('analyses/', views.list_analyses, name='list_analyses'),
+    path('analyses/events/', views.analysis_events, name='analysis_events'),
+    path('analyses/events/ticket/', views.issue_event_ticket, name='analysis_events_ticket'),
     path('analyses/<uuid:analysis_id>/', views.get_analysis, name='get_analysis'),
+    path('analyses/<uuid:analysis_id>/detail/', views.get_analysis_detail, name='get_analysis_detail'),
     path('analyses/<uuid:analysis_id>/insights/', views.get_analysis_insights, name='get_analysis_insights'),
     path('analyses/<uuid:analysis_id>/graphs/', views.get_analysis_graphs, name='get_analysis_graphs'),
+    path('analyses/<uuid:analysis_id>/graphs/<int:graph_id>/image/', views.get_graph_image, name='graph_image'),
+    path('analyses/<uuid:analysis_id>/graphs/<int:graph_id>/data/', views.get_graph_data, name='graph_data'),
+    path('analyses/<uuid:analysis_id>/files/<str:kind>/', views.get_analysis_file, name='analysis_file'),
     path("analyses/<uuid:analysis_id>/download/results/", views.download_all_files, name="download_results"),
     path('analyses/<uuid:analysis_id>/delete/', views.delete_analysis, name='delete_analysis'),
 ]
@@ -2,18 +2,32 @@ from rest_framework import status
 from rest_framework.decorators import api_view, parser_classes, permission_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.core import signing
 from django.core.files.storage import default_storage
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 import os
-import time
-import traceback
+import json
+import hashlib
 from .models import DataAnalysis, AnalysisInsight, GeneratedGraph
 from rest_framework.permissions import IsAuthenticated
-from .serializers import DataAnalysisSerializer, AnalysisInsightSerializer, GeneratedGraphSerializer
-from .services import DataAnalysisService
-import zipfile
-from io import BytesIO
+from .serializers import (
+    DataAnalysisSerializer, DataAnalysisDetailSerializer, AnalysisInsightSerializer, GeneratedGraphSerializer
+)
+from .tasks import start_analysis_pipeline
+from .services import DataAnalysisService, clone_analysis, find_reusable_analysis
+from .rendering import RENDER_PROFILES
+from .cache import HashingUploadHandler, prune_cached_archives
+from .archive import stream_zip
+from .media import async_safe, can_read_media, file_version, serve_media
+from .events import get_broker, user_channel
+from .pagination import AnalysisCursorPagination
 from django.shortcuts import get_object_or_404
 
 @api_view(['POST'])
@@ -21,6 +35,9 @@ from django.shortcuts import get_object_or_404
 @permission_classes([IsAuthenticated])
 def upload_dataset(request):
     """Upload and initiate analysis of dataset"""
+    # Hash the upload while it streams in, before the multipart body is parsed
+    hashing_handler = HashingUploadHandler(request)
+    request.upload_handlers.insert(0, hashing_handler)
     try:
         if 'file' not in request.FILES:
             return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
@@ -28,10 +45,6 @@ def upload_dataset(request):
         uploaded_file = request.FILES['file']
         dataset_name = request.data.get('dataset_name', uploaded_file.name)
         
-        # Validate file size (50MB limit)
-        if uploaded_file.size > 50 * 1024 * 1024:
-            return Response({'error': 'File size exceeds 50MB limit'}, status=status.HTTP_400_BAD_REQUEST)
-        
         # Validate file type
         allowed_extensions = ['.csv', '.xlsx', '.xls', '.json']
         file_extension = os.path.splitext(uploaded_file.name)[1].lower()
@@ -39,75 +52,38 @@ def upload_dataset(request):
             return Response({'error': f'Unsupported file type. Allowed: {", ".join(allowed_extensions)}'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        # Validate file size: large CSVs are analysed in streaming mode, other formats must fit in memory
+        streaming = file_extension == '.csv' and uploaded_file.size > settings.ANALYSIS_STREAMING_THRESHOLD
+        size_limit = settings.ANALYSIS_MAX_UPLOAD_SIZE if file_extension == '.csv' else settings.ANALYSIS_STREAMING_THRESHOLD
+        if uploaded_file.size > size_limit:
+            return Response({'error': f'File size exceeds {size_limit // (1024 * 1024)}MB limit'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        # Identical content already analysed by the current pipeline: share its results
+        content_hash = hashing_handler.hashes.get('file', '')
+        source = find_reusable_analysis(content_hash, file_extension)
+        if source is not None:
+            analysis = clone_analysis(source, request.user.profile, dataset_name)
+            serializer = DataAnalysisSerializer(analysis)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
         # Create analysis record
         # Use Profile for user association
         analysis = DataAnalysis.objects.create(
             user=request.user.profile,
             dataset_name=dataset_name,
             original_file=uploaded_file,
+            content_hash=content_hash,
+            streaming=streaming,
             status='pending'
         )
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
- 
-    # Avoid calling process_dataset_sync synchronously in the request/response cycle
-    # Instead, trigger it asynchronously (e.g., with Celery) or call it after response if needed
-    # For now, call it after returning the response (not recommended for production)
-    serializer = DataAnalysisSerializer(analysis)
-    response = Response(serializer.data, status=status.HTTP_201_CREATED)
-    process_dataset_sync(analysis.id)
-    return response
-        
-    # (moved above)
-        
-   
 
-def process_dataset_sync(analysis_id):
-    """Process dataset synchronously (use Celery in production)"""
-    try:
-        analysis = DataAnalysis.objects.get(id=analysis_id)
-        analysis.status = 'processing'
-        analysis.save()
-        
-        start_time = time.time()
-        
-        # Initialize service
-        service = DataAnalysisService(analysis)
-        
-        # Load data
-        if not service.load_data():
-            analysis.status = 'failed'
-            analysis.save()
-            return
-        
-        # Clean data
-        if not service.clean_data():
-            analysis.status = 'failed'
-            analysis.save()
-            return
-        
-        # Generate insights
-        service.generate_insights()
-        # Generate graphs
-        service.generate_graphs()
-        
-        # Save cleaned data
-        service.save_cleaned_data()
-        
-        # Generate HTML report
-        service.generate_html_report()
-        
-        # Update completion status
-        processing_time = time.time() - start_time
-        analysis.processing_time = processing_time
-        analysis.status = 'completed'
-        analysis.save()
-        
-    except Exception as e:
-        print(f"Error processing dataset: {str(e)}")
-        print(traceback.format_exc())
-        analysis.status = 'failed'
-        analysis.save()
+    # Processing runs as a Celery task chain so the request returns immediately
+    transaction.on_commit(lambda: start_analysis_pipeline(analysis.id))
+    serializer = DataAnalysisSerializer(analysis)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
 def get_analysis(request, analysis_id):
@@ -119,6 +95,38 @@ def get_analysis(request, analysis_id):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+DETAIL_INSIGHTS_LIMIT = 50
+MAX_DETAIL_INSIGHTS_LIMIT = 500
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_analysis_detail(request, analysis_id):
+    """
+    Analysis with its top insights (by importance, `?insights_limit=N`) and its
+    graphs in one response, fetched in three queries whatever the set sizes.
+    """
+    try:
+        limit = int(request.query_params.get('insights_limit', DETAIL_INSIGHTS_LIMIT))
+    except ValueError:
+        return Response({'error': 'insights_limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(0, min(limit, MAX_DETAIL_INSIGHTS_LIMIT))
+
+    analysis = get_object_or_404(
+        DataAnalysis.objects.annotate(insights_total=Count('insights')).prefetch_related(
+            # Sliced prefetch: the top-N cut is a window function in the same query
+            Prefetch('insights', queryset=AnalysisInsight.objects.order_by('-importance_score', 'id')[:limit],
+                     to_attr='top_insights'),
+            Prefetch('graphs', queryset=GeneratedGraph.objects.order_by('id')),
+        ),
+        id=analysis_id,
+        user=request.user.profile,
+    )
+    try:
+        serializer = DataAnalysisDetailSerializer(analysis)
+        return Response(serializer.data)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def get_analysis_insights(request, analysis_id):
     """Get analysis insights"""
@@ -135,20 +143,168 @@ def get_analysis_graphs(request, analysis_id):
     """Get analysis graphs"""
     try:
         analysis = get_object_or_404(DataAnalysis, id=analysis_id)
-        graphs = GeneratedGraph.objects.filter(analysis=analysis)
+        graphs = GeneratedGraph.objects.filter(analysis=analysis).select_related('analysis')
         serializer = GeneratedGraphSerializer(graphs, many=True)
         return Response(serializer.data)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def get_graph_image(request, analysis_id, graph_id):
+    """Serve a graph image from the render cache, rendering it with the requested profile on a miss"""
+    graph = get_object_or_404(GeneratedGraph.objects.select_related('analysis'), id=graph_id, analysis_id=analysis_id)
+    if not can_read_media(request, graph.analysis):
+        raise Http404
+    profile = request.query_params.get('profile', settings.ANALYSIS_GRAPH_PROFILE)
+    if profile not in RENDER_PROFILES:
+        return Response({'error': f'Unknown render profile. Allowed: {", ".join(RENDER_PROFILES)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        service = DataAnalysisService(graph.analysis)
+        file_path = service.render_graph_file(graph, profile)
+        if file_path is None:
+            return Response({'error': 'Graph can no longer be rendered'}, status=status.HTTP_404_NOT_FOUND)
+        # graph_url pins the render's version with ?v=, making the URL safe to cache indefinitely
+        immutable = request.query_params.get('v') == service.graph_version(graph, profile)
+        return serve_media(request, file_path, immutable=immutable)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+ANALYSIS_FILE_FIELDS = {'report': 'report_html', 'cleaned': 'cleaned_file'}
+
+@api_view(['GET'])
+def get_analysis_file(request, analysis_id, kind):
+    """Serve the HTML report or the cleaned dataset of an analysis; cached for good when ?v= matches"""
+    if kind not in ANALYSIS_FILE_FIELDS:
+        return Response({'error': f'Unknown file. Allowed: {", ".join(ANALYSIS_FILE_FIELDS)}'},
+                        status=status.HTTP_404_NOT_FOUND)
+    analysis = get_object_or_404(DataAnalysis.objects.only('user', ANALYSIS_FILE_FIELDS[kind]), id=analysis_id)
+    if not can_read_media(request, analysis):
+        raise Http404
+    field_file = getattr(analysis, ANALYSIS_FILE_FIELDS[kind])
+    if not field_file or not os.path.exists(field_file.path):
+        return Response({'error': 'File not available'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        immutable = request.query_params.get('v') == file_version(field_file.path)
+        return serve_media(request, field_file.path, attachment=(kind == 'cleaned'), immutable=immutable)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_graph_data(request, analysis_id, graph_id):
+    """Pre-aggregated chart data of a graph (bins, box stats, counts, correlations, time-series points)"""
+    graph = get_object_or_404(GeneratedGraph.objects.select_related('analysis'), id=graph_id,
+                              analysis_id=analysis_id, analysis__user=request.user.profile)
+    try:
+        data = DataAnalysisService(graph.analysis).graph_chart_data(graph)
+        if data is None:
+            return Response({'error': 'Chart data is no longer available'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+EVENT_KEEPALIVE_SECONDS = 15
+# Tickets only open the event stream, and only briefly: unlike a JWT in the query
+# string, one that ends up in an access log is of no use to anyone
+EVENT_TICKET_SALT = 'analyze.analysis_events'
+EVENT_TICKET_MAX_AGE = 30
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def issue_event_ticket(request):
+    """Short-lived ticket for opening the event stream, since EventSource cannot send an Authorization header"""
+    ticket = signing.dumps(str(request.user.profile.id), salt=EVENT_TICKET_SALT)
+    return Response({'ticket': ticket, 'expires_in': EVENT_TICKET_MAX_AGE})
+
+
+def _event_stream_profile_id(request):
+    """Profile id from a ?ticket= issued by issue_event_ticket, or from the JWT in the Authorization header"""
+    ticket = request.GET.get('ticket')
+    if ticket is not None:
+        try:
+            return signing.loads(ticket, salt=EVENT_TICKET_SALT, max_age=EVENT_TICKET_MAX_AGE)
+        except signing.BadSignature:
+            return None
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if not header:
+        return None
+    authentication = JWTAuthentication()
+    try:
+        raw_token = authentication.get_raw_token(header.encode())
+        if raw_token is None:
+            return None
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+        return user.profile.id
+    except Exception:
+        return None
+
+
+async def analysis_events(request):
+    """
+    Server-sent events pushing status and progress of the user's analyses as the
+    pipeline runs. Needs an ASGI server; clients subscribe once instead of polling.
+    """
+    profile_id = await sync_to_async(_event_stream_profile_id)(request)
+    if profile_id is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    async def stream():
+        yield 'retry: 5000\n\n'
+        async for event in get_broker().subscribe(user_channel(profile_id), EVENT_KEEPALIVE_SECONDS):
+            if event is None:
+                yield ': keepalive\n\n'  # lets proxies and the server notice dropped clients
+            else:
+                yield f"event: analysis\ndata: {json.dumps(event)}\n\n"
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_analyses(request):
-    """List all analyses for the logged-in user"""
+    """
+    Cursor-paginated analyses of the logged-in user, newest first. `?fields=a,b`
+    selects a sparse fieldset; unchanged lists answer conditional requests with 304.
+    """
     try:
         analyses = DataAnalysis.objects.filter(user=request.user.profile)
-        serializer = DataAnalysisSerializer(analyses, many=True)
-        return Response(serializer.data)
+
+        fields = None
+        if request.query_params.get('fields'):
+            fields = [name.strip() for name in request.query_params['fields'].split(',') if name.strip()]
+            unknown = set(fields) - set(DataAnalysisSerializer().fields)
+            if unknown:
+                return Response({'error': f"Unknown fields: {', '.join(sorted(unknown))}"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            concrete = {field.name for field in DataAnalysis._meta.concrete_fields}
+            sources = {DataAnalysisSerializer.field_sources.get(name, name) for name in fields}
+            analyses = analyses.only('id', 'created_at', *(sources & concrete))
+
+        # Every write bumps updated_at and deletions change the count, so the pair
+        # (plus the query string selecting page and fields) identifies the response
+        state = analyses.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+        last_modified = state['last_modified']
+        etag = hashlib.md5(
+            f"{request.user.profile.id}:{state['count']}:{last_modified}:{request.GET.urlencode()}".encode()
+        ).hexdigest()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+
+        if response is None:
+            paginator = AnalysisCursorPagination()
+            page = paginator.paginate_queryset(analyses, request)
+            serializer = DataAnalysisSerializer(page, many=True, fields=fields)
+            response = paginator.get_paginated_response(serializer.data)
+        response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -158,21 +314,17 @@ def delete_analysis(request, analysis_id):
     try:
         analysis = get_object_or_404(DataAnalysis, id=analysis_id)
         
-        # Delete associated files
-        if analysis.original_file:
-            default_storage.delete(analysis.original_file.name)
-        if analysis.cleaned_file:
-            default_storage.delete(analysis.cleaned_file.name)
-        if analysis.report_html:
-            default_storage.delete(analysis.report_html.name)
-        if analysis.graphs_zip:
-            default_storage.delete(analysis.graphs_zip.name)
+        # Delete associated files (unless a deduplicated upload still shares them)
+        for field_file in (analysis.original_file, analysis.cleaned_file, analysis.report_html, analysis.graphs_zip):
+            if field_file and not analysis.file_is_shared(field_file.name):
+                default_storage.delete(field_file.name)
         
-        # Delete temp graphs directory
-        temp_graphs_dir = os.path.join(settings.MEDIA_ROOT, 'temp_graphs', str(analysis.id))
-        if os.path.exists(temp_graphs_dir):
-            import shutil
-            shutil.rmtree(temp_graphs_dir)
+        # Delete the graph source and its namespace of cached renders, the parsed upload and pipeline checkpoints
+        service = DataAnalysisService(analysis)
+        service.delete_graph_source()
+        service.delete_parsed_cache()
+        service.clear_checkpoints()
+        prune_cached_archives(analysis.id)
         
         analysis.delete()
         
@@ -183,47 +335,30 @@ def delete_analysis(request, analysis_id):
 
 @api_view(['GET'])
 def download_all_files(request, analysis_id):
-    """Download all generated files as a zip"""
+    """
+    Download all generated files as a zip. The archive streams to the client
+    while being cached on disk; later downloads (and resumed ones, via Range)
+    are served from the cached file.
+    """
     try:
         analysis = get_object_or_404(DataAnalysis, id=analysis_id)
-        
-        # Create in-memory zip
-        buffer = BytesIO()
-        with zipfile.ZipFile(buffer, 'w') as zip_file:
-            # Add cleaned file
-            if analysis.cleaned_file and os.path.exists(analysis.cleaned_file.path):
-                zip_file.write(
-                    analysis.cleaned_file.path,
-                    f"dataset/{os.path.basename(analysis.cleaned_file.name)}"
-                )
-            
-            # Add HTML report
-            if analysis.report_html and os.path.exists(analysis.report_html.path):
-                zip_file.write(
-                    analysis.report_html.path,
-                    f"reports/{os.path.basename(analysis.report_html.name)}"
-                )
-            
-            # Add graphs (if you saved a zip already or individual graph files)
-            if analysis.graphs_zip and os.path.exists(analysis.graphs_zip.path):
-                zip_file.write(
-                    analysis.graphs_zip.path,
-                    f"graphs/{os.path.basename(analysis.graphs_zip.name)}"
-                )
-            else:
-                # Optional: include individual graph files if not zipped
-                graphs = GeneratedGraph.objects.filter(analysis=analysis)
-                for graph in graphs:
-                    if graph.file_path and os.path.exists(graph.file_path):
-                        zip_file.write(
-                            graph.file_path,
-                            f"graphs/{os.path.basename(graph.file_path)}"
-                        )
-        
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/zip')
-        response['Content-Disposition'] = f'attachment; filename=report.zip'
-        return response
+        service = DataAnalysisService(analysis)
+        profile = settings.ANALYSIS_GRAPH_PROFILE
+        graphs = list(GeneratedGraph.objects.filter(analysis=analysis).order_by('id'))
+        archive_path = service.archive_path(graphs, profile)
+
+        if not os.path.exists(archive_path):
+            prune_cached_archives(analysis.id, keep=archive_path)
+            archive = stream_zip(service.archive_entries(graphs, profile), cache_path=archive_path)
+            if 'HTTP_RANGE' not in request.META:
+                response = StreamingHttpResponse(archive, content_type='application/zip')
+                response['Content-Disposition'] = 'attachment; filename="report.zip"'
+                return async_safe(request, response)
+            # A ranged request resumes an interrupted download: finish the archive first
+            for _ in archive:
+                pass
+
+        return serve_media(request, archive_path, 'application/zip', filename='report.zip', attachment=True)
 
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -2,6 +2,8 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Production serves the project through it (gunicorn with uvicorn workers) so the
+long-lived analysis progress event streams do not hold a worker thread each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
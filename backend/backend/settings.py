@@ -118,6 +118,42 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Analysis pipeline
+# Downcast numerics and compact string columns right after loading an upload
+ANALYSIS_OPTIMIZE_MEMORY = os.getenv('ANALYSIS_OPTIMIZE_MEMORY', 'True') == 'True'
+# CSVs above this size are analysed in constant memory, chunk by chunk; other formats are capped at it
+ANALYSIS_STREAMING_THRESHOLD = int(os.getenv('ANALYSIS_STREAMING_THRESHOLD', 50 * 1024 * 1024))
+ANALYSIS_STREAMING_CHUNK_ROWS = int(os.getenv('ANALYSIS_STREAMING_CHUNK_ROWS', 100000))
+ANALYSIS_MAX_UPLOAD_SIZE = int(os.getenv('ANALYSIS_MAX_UPLOAD_SIZE', 5 * 1024 * 1024 * 1024))
+# Parsed uploads are kept as Arrow files for re-analysis, least recently used dropped beyond this many bytes
+ANALYSIS_PARSED_CACHE_SIZE = int(os.getenv('ANALYSIS_PARSED_CACHE_SIZE', 2 * 1024 * 1024 * 1024))
+# Default graph render profile ('preview': small WebP, 'print': 300 DPI PNG). Graphs are
+# rendered on first request and kept in an LRU disk cache capped at ANALYSIS_GRAPH_CACHE_SIZE bytes.
+ANALYSIS_GRAPH_PROFILE = os.getenv('ANALYSIS_GRAPH_PROFILE', 'preview')
+ANALYSIS_GRAPH_CACHE_SIZE = int(os.getenv('ANALYSIS_GRAPH_CACHE_SIZE', 512 * 1024 * 1024))
+# Correlation used for insights, scatter matrix columns and the heatmap: 'pearson' or 'spearman'
+ANALYSIS_CORRELATION_METHOD = os.getenv('ANALYSIS_CORRELATION_METHOD', 'pearson')
+# Approximate statistics: HyperLogLog distinct counts, heavy-hitter top values and KLL
+# quantiles with bounded memory and stated error bounds instead of exact full-column work.
+# This saves memory, not CPU: sketching costs about twice the exact counts (see the
+# benchmark_sketches command), but needs a fixed amount of memory per column however many
+# distinct values it holds. Worth it for frames with high-cardinality text columns near
+# the worker's memory limit; streaming mode sketches top values and distinct counts regardless.
+ANALYSIS_APPROXIMATE_STATS = os.getenv('ANALYSIS_APPROXIMATE_STATS', 'False') == 'True'
+# Insight detectors to run (comma separated names from analyze/insights.py; empty runs all)
+# and the CPU seconds all of them may spend together; detectors left after that are skipped.
+ANALYSIS_INSIGHT_DETECTORS = [name for name in os.getenv('ANALYSIS_INSIGHT_DETECTORS', '').split(',') if name]
+ANALYSIS_INSIGHTS_BUDGET = float(os.getenv('ANALYSIS_INSIGHTS_BUDGET', 10.0))
+# How generated files reach the client (see analyze/media.py): the worker itself
+# (DjangoMediaBackend), nginx (XAccelRedirectMediaBackend, internal location aliasing
+# MEDIA_ROOT at ANALYSIS_MEDIA_ACCEL_PREFIX), Apache (XSendfileMediaBackend) or the
+# storage's own URLs (StorageRedirectMediaBackend).
+ANALYSIS_MEDIA_BACKEND = os.getenv('ANALYSIS_MEDIA_BACKEND', 'analyze.media.DjangoMediaBackend')
+ANALYSIS_MEDIA_ACCEL_PREFIX = os.getenv('ANALYSIS_MEDIA_ACCEL_PREFIX', '/protected-media/')
+# Seconds a signed file or graph URL (?sig=) stays valid. Signatures are re-issued daily
+# (every half lifetime if shorter), so a URL lasts between this minus that period and this.
+ANALYSIS_MEDIA_URL_MAX_AGE = int(os.getenv('ANALYSIS_MEDIA_URL_MAX_AGE', 7 * 24 * 60 * 60))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -167,6 +203,23 @@ CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:63
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+# Run the analysis pipeline in-process (tests / local development without Redis)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = os.getenv('CELERY_TASK_EAGER_PROPAGATES', 'False') == 'True'
+if CELERY_TASK_ALWAYS_EAGER:
+    # Chords still create result objects in eager mode; keep them off Redis
+    CELERY_RESULT_BACKEND = 'cache+memory://'
+
+# Pub/sub carrying analysis progress to server-sent event streams (see analyze/events.py).
+# Eager mode runs the pipeline inside the web process, so an in-process broker suffices.
+ANALYSIS_EVENTS_BACKEND = os.getenv(
+    'ANALYSIS_EVENTS_BACKEND',
+    'analyze.events.InMemoryBroker' if CELERY_TASK_ALWAYS_EAGER else 'analyze.events.RedisBroker',
+)
+ANALYSIS_EVENTS_REDIS_URL = os.getenv('ANALYSIS_EVENTS_REDIS_URL', CELERY_BROKER_URL)
+# Render the overview and correlation graphs into the render cache once an analysis completes,
+# one Celery task per graph; other graphs render when first requested
+ANALYSIS_PRERENDER_GRAPHS = os.getenv('ANALYSIS_PRERENDER_GRAPHS', 'False') == 'True'
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
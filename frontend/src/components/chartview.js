@@ -0,0 +1,154 @@
+import { useEffect, useState } from "react";
+
+// Draws a graph in the browser from its pre-aggregated chart data; graph types
+// without a client-side chart (and failed data requests) fall back to the server image.
+const WIDTH = 480;
+const HEIGHT = 280;
+const PAD = 36;
+
+const scale = (domainMin, domainMax, rangeMin, rangeMax) => (v) =>
+  domainMax === domainMin
+    ? (rangeMin + rangeMax) / 2
+    : rangeMin + ((v - domainMin) / (domainMax - domainMin)) * (rangeMax - rangeMin);
+
+const fmt = (v) => (v === null || v === undefined ? "–" : Number(v).toPrecision(4));
+
+function Axes() {
+  return (
+    <g stroke="#9ca3af">
+      <line x1={PAD} y1={HEIGHT - PAD} x2={WIDTH - PAD / 2} y2={HEIGHT - PAD} />
+      <line x1={PAD} y1={PAD / 2} x2={PAD} y2={HEIGHT - PAD} />
+    </g>
+  );
+}
+
+function Histogram({ data }) {
+  const { bin_edges: edges, bin_counts: counts } = data;
+  const x = scale(edges[0], edges[edges.length - 1], PAD, WIDTH - PAD / 2);
+  const y = scale(0, Math.max(...counts, 1), HEIGHT - PAD, PAD / 2);
+  return (
+    <>
+      {counts.map((c, i) => (
+        <rect key={i} x={x(edges[i])} y={y(c)} width={Math.max(x(edges[i + 1]) - x(edges[i]), 1)}
+          height={HEIGHT - PAD - y(c)} fill="#7dd3fc" stroke="#0f172a" strokeWidth="0.5" />
+      ))}
+      <line x1={x(data.mean)} x2={x(data.mean)} y1={PAD / 2} y2={HEIGHT - PAD} stroke="#dc2626" strokeDasharray="4" />
+      <line x1={x(data.median)} x2={x(data.median)} y1={PAD / 2} y2={HEIGHT - PAD} stroke="#16a34a" strokeDasharray="4" />
+      <text x={PAD} y={HEIGHT - 8} fontSize="11">{fmt(edges[0])}</text>
+      <text x={WIDTH - PAD} y={HEIGHT - 8} fontSize="11" textAnchor="end">{fmt(edges[edges.length - 1])}</text>
+      <Axes />
+    </>
+  );
+}
+
+function BoxPlot({ data }) {
+  const y = scale(data.whislo, data.whishi, HEIGHT - PAD, PAD / 2);
+  const cx = WIDTH / 2;
+  return (
+    <>
+      <line x1={cx} x2={cx} y1={y(data.whislo)} y2={y(data.whishi)} stroke="#0f172a" />
+      <rect x={cx - 60} y={y(data.q3)} width="120" height={Math.max(y(data.q1) - y(data.q3), 1)} fill="#bfdbfe" stroke="#0f172a" />
+      <line x1={cx - 60} x2={cx + 60} y1={y(data.median)} y2={y(data.median)} stroke="#ea580c" strokeWidth="2" />
+      {["whislo", "q1", "median", "q3", "whishi"].map((k) => (
+        <text key={k} x={cx + 70} y={y(data[k]) + 4} fontSize="11">{`${k}: ${fmt(data[k])}`}</text>
+      ))}
+      <Axes />
+    </>
+  );
+}
+
+function CountPlot({ data }) {
+  const band = (WIDTH - PAD * 1.5) / Math.max(data.counts.length, 1);
+  const y = scale(0, Math.max(...data.counts, 1), HEIGHT - PAD, PAD / 2);
+  return (
+    <>
+      {data.counts.map((c, i) => (
+        <g key={i}>
+          <rect x={PAD + i * band + 2} y={y(c)} width={band - 4} height={HEIGHT - PAD - y(c)} fill="#fca5a5" />
+          <text x={PAD + i * band + band / 2} y={HEIGHT - 20} fontSize="10" textAnchor="middle">
+            {data.labels[i].slice(0, 8)}
+          </text>
+        </g>
+      ))}
+      <Axes />
+    </>
+  );
+}
+
+function TimeSeries({ data }) {
+  const times = data.x.map((t) => new Date(t).getTime());
+  const values = data.y.filter((v) => v !== null);
+  const x = scale(times[0], times[times.length - 1], PAD, WIDTH - PAD / 2);
+  const y = scale(Math.min(...values), Math.max(...values), HEIGHT - PAD, PAD / 2);
+  const points = data.y
+    .map((v, i) => (v === null ? null : `${x(times[i])},${y(v)}`))
+    .filter(Boolean)
+    .join(" ");
+  return (
+    <>
+      <polyline points={points} fill="none" stroke="#1e3a8a" strokeWidth="1.5" />
+      <text x={PAD} y={HEIGHT - 8} fontSize="11">{data.x[0].slice(0, 10)}</text>
+      <text x={WIDTH - PAD} y={HEIGHT - 8} fontSize="11" textAnchor="end">{data.x[data.x.length - 1].slice(0, 10)}</text>
+      <Axes />
+    </>
+  );
+}
+
+function Correlation({ data }) {
+  const n = data.columns.length;
+  const cell = (Math.min(WIDTH, HEIGHT) - PAD) / Math.max(n, 1);
+  const color = (v) =>
+    v === null ? "#e5e7eb" : v >= 0 ? `rgba(220, 38, 38, ${v})` : `rgba(37, 99, 235, ${-v})`;
+  return (
+    <>
+      {data.matrix.map((row, i) =>
+        row.map((v, j) => (
+          <rect key={`${i}-${j}`} x={PAD + j * cell} y={PAD / 2 + i * cell} width={cell - 1} height={cell - 1} fill={color(v)}>
+            <title>{`${data.columns[i]} / ${data.columns[j]}: ${fmt(v)}`}</title>
+          </rect>
+        ))
+      )}
+    </>
+  );
+}
+
+const CHARTS = {
+  histogram: Histogram,
+  boxplot: BoxPlot,
+  countplot: CountPlot,
+  timeseries: TimeSeries,
+  correlation: Correlation,
+};
+
+function ChartView({ graph, apiOrigin }) {
+  const [chart, setChart] = useState(null);
+  const [failed, setFailed] = useState(false);
+  const Chart = CHARTS[graph.graph_type];
+
+  useEffect(() => {
+    if (!Chart || !graph.data_url) return;
+    let cancelled = false;
+    fetch(`${apiOrigin}${graph.data_url}`, {
+      headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+    })
+      .then((res) => (res.ok ? res.json() : Promise.reject(res.status)))
+      .then((json) => !cancelled && setChart(json.data))
+      .catch(() => !cancelled && setFailed(true));
+    return () => { cancelled = true; };
+  }, [Chart, graph.data_url, apiOrigin]);
+
+  const alt = `${graph.graph_type} - ${(graph.columns || graph.column_names || []).join(", ")}`;
+  if (!Chart || failed) {
+    return <img src={`${apiOrigin}${graph.graph_url}`} alt={alt} className="w-full h-auto object-contain" />;
+  }
+  if (!chart) {
+    return <div className="w-full h-48 bg-gray-100 animate-pulse" />;
+  }
+  return (
+    <svg viewBox={`0 0 ${WIDTH} ${HEIGHT}`} className="w-full h-auto" role="img" aria-label={alt}>
+      <Chart data={chart} />
+    </svg>
+  );
+}
+
+export default ChartView;
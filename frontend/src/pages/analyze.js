@@ -7,9 +7,11 @@ import {
 import Navbar from '../components/navbar';
 import Footer from '../components/footer';
 import Select from 'react-select';
+import ChartView from '../components/chartview';
 
 const DataAnalysisApp = () => {
   const [analyses, setAnalyses] = useState([]);
+  const [nextAnalysesPage, setNextAnalysesPage] = useState(null);
   const [selectedAnalysis, setSelectedAnalysis] = useState(null);
   const [uploadStatus, setUploadStatus] = useState(null);
   const [isUploading, setIsUploading] = useState(false);
@@ -39,6 +41,9 @@ const DataAnalysisApp = () => {
   });
 
   const API_BASE = 'http://127.0.0.1:8000/api';
+  const API_ORIGIN = 'http://127.0.0.1:8000';
+  // Sparse fieldset of the list: only what the sidebar renders
+  const LIST_FIELDS = 'id,user,dataset_name,created_at,status,progress_stage,progress,report_url';
 
   function getToken() {
     return localStorage.getItem('token');
@@ -61,37 +66,116 @@ const DataAnalysisApp = () => {
       setIsLoading(false);
     };
     fetchData();
-    
-    const interval = setInterval(fetchAnalyses, 5000);
-    return () => clearInterval(interval);
+
+    // Progress is pushed over server-sent events; poll only if the stream is unavailable
+    let interval = null;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchAnalyses, 5000);
+    };
+    const token = getToken();
+    if (!token || typeof EventSource === 'undefined') {
+      startPolling();
+      return () => clearInterval(interval);
+    }
+    // EventSource cannot send headers: trade the JWT for a short-lived stream ticket,
+    // and a fresh one on every reconnect since tickets expire within a minute
+    let events = null;
+    let closed = false;
+    let reconnects = 0;
+    let openTimeout = null;
+    const connect = async () => {
+      let ticket;
+      try {
+        const response = await fetch(`${API_BASE}/analyses/events/ticket/`, {
+          method: 'POST',
+          headers: { Authorization: `Bearer ${getToken()}` },
+        });
+        if (!response.ok) throw new Error('Could not open event stream');
+        ticket = (await response.json()).ticket;
+      } catch (err) {
+        startPolling();
+        return;
+      }
+      if (closed) return;
+      events = new EventSource(`${API_BASE}/analyses/events/?ticket=${encodeURIComponent(ticket)}`);
+      openTimeout = setTimeout(startPolling, 10000);
+      events.onopen = () => {
+        clearTimeout(openTimeout);
+        reconnects = 0;
+      };
+      events.onerror = () => {
+        // Reconnect with a new ticket; the browser's own retry would reuse the expired one
+        events.close();
+        clearTimeout(openTimeout);
+        if (closed) return;
+        if (reconnects++ < 3) setTimeout(connect, 5000);
+        else startPolling();
+      };
+      events.addEventListener('analysis', (e) => {
+        const event = JSON.parse(e.data);
+        setAnalyses(prev => prev.map(a => (String(a.id) === event.id ? { ...a, ...event } : a)));
+        if (event.status === 'completed' || event.status === 'failed') fetchAnalyses();
+      });
+    };
+    connect();
+    return () => {
+      closed = true;
+      if (events) events.close();
+      clearTimeout(openTimeout);
+      clearInterval(interval);
+    };
   }, []);
 
+  // Fetches one page of the list; unchanged pages are revalidated by the browser (304)
+  const fetchAnalysesPage = async (url) => {
+    const token = getToken();
+    const response = await fetch(url, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+    if (!response.ok) throw new Error('Network response was not ok');
+    const data = await response.json();
+    // Optionally filter by user id if backend does not filter
+    const user = getUserFromToken();
+    let filtered = Array.isArray(data) ? data : (Array.isArray(data.results) ? data.results : []);
+    if (user && user.user_id) {
+      filtered = filtered.filter(a => a.user === user.user_id || a.user_id === user.user_id);
+    }
+    return { results: filtered, next: data.next || null };
+  };
+
   const fetchAnalyses = async () => {
     try {
-      const token = getToken();
-      if (!token) {
+      if (!getToken()) {
         setAnalyses([]);
         return;
       }
-      const response = await fetch(`${API_BASE}/analyses/`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
+      const page = await fetchAnalysesPage(`${API_BASE}/analyses/?fields=${LIST_FIELDS}`);
+      // Refresh the first page, keeping older pages already loaded with "Load more"
+      setAnalyses(prev => {
+        const oldest = page.results.length ? page.results[page.results.length - 1].created_at : null;
+        const ids = new Set(page.results.map(a => a.id));
+        const older = page.next ? prev.filter(a => !ids.has(a.id) && oldest && a.created_at < oldest) : [];
+        return [...page.results, ...older];
       });
-      if (!response.ok) throw new Error('Network response was not ok');
-      const data = await response.json();
-      // Optionally filter by user id if backend does not filter
-      const user = getUserFromToken();
-      let filtered = Array.isArray(data) ? data : (Array.isArray(data.results) ? data.results : []);
-      if (user && user.user_id) {
-        filtered = filtered.filter(a => a.user === user.user_id || a.user_id === user.user_id);
-      }
-      setAnalyses(filtered);
+      setNextAnalysesPage(prev => (prev && page.next ? prev : page.next));
     } catch (error) {
       console.error('Error fetching analyses:', error);
       setAnalyses([]);
     }
   };
+
+  const loadMoreAnalyses = async () => {
+    if (!nextAnalysesPage) return;
+    try {
+      const page = await fetchAnalysesPage(nextAnalysesPage);
+      setAnalyses(prev => [...prev, ...page.results.filter(a => !prev.some(p => p.id === a.id))]);
+      setNextAnalysesPage(page.next);
+    } catch (error) {
+      console.error('Error fetching analyses:', error);
+    }
+  };
   const promptDeleteAnalysis = (analysisId) => {
     setAnalysisToDelete(analysisId);
     setShowDeleteConfirm(true);
@@ -126,36 +210,12 @@ const DataAnalysisApp = () => {
   const fetchAnalysisDetails = async (analysisId) => {
     try {
       setIsLoading(true);
-      const [analysisRes, insightsRes, graphsRes] = await Promise.all([
-        fetch(`${API_BASE}/analyses/${analysisId}/`),
-        fetch(`${API_BASE}/analyses/${analysisId}/insights/`),
-        fetch(`${API_BASE}/analyses/${analysisId}/graphs/`)
-      ]);
-
-      if (!analysisRes.ok) throw new Error('Failed to fetch analysis');
-      const analysis = await analysisRes.json();
-
-      // Process insights
-      let insightsData = [];
-      if (insightsRes.ok) {
-        try {
-          const json = await insightsRes.json();
-          insightsData = Array.isArray(json) ? json : (Array.isArray(json.results) ? json.results : []);
-        } catch (e) {
-          console.error('Error parsing insights:', e);
-        }
-      }
-
-      // Process graphs
-      let graphsData = [];
-      if (graphsRes.ok) {
-        try {
-          const json = await graphsRes.json();
-          graphsData = Array.isArray(json) ? json : (Array.isArray(json.results) ? json.results : []);
-        } catch (e) {
-          console.error('Error parsing graphs:', e);
-        }
-      }
+      // One request returns the analysis with its top insights and its graphs
+      const response = await fetch(`${API_BASE}/analyses/${analysisId}/detail/`, {
+        headers: { Authorization: `Bearer ${getToken()}` },
+      });
+      if (!response.ok) throw new Error('Failed to fetch analysis');
+      const { insights: insightsData = [], graphs: graphsData = [], ...analysis } = await response.json();
 
       setSelectedAnalysis(analysis);
       setInsights(insightsData);
@@ -226,12 +286,12 @@ const DataAnalysisApp = () => {
     }
   };
 
-  const viewHtmlReport = (reportPath) => {
-    if (!reportPath) {
+  const viewHtmlReport = (reportUrl) => {
+    if (!reportUrl) {
       setUploadStatus({ type: 'error', message: 'HTML report not available' });
       return;
     }
-    window.open(`${API_BASE}${reportPath}`, "_blank");
+    window.open(`${API_ORIGIN}${reportUrl}`, "_blank");
   };
 
   const getStatusBadge = (status) => {
@@ -394,12 +454,20 @@ const DataAnalysisApp = () => {
                         </div>
                         {getStatusBadge(a.status)}
                       </div>
+                      {a.status === 'processing' && (
+                        <div className="mt-2" title={a.progress_stage}>
+                          <div className="h-1.5 w-full bg-gray-100 rounded">
+                            <div className="h-1.5 bg-yellow-400 rounded" style={{ width: `${a.progress || 0}%` }} />
+                          </div>
+                          <p className="text-xs text-gray-500 mt-1">{(a.progress_stage || '').replace(/_/g, ' ')} · {a.progress || 0}%</p>
+                        </div>
+                      )}
                       <div className="flex justify-between items-center mt-3 pt-2 border-t border-gray-100">
                         <div className="flex space-x-2">
                           <button 
                             onClick={(e) => {
                               e.stopPropagation();
-                              viewHtmlReport(a.report_html);
+                              viewHtmlReport(a.report_url);
                             }}
                             className="p-1.5 rounded-md hover:bg-gray-100 text-gray-500 hover:text-blue-600"
                             title="View Report"
@@ -430,6 +498,14 @@ const DataAnalysisApp = () => {
                       </div>
                     </div>
                   ))}
+                  {nextAnalysesPage && (
+                    <button
+                      onClick={loadMoreAnalyses}
+                      className="w-full py-2 text-sm text-blue-600 hover:bg-blue-50 rounded-md"
+                    >
+                      Load more
+                    </button>
+                  )}
                 </div>
               )}
             </div>
@@ -576,11 +652,7 @@ const DataAnalysisApp = () => {
                       <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
                         {filteredGraphs.map((g, i) => (
                           <div key={i} className="border rounded-lg overflow-hidden hover:shadow-md transition-shadow">
-                            <img
-                              src={`${API_BASE}${g.graph_url}`}
-                              alt={`${g.graph_type} - ${(g.columns || g.column_names || []).join(", ")}`}
-                              className="w-full h-auto object-contain"
-                            />
+                            <ChartView graph={g} apiOrigin={API_ORIGIN} />
                             <div className="p-2 bg-gray-50 border-t">
                               <p className="text-xs text-gray-600 truncate">
                                 {g.graph_type} • {(g.columns || g.column_names || []).join(", ")}